@@ -1,8 +1,14 @@
 from flask import Flask, render_template
 
 from config import Config
+from db_utils import benchmark_engines_command, rebuild_roster_command
 from extensions import db, migrate, csrf
 from routes import register_blueprints
+from utils.compile_gate import compile_gate
+from utils.report_jobs import report_jobs
+import utils.revisions  # noqa: F401 - registers the data revision triggers and commit hooks
+import utils.prebuild  # noqa: F401 - rebuilds the reports in the background after data changes
+import utils.roster_flat  # noqa: F401 - keeps the roster_flat table in step with the roster tables
 
 from dotenv import load_dotenv
 import os
@@ -29,6 +35,10 @@ def create_app(test_config=None):
     db.init_app(app)
     migrate.init_app(app, db)
     csrf.init_app(app)
+    report_jobs.init_app(app)
+    compile_gate.init_app(app)
+    app.cli.add_command(rebuild_roster_command)
+    app.cli.add_command(benchmark_engines_command)
 
     # Routes are now defined in blueprint files in the routes/ directory
     # - Main routes (/, /favicon.ico) are in routes/main_routes.py
@@ -24,6 +24,80 @@ class Config:
     BACKUP_DIR = "files_db_backups"
     REPORTS_DIR = "files_roster_reports"
 
+    # Report job queue: compiles run on a bounded pool of worker threads, each waiting on its TeX
+    # process; "process" runs them in worker processes, which under mod_wsgi need REPORT_JOB_PYTHON
+    REPORT_JOB_WORKERS = int(os.getenv("REPORT_JOB_WORKERS", os.cpu_count() or 2))
+    REPORT_JOB_BACKEND = os.getenv("REPORT_JOB_BACKEND", "thread")
+    REPORT_JOB_TTL = 3600  # Seconds a finished job stays available to pollers
+    REPORT_JOB_PYTHON = os.getenv("REPORT_JOB_PYTHON")  # python.exe for workers under mod_wsgi
+
+    # Compiled report PDFs are cached by source hash; defaults to REPORTS_DIR/.cache
+    REPORT_CACHE_DIR = os.getenv("REPORT_CACHE_DIR")
+    # After each compile the cache keeps the published PDFs, the newest REPORT_CACHE_KEEP others
+    # (and as many fragments) and any used within REPORT_CACHE_MAX_AGE seconds
+    REPORT_CACHE_KEEP = 200
+    REPORT_CACHE_MAX_AGE = 7 * 24 * 3600
+
+    # Each LaTeX compile runs in its own temporary directory under this path (e.g. a tmpfs);
+    # defaults to the system temporary directory
+    REPORT_SCRATCH_DIR = os.getenv("REPORT_SCRATCH_DIR")
+
+    # TeX engine of every report template and of the letters: xelatex, lualatex, pdflatex or tectonic.
+    # TEX_ENGINES overrides it per template, e.g. {"sfr_template.tex": "pdflatex", "letters": "xelatex"};
+    # `flask benchmark-engines` compares the installed engines on our templates
+    TEX_ENGINE = os.getenv("TEX_ENGINE", "xelatex")
+    TEX_ENGINES = {}
+
+    # Limits of every TeX run, reports and letters alike (see utils/tex_runner.py): wall-clock and CPU
+    # seconds, address space in bytes, and bytes of the engine's output kept for the error message.
+    # A run that exceeds one is stopped and reported as such; 0 turns a limit off
+    TEX_TIMEOUT = int(os.getenv("TEX_TIMEOUT", 120))
+    TEX_CPU_LIMIT = int(os.getenv("TEX_CPU_LIMIT", 120))
+    TEX_MEMORY_LIMIT = int(os.getenv("TEX_MEMORY_LIMIT", 2 * 2 ** 30))
+    TEX_OUTPUT_LIMIT = 64 * 2 ** 10
+
+    # Report kinds whose PDF is written in-process (utils/pdf_report.py) instead of compiled with TeX:
+    # milliseconds rather than seconds, and no TeX installation needed.  Tabular reports only
+    # (long, short, expirations, vacancies), e.g. REPORT_DIRECT_PDF=short,vacancies
+    REPORT_DIRECT_PDF = [kind.strip() for kind in os.getenv("REPORT_DIRECT_PDF", "").split(",") if kind.strip()]
+
+    # Start report compiles from a precompiled format of files_roster_reports/roster_preamble.tex
+    # (needs the mylatexformat package; xelatex only), and include the logo as a pre-converted PDF
+    REPORT_PRECOMPILED_FORMAT = os.getenv("REPORT_PRECOMPILED_FORMAT", "1") == "1"
+    REPORT_CONVERT_GRAPHICS = True
+
+    # Compile the long and short rosters in cached groups of bodies, joined page by page, so that an
+    # edit recompiles only the groups it touches
+    REPORT_FRAGMENTS = True
+
+    # Warm xelatex processes kept waiting per format (and per report worker process) for report and
+    # letter builds; 0 disables the pool.  A process older than MAX_AGE seconds is replaced unused.
+    REPORT_WARM_POOL_SIZE = int(os.getenv("REPORT_WARM_POOL_SIZE", 0))
+    REPORT_WARM_POOL_MAX_AGE = 600
+    REPORT_WARM_POOL_TIMEOUT = 120  # Seconds a warm compile may take before it is killed
+
+    # Compile gate: xelatex runs at once across all processes, requests that may wait for one, and
+    # how long they wait before getting 503 + Retry-After (see /report/gate for the numbers)
+    REPORT_COMPILE_SLOTS = int(os.getenv("REPORT_COMPILE_SLOTS", os.cpu_count() or 2))
+    REPORT_COMPILE_QUEUE = int(os.getenv("REPORT_COMPILE_QUEUE", 2 * (os.cpu_count() or 2)))
+    REPORT_COMPILE_WAIT = 30
+    REPORT_COMPILE_LOCK_DIR = os.getenv("REPORT_COMPILE_LOCK_DIR")
+
+    # Rebuild the reports affected by a data change once edits have been quiet for DELAY seconds
+    # (at most MAX_DELAY after the first), so the report buttons find a fresh PDF in the cache
+    REPORT_PREBUILD = True
+    REPORT_PREBUILD_DELAY = 10
+    REPORT_PREBUILD_MAX_DELAY = 60
+
+    # Stale-while-revalidate: seconds by report kind for which the previous PDF may be served at once
+    # (marked stale) while the fresh build runs in the background; reports not listed always wait
+    REPORT_MAX_STALE = {
+        "long": 7 * 24 * 3600,
+        "short": 7 * 24 * 3600,
+        "expirations": 24 * 3600,
+        "vacancies": 24 * 3600,
+    }
+
 
 class DevelopmentConfig(Config):
     DEBUG = True
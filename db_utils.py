@@ -13,3 +13,79 @@ def init_db():
             db.executescript(f.read())
 
 
+
+@click.command('rebuild-roster')
+@with_appcontext
+def rebuild_roster_command():
+    """Refill the roster_flat table from term, office, body and person."""
+    from extensions import db
+    from utils import roster_flat
+
+    with db.engine.begin() as connection:
+        count = roster_flat.rebuild(connection)
+    click.echo(f"Rebuilt roster_flat: {count} rows.")
+
+
+@click.command('benchmark-engines')
+@click.option('--engine', 'engine_names', multiple=True,
+              help='Engine to benchmark (repeatable); default: every installed one.')
+@click.option('--runs', default=3, show_default=True, help='Compiles per template and engine; the fastest counts.')
+@with_appcontext
+def benchmark_engines_command(engine_names, runs):
+    """Compile every report template and the letter with each TeX engine: wall time, peak RSS, PDF size."""
+    import os
+    from models.letters import LetterTemplate
+    from routes.letters import letter_source
+    from routes.report import get_reports_dir
+    from utils import pdf_cache, tex_engines
+    from utils.reports import REPORTS, build_context
+
+    try:
+        engines = [tex_engines.get_engine(name) for name in engine_names] or tex_engines.available_engines()
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    missing = [engine.name for engine in engines if not engine.available()]
+    if missing or not engines:
+        raise click.ClickException(f"Not installed: {', '.join(missing) or 'any TeX engine'}")
+
+    # Each report as a single document, as the binder and the unfragmented builds compile it
+    report_dir = get_reports_dir()
+    config = dict(current_app.config, REPORT_FRAGMENTS=False)
+    context = build_context()
+    rendered = {definition.template: definition.render_build(report_dir, config, context)
+                for definition in REPORTS.values()}
+    sources = {name: report.tex for name, report in rendered.items()}
+    files_letters_dir = os.path.join(current_app.root_path, "files_letters")
+    letter = LetterTemplate.get_singleton()
+    if letter:
+        sources[tex_engines.LETTERS] = letter_source(letter, "Pat Sample", "Dear Pat", "101")
+
+    search_paths = [report_dir, current_app.static_folder, files_letters_dir]
+    results = []
+    click.echo(f"{'template':<26} {'engine':<10} {'seconds':>8} {'peak RSS':>10} {'PDF size':>10}")
+    try:
+        for result in tex_engines.benchmark(sources, engines, search_paths, config.get('REPORT_SCRATCH_DIR'), runs):
+            results.append(result)
+            if result["ok"]:
+                # None where the peak RSS cannot be read (Windows)
+                peak_rss = f"{'n/a':>10}" if result["peak_rss"] is None else f"{result['peak_rss'] / 2 ** 20:>8.1f}MB"
+                click.echo(f"{result['name']:<26} {result['engine']:<10} {result['seconds']:>8.2f} "
+                           f"{peak_rss} {result['pdf_size'] / 1024:>8.1f}KB")
+            else:
+                click.echo(f"{result['name']:<26} {result['engine']:<10} {'FAILED':>8}")
+    finally:
+        cache_dir = pdf_cache.get_cache_dir(report_dir, current_app.config)
+        pdf_cache.discard_sources(cache_dir, *(report.key for report in rendered.values()))
+
+    # The fastest engine that produced a PDF of every template
+    totals = {}
+    for engine in engines:
+        engine_results = [result for result in results if result["engine"] == engine.name]
+        if all(result["ok"] for result in engine_results):
+            totals[engine.name] = sum(result["seconds"] for result in engine_results)
+    if totals:
+        fastest = min(totals, key=totals.get)
+        click.echo(f"Fastest engine compiling every template: {fastest} ({totals[fastest]:.2f}s in total). "
+                   "Check its PDFs before choosing it with TEX_ENGINE or TEX_ENGINES.")
+    else:
+        click.echo("No engine compiled every template.")
@@ -0,0 +1,14 @@
+# models/data_revision.py.  A revision counter per roster table, bumped on every change to that table.
+
+from extensions import db
+
+
+class DataRevision(db.Model):
+    __tablename__ = 'data_revision'
+
+    table_name = db.Column(db.String(45), primary_key=True)
+    revision = db.Column(db.Integer, nullable=False, default=0,
+                         comment="Increases by at least one with every committed change to the table")
+
+    def __repr__(self):
+        return f'<DataRevision {self.table_name} {self.revision}>'
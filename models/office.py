@@ -1,5 +1,7 @@
 # models/office.py.  An area of responsibility for a given body.
 
+from sqlalchemy import event, text
+
 from extensions import db
 
 class Office(db.Model):
@@ -9,9 +11,21 @@ class Office(db.Model):
     title = db.Column(db.String(45), nullable=True, default=None)
     office_precedence = db.Column(db.Float, nullable=True, default=None)
     office_body_id = db.Column(db.BigInteger, db.ForeignKey('body.body_id'), nullable=False)
+    # How many people hold this office at once; see utils/vacancies.py
+    seats = db.Column(db.Integer, nullable=False, default=1, server_default=text("1"))
     
     # Relationship to easily fetch the related Body object
     body = db.relationship('Body', backref=db.backref('offices', lazy=True))
 
     def __repr__(self):
-        return f'<Office {self.title}>'
\ No newline at end of file
+        return f'<Office {self.title}>'
+
+
+@event.listens_for(db.metadata, "after_create")
+def _add_seats_column(target, connection, **kw):
+    # create_all() does not add columns to an existing office table, so add seats to older databases
+    if connection.dialect.name != "sqlite":
+        return
+    columns = {row[1] for row in connection.execute(text('PRAGMA table_info("office")'))}
+    if columns and "seats" not in columns:
+        connection.execute(text('ALTER TABLE office ADD COLUMN seats INTEGER NOT NULL DEFAULT 1'))
@@ -1,10 +1,16 @@
-# models/report_record.py — read-only SQLAlchemy model mapped to the report_record view
+# models/report_record.py — the roster rows the reports read: one per term, with its person, office
+# and body.  Mapped to the roster_flat table, which triggers keep in step with the base tables (see
+# utils/roster_flat.py); the report_record view it replaces computes the same rows with a join.
 
 from extensions import db
 
 class ReportRecord(db.Model):
-    __tablename__ = 'report_record'
-    __table_args__ = {'extend_existing': True}
+    __tablename__ = 'roster_flat'
+    __table_args__ = (
+        db.Index('ix_roster_flat_order', 'body_precedence', 'office_precedence'),
+        db.Index('ix_roster_flat_end', 'end'),
+        {'extend_existing': True},
+    )
 
     person_id = db.Column(db.Integer)
     first = db.Column(db.String)
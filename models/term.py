@@ -1,10 +1,14 @@
 # models/term.py.  The tenure of a given person in a given office, the junction record in the database to resolve
 # the many-to-many relationship between persons and offices.
 
+from sqlalchemy import event, text
+
 from extensions import db
 
 class Term(db.Model):
     __tablename__ = 'term'
+    # Expiration windows are date ranges on "end"
+    __table_args__ = (db.Index('ix_term_end', 'end'),)
 
     # Composite primary key
     term_person_id = db.Column('termpersonid', db.Integer, db.ForeignKey('person.personid'), primary_key=True)
@@ -20,4 +24,10 @@ class Term(db.Model):
     office = db.relationship('Office', backref=db.backref('terms', lazy=True))
     
     def __repr__(self):
-        return f'<Term {self.term_person_id}-{self.term_office_id}>'
\ No newline at end of file
+        return f'<Term {self.term_person_id}-{self.term_office_id}>'
+
+
+@event.listens_for(db.metadata, "after_create")
+def _create_end_index(target, connection, **kw):
+    # create_all() skips the index of a term table that already exists, so add it to older databases
+    connection.execute(text('CREATE INDEX IF NOT EXISTS ix_term_end ON term ("end")'))
@@ -7,6 +7,7 @@ from .person import person_bp
 from .term import term_bp
 from routes.report import report_bp
 from .admin_routes import admin_bp
+from .revision import revision_bp
 
 
 def register_blueprints(app):
@@ -16,6 +17,7 @@ def register_blueprints(app):
     app.register_blueprint(office_bp, url_prefix='/api/office')
     app.register_blueprint(person_bp, url_prefix='/api/person')
     app.register_blueprint(term_bp, url_prefix='/api/term')
+    app.register_blueprint(revision_bp, url_prefix='/api/revision')
 
     # Register main application blueprints without URL prefixes
     app.register_blueprint(auth_bp)
@@ -1,11 +1,15 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
 import os
-import subprocess
 import re
 from extensions import db
 from models.letters import LetterTemplate
 from forms import CSRFForm
-from utils.decorators import handle_errors
+from utils.decorators import handle_errors, login_required
+from utils.file_handlers import serve_file
+from utils.compile_gate import CompileQueueFull, compile_gate
+from utils.latex import compile_pdf
+from utils.latex_pool import pool_options
+from utils import tex_engines, tex_runner
 
 
 def sanitize_latex(content):
@@ -38,6 +42,28 @@ def sanitize_latex(content):
     return content
 
 
+def letter_source(template, recipient, salutation, apartment):
+    """
+    Return the LaTeX document of a letter from the letter template and the recipient's details.
+    """
+    # Sanitize the input fields to ensure they don't contain problematic LaTeX characters
+    recipient_safe = sanitize_latex(recipient)
+    salutation_safe = sanitize_latex(salutation)
+    apartment_safe = sanitize_latex(apartment)
+
+    # Create the LaTeX commands for the input fields
+    recipient_command = f"\\newcommand{{\\names}}{{{recipient_safe}}}"
+    salutation_command = f"\\newcommand{{\\salutation}}{{{salutation_safe}}}"
+    apartment_command = f"\\newcommand{{\\apartment}}{{{apartment_safe}}}"
+
+    # Sanitize the template header and body
+    header_safe = re.sub(r"(\r\n|\r|\n)+", "\n", template.header.strip())
+    body_safe = re.sub(r"(\r\n|\r|\n)+", "\n", template.body.strip())
+
+    # Combine the header, commands, and body into a complete LaTeX document
+    return f"{header_safe}\n{recipient_command}\n{salutation_command}\n{apartment_command}\n{body_safe}"
+
+
 # Define a blueprint for the "letters" feature
 letters_bp = Blueprint('letters', __name__)
 
@@ -139,6 +165,26 @@ def view_pdf():
         return redirect(url_for('letters.get_letters_html'))
 
 
+@letters_bp.route('/pdf/<filename>', methods=['GET'])
+@handle_errors
+@login_required
+def serve_pdf(filename):
+    """
+    Serve a generated letter to the browser, with ETag, Last-Modified and Range support, so that
+    reopening an unchanged letter costs a single 304.
+    """
+    from werkzeug.security import safe_join
+
+    files_letters_dir = os.path.join(current_app.root_path, "files_letters")
+    pdf_path = safe_join(files_letters_dir, filename)
+
+    if not filename.endswith('.pdf') or pdf_path is None or not os.path.exists(pdf_path):
+        flash(f'PDF file {filename} not found.', 'danger')
+        return redirect(url_for('letters.get_letters_html'))
+
+    return serve_file(pdf_path, 'application/pdf')
+
+
 @letters_bp.route('/delete_pdf', methods=['POST'])
 @handle_errors
 def delete_pdf():
@@ -184,110 +230,51 @@ def generate_letter():
     # Extract the last name from the recipient field (last word)
     last_name = recipient.split()[-1]
 
-    # Sanitize the input fields to ensure they don't contain problematic LaTeX characters
-    recipient_safe = sanitize_latex(recipient)
-    salutation_safe = sanitize_latex(salutation)
-    apartment_safe = sanitize_latex(apartment)
-
-    # Create the LaTeX commands for the input fields
-    recipient_command = f"\\newcommand{{\\names}}{{{recipient_safe}}}"
-    salutation_command = f"\\newcommand{{\\salutation}}{{{salutation_safe}}}"
-    apartment_command = f"\\newcommand{{\\apartment}}{{{apartment_safe}}}"
-
-    # Sanitize the template header and body
-    header_safe = re.sub(r"(\r\n|\r|\n)+", "\n", template.header.strip())
-    body_safe = re.sub(r"(\r\n|\r|\n)+", "\n", template.body.strip())
-
-    # Combine the header, commands, and body into a complete LaTeX document
-    tex_content = f"{header_safe}\n{recipient_command}\n{salutation_command}\n{apartment_command}\n{body_safe}"
+    tex_content = letter_source(template, recipient, salutation, apartment)
 
-    # Use the dedicated files_letters directory
-    # This avoids creating and cleaning up temporary directories for each letter generation
+    # Finished letters are kept in the dedicated files_letters directory; the LaTeX build itself
+    # runs in a private scratch workspace, so nothing but the PDF is written here
     files_letters_dir = os.path.join(current_app.root_path, "files_letters")
     if not os.path.exists(files_letters_dir):
         os.makedirs(files_letters_dir, exist_ok=True)
-        # print(f"Created files_letters directory: {files_letters_dir}")
 
     # Path to the final PDF file
     final_pdf_path = os.path.join(files_letters_dir, f"{last_name}.pdf")
 
     try:
-        # Create the .tex file
-        tex_file_path = os.path.join(files_letters_dir, f"{last_name}.tex")
-        with open(tex_file_path, 'w', encoding='utf-8') as tex_file:
-            tex_file.write(tex_content)
-
-        # Path to the output PDF file
-        temp_pdf_path = os.path.join(files_letters_dir, f"{last_name}.pdf")
-
-        try:
-            # Use xelatex from the system PATH instead of hard-coding the path
-            # print(f"Running xelatex...")
-            result = subprocess.run(
-                ["xelatex", "-interaction=nonstopmode", "-output-directory", files_letters_dir, tex_file_path],
-                cwd=files_letters_dir,
-                capture_output=True,
-                text=True
+        # Wait for a compile slot; too many letters and reports at once are turned away
+        with compile_gate.slot():
+            result = compile_pdf(
+                tex_content,
+                last_name,
+                final_pdf_path,
+                scratch_dir=current_app.config.get('REPORT_SCRATCH_DIR'),
+                # Files the template refers to are still looked up in files_letters
+                search_paths=[files_letters_dir],
+                warm_pool=pool_options(current_app.config),
+                engine=tex_engines.engine_for(tex_engines.LETTERS, current_app.config),
+                # A saved template may loop or allocate without end: bound its run
+                limits=tex_runner.limit_options(current_app.config)
             )
 
-            # Check if the PDF was generated
-            if os.path.exists(temp_pdf_path):
-                # print(f"PDF file generated successfully.")
-                pass
-            else:
-                current_app.logger.error("PDF file not generated. Check LaTeX logs for errors.")
-                if result.returncode != 0:
-                    current_app.logger.error(f"xelatex failed with return code: {result.returncode}")
-                    # Extract error messages from the output
-                    if "! " in result.stdout:
-                        error_lines = [line for line in result.stdout.split('\n') if "! " in line]
-                        for error_line in error_lines:
-                            current_app.logger.error(f"LaTeX error: {error_line.strip()}")
-
-            # Now check if we have a PDF file
-            if os.path.exists(temp_pdf_path):
-
-                # Clean up LaTeX auxiliary files
-                # print("Cleaning up LaTeX auxiliary files...")
-                # the .tex file is no longer needed, so it can be deleted as well.
-                aux_extensions = ['.aux', '.log', '.out', '.toc', '.lof', '.lot', '.fls', '.fdb_latexmk',
-                                  '.synctex.gz', '.dvi', '.tex']
-
-                # Get all files in the files_letters directory
-                for file in os.listdir(files_letters_dir):
-                    file_path = os.path.join(files_letters_dir, file)
-                    # Check if the file is a LaTeX auxiliary file
-                    if os.path.isfile(file_path) and any(file.endswith(ext) for ext in aux_extensions):
-                        try:
-                            os.remove(file_path)
-                        except Exception as del_error:
-                            current_app.logger.error(f"Error deleting auxiliary file {file}: {del_error}")
-
-                # If we reach here, the PDF was generated successfully
-                return {'success': True, 'filename': f"{last_name}.pdf"}
-            else:
-                # Check for log files that might contain error information
-                log_files = [f for f in os.listdir(files_letters_dir) if f.endswith('.log')]
-                for log_file in log_files:
-                    log_path = os.path.join(files_letters_dir, log_file)
-                    try:
-                        with open(log_path, 'r', encoding='utf-8', errors='replace') as log:
-                            log_content = log.read()
-                            # Look for common LaTeX errors in the log file
-                            if "! LaTeX Error:" in log_content:
-                                error_lines = [line for line in log_content.split('\n') if "! LaTeX Error:" in line]
-                                for error_line in error_lines:
-                                    current_app.logger.error(f"Found LaTeX error: {error_line}")
-                    except Exception:
-                        pass
-
-                return {'success': False,
-                        'error': 'Failed to generate PDF. Please check the LaTeX template and server logs for more information.'}
-        except subprocess.CalledProcessError as e:
-            return {'success': False, 'error': f'Error generating PDF: {e}'}
-        except Exception as e:
-            return {'success': False, 'error': f'Unexpected error: {e}'}
+        if result["success"]:
+            return {'success': True, 'filename': f"{last_name}.pdf"}
+
+        if result.get("run", {}).get("stopped"):
+            current_app.logger.error(f"Compiling the letter was stopped: {result['run']}")
+            return {'success': False,
+                    'error': f"{result['error'].splitlines()[0]} Please check the LaTeX template.",
+                    'run': result['run']}
+
+        current_app.logger.error("PDF file not generated. Check LaTeX logs for errors.")
+        # Extract error messages from the output
+        error_lines = [line for line in result.get("log", "").split('\n') if line.startswith("! ")]
+        for error_line in error_lines:
+            current_app.logger.error(f"LaTeX error: {error_line.strip()}")
+
+        return {'success': False,
+                'error': 'Failed to generate PDF. Please check the LaTeX template and server logs for more information.'}
+    except CompileQueueFull as e:
+        return {'success': False, 'error': str(e)}, 503, {'Retry-After': str(e.retry_after)}
     except Exception as e:
         return {'success': False, 'error': f'Unexpected error: {e}'}
-        # No need to clean up the files_letters directory as it's a permanent directory
-        # The LaTeX files will be overwritten on later letter generations
@@ -23,6 +23,7 @@ def get_offices():
                 "id": office.office_id,
                 "title": office.title,
                 "precedence": office.office_precedence,
+                "seats": office.seats,
                 "body_id": office.office_body_id,
                 "body_name": office.body.name if office.body else None
             })
@@ -37,11 +38,51 @@ def get_offices():
         "id": office.office_id,
         "title": office.title,
         "precedence": office.office_precedence,
+        "seats": office.seats,
         "body_id": office.office_body_id,
         "body_name": office.body.name if office.body else None
     } for office in offices])
 
 
+def _parse_seats(value):
+    """Return `value` as a seat count (a positive whole number), or None if it is not one."""
+    if isinstance(value, bool):
+        return None
+    try:
+        seats = int(value)
+    except (TypeError, ValueError):
+        return None
+    if seats < 1 or (isinstance(value, float) and value != seats):
+        return None
+    return seats
+
+
+@office_bp.route('/vacancies', methods=['GET'])
+@handle_errors
+@login_required
+def get_vacancies():
+    """
+    Offices with open seats: fewer active terms than seats, including offices with no terms.
+    Optional filters: body_id, and as_of=YYYY-MM-DD (default: today).
+    """
+    from datetime import date
+    from utils.vacancies import open_seats
+
+    try:
+        body_id = int(request.args['body_id']) if request.args.get('body_id') else None
+        as_of = date.fromisoformat(request.args['as_of']) if request.args.get('as_of') else None
+    except ValueError:
+        return jsonify({"error": "body_id must be a number and as_of a date (YYYY-MM-DD)"}), 400
+
+    return jsonify([{
+        "id": row.office_id,
+        "title": row.title,
+        "body_id": row.body_id,
+        "body_name": row.name,
+        "seats": row.seats,
+        "filled": row.filled,
+        "open": row.open_seats
+    } for row in open_seats(as_of, body_id)])
 
 
 @office_bp.route('/create', methods=['POST'])  # Primary route used by the frontend
@@ -74,10 +115,15 @@ def add_office():
     # Get precedence from either 'precedence' or 'office_precedence' parameter
     precedence = data.get('precedence', data.get('office_precedence', 0))
 
+    seats = _parse_seats(data.get('seats', 1))
+    if seats is None:
+        return jsonify({"success": False, "error": "Seats must be a positive whole number"}), 400
+
     new_office = Office(
         title=data['title'],
         office_precedence=precedence,
-        office_body_id=body_id
+        office_body_id=body_id,
+        seats=seats
     )
 
     db.session.add(new_office)
@@ -88,6 +134,7 @@ def add_office():
         "id": new_office.office_id,
         "title": new_office.title,
         "precedence": new_office.office_precedence,
+        "seats": new_office.seats,
         "body_id": new_office.office_body_id,
         "body_name": new_office.body.name
     })
@@ -115,6 +162,11 @@ def update_office():
         office.title = data['title']
     if 'precedence' in data:
         office.office_precedence = data['precedence']
+    if 'seats' in data:
+        seats = _parse_seats(data['seats'])
+        if seats is None:
+            return jsonify({"error": "Seats must be a positive whole number"}), 400
+        office.seats = seats
     if 'body_id' in data:
         # Verify that the body exists
         body = db.session.get(Body, data['body_id'])
@@ -128,6 +180,7 @@ def update_office():
         "id": office.office_id,
         "title": office.title,
         "precedence": office.office_precedence,
+        "seats": office.seats,
         "body_id": office.office_body_id,
         "body_name": office.body.name
     })
@@ -1,358 +1,410 @@
 # routes/report.py
 
-from flask import Blueprint, current_app
-from models.report_record import ReportRecord
-from jinja2 import Environment, FileSystemLoader
-import subprocess
+import os
+import time
+from flask import Blueprint, Response, current_app, jsonify, render_template, request, stream_with_context, url_for
 from utils.decorators import handle_errors, login_required
+from utils import graphics, latex_format, latex_pool, pdf_cache, tex_engines, tex_runner
+from utils.compile_gate import CompileQueueFull, compile_gate
+from utils.report_formats import FORMATS, to_csv, to_json
+from utils.report_jobs import build_report, report_jobs
+from utils.single_flight import single_flight
+from utils.reports import GENERATED_FORMAT, GRAPHICS, REPORTS, build_context, get_report, query_snapshot
 
 # Define the blueprint for all report-related routes
 report_bp = Blueprint("report", __name__, url_prefix="/report")
 
 
-@report_bp.route("/long")
-@handle_errors
-@login_required
-def long_form_roster():
-    from datetime import datetime
-    from collections import defaultdict
-    import os
-    from flask import jsonify
-
-    # Use the app's config for the reports directory
+def get_reports_dir():
+    """Return the absolute path of the reports directory from the app's config."""
     report_dir = current_app.config.get('REPORTS_DIR', 'files_roster_reports')
     if not os.path.isabs(report_dir):
         report_dir = os.path.join(current_app.root_path, report_dir)
+    return report_dir
 
-    tex_filename = "long_form_roster.tex"
-    pdf_filename = "long_form_roster.pdf"
-    tex_path = os.path.join(report_dir, tex_filename)
-    pdf_path = os.path.join(report_dir, pdf_filename)
-
-    # Step 1: Query and sort all records
-    records = ReportRecord.query.order_by(
-        ReportRecord.body_precedence,
-        ReportRecord.office_precedence
-    ).all()
-
-    # Step 2: Group by body name
-    grouped = defaultdict(list)
-    for r in records:
-        grouped[r.name].append(r)
-
-    # Step 3: Render LaTeX using Jinja2
-    env = Environment(
-        loader=FileSystemLoader(report_dir),
-        block_start_string='\\BLOCK{', block_end_string='}',
-        variable_start_string='\\VAR{', variable_end_string='}',
-        comment_start_string='\\%{', comment_end_string='}',
-        autoescape=False
-    )
 
-    template = env.get_template("lfr_template.tex")
-    rendered_tex = template.render(
-        generated=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        title="Long Form Roster",
-        grouped=grouped
-    )
+def prepare_build(definition, report_dir, rendered):
+    """
+    Look a rendered report (a RenderedReport) up in the PDF cache.
 
-    # Step 4: Write the .tex file
-    with open(tex_path, "w", encoding="utf-8") as f:
-        f.write(rendered_tex)
+    Returns (True, None) on a cache hit, after publishing the cached PDF, or (False, build_options)
+    with the keyword arguments for build_report on a miss.
+    """
+    from datetime import datetime
 
-    # Step 5: Clean up previous logs (optional safety)
-    for ext in [".aux", ".log", ".synctex.gz"]:
+    config = current_app.config
+    cache_dir = pdf_cache.get_cache_dir(report_dir, config)
+    key = rendered.key
+
+    if pdf_cache.lookup(cache_dir, key):
+        pdf_cache.publish(cache_dir, key, os.path.join(report_dir, rendered.pdf_filename))
+        pdf_cache.discard_sources(cache_dir, key, *(fragment_key for fragment_key, _ in rendered.fragments))
+        return True, None
+
+    # The templates and the logo are found through TEXINPUTS, since the build runs elsewhere.  The
+    # logo is converted to PDF once, and that copy comes first on the path.
+    search_paths = [report_dir, current_app.static_folder]
+    if config.get('REPORT_CONVERT_GRAPHICS', True):
+        graphics_dir = graphics.convert_graphics(current_app.static_folder, os.path.join(cache_dir, "graphics"),
+                                                 GRAPHICS)
+        search_paths.insert(1, graphics_dir)
+
+    engine = tex_engines.get_engine(tex_engines.engine_for(definition.template, config))
+    build_options = {
+        "cache_dir": cache_dir,
+        "cache_key": key,
+        "scratch_dir": config.get('REPORT_SCRATCH_DIR'),
+        "search_paths": search_paths,
+        # Date the PDF by its generated timestamp so that identical sources give identical bytes
+        "source_date_epoch": datetime.strptime(rendered.generated, GENERATED_FORMAT).timestamp(),
+        "engine": engine.name,
+        "limits": tex_runner.limit_options(config),
+        "prune": pdf_cache.prune_options(config),
+    }
+    if rendered.fragments:
+        build_options["fragments"] = rendered.fragments
+    warm_pool = latex_pool.pool_options(config)
+    if warm_pool and engine.precompiled:
+        build_options["warm_pool"] = warm_pool
+    if config.get('REPORT_PRECOMPILED_FORMAT', True) and engine.precompiled:
+        # Start from the dumped preamble, once it exists: it is dumped in the background under a
+        # compile slot on first use and whenever the preamble changes
+        build_options["fmt"] = latex_format.get_format(report_dir, cache_dir, build_options["scratch_dir"],
+                                                       search_paths, build_options["limits"],
+                                                       slot=compile_gate.slot, wait=False)
+    return False, build_options
+
+
+def renders_direct(definition):
+    """Whether a report's PDF is written in-process (REPORT_DIRECT_PDF) rather than compiled."""
+    return (not definition.sections and definition.kind in current_app.config.get('REPORT_DIRECT_PDF', ())
+            and bool(definition.columns))
+
+
+def render_direct(definition, report_dir, context, records=None):
+    """
+    Write a report's PDF with utils/pdf_report.py, without TeX, and return its filename.  The PDF
+    does not go through the cache, so the cached build published under that name is forgotten.
+    """
+    filename = f"{definition.file_stem(context)}.pdf"
+    logo_path = os.path.join(current_app.static_folder, f"{GRAPHICS[0]}.jpg")
+    definition.render_pdf(os.path.join(report_dir, filename), context, logo_path, records=records)
+    pdf_cache.unmark_published(pdf_cache.get_cache_dir(report_dir, current_app.config), filename)
+    return filename
+
+
+def stale_age(definition, report_dir, rendered):
+    """
+    Return the age in seconds of the PDF last published under this build's file name, if the
+    report may be served that stale (REPORT_MAX_STALE, seconds by report kind), or else None.
+    """
+    max_stale = current_app.config.get('REPORT_MAX_STALE', {}).get(definition.kind)
+    if not max_stale or not os.path.exists(os.path.join(report_dir, rendered.pdf_filename)):
+        return None
+
+    cache_dir = pdf_cache.get_cache_dir(report_dir, current_app.config)
+    key = pdf_cache.published_key(cache_dir, rendered.pdf_filename)
+    cached_path = pdf_cache.lookup(cache_dir, key) if key else None
+    if cached_path is None:
+        return None
+    age = time.time() - os.path.getmtime(cached_path)
+    return age if age <= max_stale else None
+
+
+def stale_response(rendered, age, job=None):
+    """The previous PDF of a report, marked stale (JSON field and X-Report-Stale header), and its rebuild job."""
+    data = {"success": True, "status": "done", "filename": rendered.pdf_filename, "cached": True,
+            "stale": True, "stale_seconds": int(age)}
+    if job is not None:
+        data["job_id"] = job.id
+        data["status_url"] = url_for("report.job_status", job_id=job.id)
+    response = jsonify(data)
+    response.headers["X-Report-Stale"] = str(int(age))
+    return response
+
+
+def busy_response(error):
+    """503 for a compile turned away by the compile gate, telling the client when to retry."""
+    response = jsonify({"success": False, "error": str(error), "retry_after": error.retry_after})
+    response.status_code = 503
+    response.headers["Retry-After"] = str(error.retry_after)
+    return response
+
+
+def discard_sources(build_options, rendered):
+    """Remove the spooled sources of a build that was turned away; nothing will compile them."""
+    pdf_cache.discard_sources(build_options["cache_dir"], rendered.key,
+                              *(fragment_key for fragment_key, _ in rendered.fragments))
+
+
+def _submit(definition, report_dir, rendered, build_options, check_queue=True):
+    """
+    Queue a compile on the report job pool, unless the queue is full (CompileQueueFull).  A batch
+    checks the queue once up front instead (check_queue=False for its jobs), and a compile already
+    queued is shared without adding to the queue.
+    """
+    if check_queue and not report_jobs.in_flight(build_options["cache_key"]):
+        compile_gate.check_queue(report_jobs.pending())
+    return report_jobs.submit(definition.kind, rendered.tex, rendered.name, report_dir,
+                              coalesce_key=build_options["cache_key"], compile_slots=compile_gate.slot_options(),
+                              **build_options)
+
+
+def _build_response(definition, report_dir, rendered):
+    """
+    Compile a rendered report, or reuse the cached PDF of an identical source, and build the response.
+
+    On a cache hit the cached PDF is published straight away.  Otherwise a GET compiles inline and
+    answers with the filename once the PDF exists, while a POST queues the compile on the report job
+    pool and answers 202 with the job id and the URL to poll.  Either way the compile waits for a
+    slot of the compile gate, and the request is answered 503 when too many are waiting already.
+
+    Identical concurrent requests share one build: a GET waits for the build already running in
+    this process (or, through its lock file, in another), a POST is given the job already queued.
+
+    Stale-while-revalidate: when the report's previous PDF is recent enough (REPORT_MAX_STALE), it
+    is returned straight away, marked stale, and the fresh build is queued in the background.
+    """
+    cached, build_options = prepare_build(definition, report_dir, rendered)
+    if cached:
+        return jsonify({"success": True, "status": "done", "filename": rendered.pdf_filename, "cached": True})
+
+    age = stale_age(definition, report_dir, rendered)
+    if age is not None:
         try:
-            os.remove(os.path.join(report_dir, f"long_form_roster{ext}"))
-        except FileNotFoundError:
-            pass
-
-    # Step 6: Compile with xelatex using the absolute path
-    result = subprocess.run(
-        ["xelatex", "-interaction=nonstopmode", "-output-directory", report_dir, tex_path],
-        cwd=report_dir,
-        capture_output=True,
-        text=True
-    )
-
-    if not os.path.exists(pdf_path):
-        return (
-            f"PDF not found.\n\n"
-            f"LaTeX stdout:\n{result.stdout}\n\n"
-            f"LaTeX stderr:\n{result.stderr}",
-            500
+            job = _submit(definition, report_dir, rendered, build_options)
+        except CompileQueueFull:
+            # The stale copy will do; a later request renders and queues the rebuild afresh
+            discard_sources(build_options, rendered)
+            job = None
+        return stale_response(rendered, age, job)
+
+    try:
+        if request.method == "POST":
+            job = _submit(definition, report_dir, rendered, build_options)
+            response = job.to_dict()
+            response["status_url"] = url_for("report.job_status", job_id=job.id)
+            return jsonify(response), 202
+
+        result = single_flight.do(
+            build_options["cache_key"],
+            lambda: build_report(rendered.tex, rendered.name, report_dir, slot=compile_gate.slot, **build_options)
         )
+    except CompileQueueFull as e:
+        discard_sources(build_options, rendered)
+        return busy_response(e)
 
-    # Step 7: Clean up intermediate files
-    for ext in [".aux", ".log"]:
-        try:
-            os.remove(os.path.join(report_dir, f"long_form_roster{ext}"))
-        except FileNotFoundError:
-            pass
+    if not result["success"]:
+        if result.get("run", {}).get("stopped"):
+            # Stopped by a limit of utils/tex_runner.py: say which, for the client to show
+            current_app.logger.warning(f"Building the {definition.kind} report was stopped: {result['run']}")
+            return jsonify({"success": False, "error": result["error"], "run": result["run"]}), 500
+        return result["error"], 500
 
     # Return JSON response with the filename
-    return jsonify({"success": True, "filename": pdf_filename})
+    return jsonify(dict(result, cached=False))
 
 
-@report_bp.route("/short")
+@report_bp.route("/jobs/<job_id>")
 @handle_errors
 @login_required
-def short_form_roster():
-    from datetime import datetime
-    from collections import defaultdict
-    import os
-    from flask import jsonify
-
-    # Use the app's config for the reports directory
-    report_dir = current_app.config.get('REPORTS_DIR', 'files_roster_reports')
-    if not os.path.isabs(report_dir):
-        report_dir = os.path.join(current_app.root_path, report_dir)
+def job_status(job_id):
+    """Return the status of a queued report build and, once done, the resulting filename."""
+    job = report_jobs.get(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": "Report job not found"}), 404
 
-    tex_filename = "short_form_roster.tex"
-    pdf_filename = "short_form_roster.pdf"
-    tex_path = os.path.join(report_dir, tex_filename)
-    pdf_path = os.path.join(report_dir, pdf_filename)
-
-    # Step 1: Query and sort all records
-    records = ReportRecord.query.order_by(
-        ReportRecord.body_precedence,
-        ReportRecord.office_precedence
-    ).all()
-
-    # Step 2: Group by body name
-    grouped = defaultdict(list)
-    for r in records:
-        grouped[r.name].append(r)
-
-    # Step 3: Render LaTeX using Jinja2
-    env = Environment(
-        loader=FileSystemLoader(report_dir),
-        block_start_string='\\BLOCK{', block_end_string='}',
-        variable_start_string='\\VAR{', variable_end_string='}',
-        comment_start_string='\\%{', comment_end_string='}',
-        autoescape=False
-    )
-
-    template = env.get_template("sfr_template.tex")
-    rendered_tex = template.render(
-        generated=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        title="Short Form Roster",
-        grouped=grouped
-    )
-
-    # Step 4: Write the LaTeX source
-    with open(tex_path, "w", encoding="utf-8") as f:
-        f.write(rendered_tex)
+    return jsonify(job.to_dict())
 
-    # Step 5: Clean up old auxiliary files
-    for ext in [".aux", ".log", ".synctex.gz"]:
-        try:
-            os.remove(os.path.join(report_dir, f"short_form_roster{ext}"))
-        except FileNotFoundError:
-            pass
-
-    # Step 6: Compile to PDF
-    result = subprocess.run(
-        ["xelatex", "-interaction=nonstopmode", "-output-directory", report_dir, tex_path],
-        cwd=report_dir,
-        capture_output=True,
-        text=True
-    )
-
-    if not os.path.exists(pdf_path):
-        return (
-            f"PDF not found.\n\n"
-            f"LaTeX stdout:\n{result.stdout}\n\n"
-            f"LaTeX stderr:\n{result.stderr}",
-            500
-        )
 
-    # Step 7: Clean up intermediate files
-    for ext in [".aux", ".log"]:
-        try:
-            os.remove(os.path.join(report_dir, f"short_form_roster{ext}"))
-        except FileNotFoundError:
-            pass
-
-    # Return JSON response with the filename
-    return jsonify({"success": True, "filename": pdf_filename})
-
-
-@report_bp.route("/expirations")
+@report_bp.route("/gate")
 @handle_errors
 @login_required
-def expirations_report():
-    from datetime import datetime
-    from collections import defaultdict
-    import os
-    from flask import jsonify
-
-    # Use the app's config for the reports directory
-    report_dir = current_app.config.get('REPORTS_DIR', 'files_roster_reports')
-    if not os.path.isabs(report_dir):
-        report_dir = os.path.join(current_app.root_path, report_dir)
-
-    tex_filename = "expirations_report.tex"
-    pdf_filename = "expirations_report.pdf"
-    tex_path = os.path.join(report_dir, tex_filename)
-    pdf_path = os.path.join(report_dir, pdf_filename)
-
-    # Determine current year for filter and title
-    current_year = datetime.now().year
-
-    # Step 1: Filter by terms expiring this year
-    records = ReportRecord.query.filter(
-        ReportRecord.end.between(f"{current_year}-01-01", f"{current_year}-12-31")
-    ).order_by(
-        ReportRecord.body_precedence,
-        ReportRecord.office_precedence
-    ).all()
-
-    # Step 2: Group and format end date
-    grouped = defaultdict(list)
-    for r in records:
-        r.formatted_end = r.end.strftime("%Y-%m-%d") if r.end else ""
-        grouped[r.name].append(r)
-
-    # Step 3: Render LaTeX via Jinja2
-    env = Environment(
-        loader=FileSystemLoader(report_dir),
-        block_start_string='\\BLOCK{', block_end_string='}',
-        variable_start_string='\\VAR{', variable_end_string='}',
-        comment_start_string='\\%{', comment_end_string='}',
-        autoescape=False
-    )
-
-    template = env.get_template("expirations_template.tex")
-    rendered_tex = template.render(
-        generated=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        title=f"Expirations — {current_year}",
-        grouped=grouped
-    )
+def gate_metrics():
+    """Queue depth, wait times and rejections of the compile gate, for sizing its limits."""
+    metrics = compile_gate.metrics()
+    metrics["jobs_pending"] = report_jobs.pending()
+    metrics["builds_in_flight"] = single_flight.in_flight()
+    metrics["builds_coalesced"] = single_flight.coalesced + report_jobs.coalesced
+    return jsonify(metrics)
 
-    # Step 4: Write the LaTeX file
-    with open(tex_path, "w", encoding="utf-8") as f:
-        f.write(rendered_tex)
 
-    # Step 5: Clean up old temp files
-    for ext in [".aux", ".log", ".synctex.gz"]:
-        try:
-            os.remove(os.path.join(report_dir, f"expirations_report{ext}"))
-        except FileNotFoundError:
-            pass
-
-    # Step 6: Compile with xelatex
-    result = subprocess.run(
-        ["xelatex", "-interaction=nonstopmode", "-output-directory", report_dir, tex_path],
-        cwd=report_dir,
-        capture_output=True,
-        text=True
-    )
-
-    if not os.path.exists(pdf_path):
-        return (
-            f"PDF not found.\n\n"
-            f"LaTeX stdout:\n{result.stdout}\n\n"
-            f"LaTeX stderr:\n{result.stderr}",
-            500
-        )
-
-    # Step 7: Clean up intermediate files
-    for ext in [".aux", ".log"]:
+@report_bp.route("/all", methods=["GET", "POST"])
+@handle_errors
+@login_required
+def build_all():
+    """
+    Build every registered report from one snapshot of the roster.
+
+    The records of all reports are read with a single query, the templates are rendered, and the
+    compiles that miss the cache run concurrently on the report job pool.  The response lists the
+    filename (or error) of each report once all of them are done.
+
+    The meeting binder repeats the other reports in one document, so it is built only when asked
+    for with binder=1.
+    """
+    report_dir = get_reports_dir()
+    context = build_context()
+    with_binders = request.values.get("binder", "").lower() in ("1", "true", "yes")
+    definitions = [definition for definition in REPORTS.values() if with_binders or not definition.sections]
+    try:
+        # The reports are admitted as one batch: with few compile slots the batch alone could
+        # otherwise fill the queue and turn its own last reports away
+        compile_gate.check_queue(report_jobs.pending())
+    except CompileQueueFull as e:
+        return busy_response(e)
+    if with_binders:
+        # Keep the binders fresh after data changes from now on (see utils/prebuild.py)
+        from utils.prebuild import prebuilder
+        for definition in definitions:
+            if definition.sections:
+                prebuilder.remember(definition, context, {})
+    snapshot = query_snapshot(definitions, context)
+
+    results = {}
+    jobs = {}
+    for definition in definitions:
+        if renders_direct(definition):
+            filename = render_direct(definition, report_dir, context, records=snapshot[definition.kind])
+            results[definition.kind] = {"success": True, "filename": filename, "cached": False}
+            continue
+        rendered = definition.render_build(report_dir, current_app.config, context,
+                                           records=snapshot[definition.kind])
+        cached, build_options = prepare_build(definition, report_dir, rendered)
+        if cached:
+            results[definition.kind] = {"success": True, "filename": rendered.pdf_filename, "cached": True}
+        else:
+            jobs[definition.kind] = _submit(definition, report_dir, rendered, build_options, check_queue=False)
+
+    # The queued compiles run side by side; wait for the slowest
+    for kind, job in jobs.items():
         try:
-            os.remove(os.path.join(report_dir, f"expirations_report{ext}"))
-        except FileNotFoundError:
-            pass
+            result = job.future.result()
+        except Exception as e:
+            result = {"success": False, "error": f"Report build failed: {e}"}
+        results[kind] = dict(result, cached=False)
 
-    # Return JSON response with the filename
-    return jsonify({"success": True, "filename": pdf_filename})
+    return jsonify({
+        "success": all(result["success"] for result in results.values()),
+        "filenames": [result["filename"] for result in results.values() if result["success"]],
+        "reports": results
+    })
 
 
-@report_bp.route("/vacancies")
+@report_bp.route("/export")
 @handle_errors
 @login_required
-def vacancies_report():
-    from datetime import datetime
-    from collections import defaultdict
-    import os
-    from flask import jsonify
-
-    # Use the app's config for the reports directory
-    report_dir = current_app.config.get('REPORTS_DIR', 'files_roster_reports')
-    if not os.path.isabs(report_dir):
-        report_dir = os.path.join(current_app.root_path, report_dir)
-
-    tex_filename = "vacancies_report.tex"
-    pdf_filename = "vacancies_report.pdf"
-    tex_path = os.path.join(report_dir, tex_filename)
-    pdf_path = os.path.join(report_dir, pdf_filename)
-
-    # Query and sort all records
-    records = ReportRecord.query.filter(
-        ReportRecord.first.like('(Vacan%')
-    ).order_by(
-        ReportRecord.body_precedence,
-        ReportRecord.office_precedence
-    ).all()
-
-    # Group by body and tag vacancies
-    grouped = defaultdict(list)
-    for r in records:
-        is_vacant = (r.first and r.first.startswith("(Vacan") and r.last == " ")
-        full_name = r.first if is_vacant else f"{r.first or ''} {r.last or ''}".strip()
-
-        r.is_vacant = is_vacant
-        r.incumbent_display = full_name
-        grouped[r.name].append(r)
-
-    # Render LaTeX via Jinja2
-    env = Environment(
-        loader=FileSystemLoader(report_dir),
-        block_start_string='\\BLOCK{', block_end_string='}',
-        variable_start_string='\\VAR{', variable_end_string='}',
-        comment_start_string='\\%{', comment_end_string='}',
-        autoescape=False
-    )
-
-    template = env.get_template("vacancies_template.tex")
-    rendered_tex = template.render(
-        generated=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        title="Vacancies",
-        grouped=grouped
+def export():
+    """
+    Stream the roster rows as CSV (default) or XLSX (?format=xlsx), in constant memory.
+
+    Filters, all optional:
+        body=<body_id>      one body
+        expiring=<year>     terms ending in that year, as in the expirations report
+        vacant=1            the offices with open seats (body, office, seats, filled, open) instead of
+                            terms, as in the vacancies report; combines with body only
+    """
+    from models.report_record import ReportRecord
+    from utils.exports import HEADINGS, VACANCY_HEADINGS, iter_rows, iter_vacancies, stream_csv, stream_xlsx
+    from utils.reports import expiring_in
+
+    vacant = request.args.get("vacant", "").lower() in ("1", "true", "yes")
+    try:
+        body_id = int(request.args["body"]) if request.args.get("body") else None
+        expiring = int(request.args["expiring"]) if request.args.get("expiring") else None
+    except ValueError:
+        return jsonify({"success": False, "error": "body and expiring must be numbers"}), 400
+
+    if vacant:
+        if expiring is not None:
+            return jsonify({"success": False, "error": "vacant cannot be combined with expiring"}), 400
+        rows, headings = iter_vacancies(body_id), VACANCY_HEADINGS
+    else:
+        conditions = []
+        if body_id is not None:
+            conditions.append(ReportRecord.body_id == body_id)
+        if expiring is not None:
+            conditions.append(expiring_in(expiring))
+        rows, headings = iter_rows(conditions), HEADINGS
+
+    output_format = request.args.get("format", "csv").lower()
+    if output_format == "csv":
+        body, mimetype = stream_csv(rows, headings), "text/csv"
+    elif output_format == "xlsx":
+        body = stream_xlsx(rows, headings)
+        mimetype = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    else:
+        return jsonify({"success": False, "error": f"Unknown format: {output_format}"}), 400
+
+    # The rows are read while the response is sent, so the request (and its session) must stay open
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename=roster_export.{output_format}"}
     )
 
-    with open(tex_path, "w", encoding="utf-8") as f:
-        f.write(rendered_tex)
 
-    # Clean old log-related files just in case
-    for ext in [".aux", ".log", ".synctex.gz"]:
-        try:
-            os.remove(os.path.join(report_dir, f"vacancies_report{ext}"))
-        except FileNotFoundError:
-            pass
-
-    # Compile LaTeX
-    result = subprocess.run(
-        ["xelatex", "-interaction=nonstopmode", "-output-directory", report_dir, tex_path],
-        cwd=report_dir,
-        capture_output=True,
-        text=True
-    )
-
-    if not os.path.exists(pdf_path):
-        return (
-            f"PDF not found.\n\n"
-            f"LaTeX stdout:\n{result.stdout}\n\n"
-            f"LaTeX stderr:\n{result.stderr}",
-            500
+def _render_format(definition, context, output_format):
+    """Render a report as HTML, CSV or JSON straight from the query, without LaTeX."""
+    grouped = definition.group(definition.query(context))
+    title = definition.get_title(context)
+    generated = context["now"].strftime(GENERATED_FORMAT)
+
+    if output_format == "html":
+        # The CSV and JSON links keep the report's parameters (body_id, office_id, ...)
+        export_args = request.args.to_dict(flat=False)
+        for name in ("format", "kind"):
+            export_args.pop(name, None)
+        return render_template("report.html", definition=definition, grouped=grouped, title=title,
+                               generated=generated, export_args=export_args)
+    if output_format == "csv":
+        return Response(
+            to_csv(definition, grouped),
+            mimetype="text/csv",
+            headers={"Content-Disposition": f"attachment; filename={definition.file_stem(context)}.csv"}
         )
+    return jsonify(to_json(definition, grouped, title, generated))
 
-    # Step 7: Clean up intermediate files
-    for ext in [".aux", ".log"]:
-        try:
-            os.remove(os.path.join(report_dir, f"vacancies_report{ext}"))
-        except FileNotFoundError:
-            pass
 
-    # Return JSON response with the filename
-    return jsonify({"success": True, "filename": pdf_filename})
+@report_bp.route("/<kind>", methods=["GET", "POST"])
+@handle_errors
+@login_required
+def build(kind):
+    """
+    Build one of the registered reports (long, short, expirations, vacancies, and the binder of
+    all four).  See utils/reports.py for their definitions.
+
+    ?format=html, csv or json returns the report straight away in that form; the default, pdf,
+    compiles the print version.  Reports with parameters read them from the query string too, e.g.
+    /report/expirations?within_days=90 or ?start=2025-01-01&end=2027-12-31.
+    """
+    definition = get_report(kind)
+    if definition is None:
+        return jsonify({"success": False, "error": f"Unknown report: {kind}"}), 404
+
+    output_format = request.args.get("format", "pdf").lower()
+    if output_format not in FORMATS:
+        return jsonify({"success": False, "error": f"Unknown format: {output_format}"}), 400
+    try:
+        context = definition.with_params(build_context(), request.args)
+    except ValueError as e:
+        return jsonify({"success": False, "error": f"Invalid report parameters: {e}"}), 400
+
+    if output_format != "pdf":
+        if definition.sections:
+            return jsonify({"success": False, "error": "The binder is only available as a PDF"}), 400
+        return _render_format(definition, context, output_format)
+
+    if definition.sections or (definition.variant and definition.variant(context)):
+        # Keep this binder, subset (or window) fresh after data changes, as the whole reports are
+        from utils.prebuild import prebuilder
+        prebuilder.remember(definition, context, request.args)
+
+    report_dir = get_reports_dir()
+    if renders_direct(definition):
+        filename = render_direct(definition, report_dir, context)
+        return jsonify({"success": True, "status": "done", "filename": filename, "cached": False})
+
+    rendered = definition.render_build(report_dir, current_app.config, context)
+
+    return _build_response(definition, report_dir, rendered)
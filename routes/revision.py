@@ -0,0 +1,23 @@
+from flask import Blueprint, jsonify, request
+from utils.decorators import handle_errors, login_required
+from utils.revisions import get_revisions, combined_revision
+
+# Define a blueprint for the data revision counters
+revision_bp = Blueprint('revision', __name__)
+
+
+@revision_bp.route('', methods=['GET'])
+@handle_errors
+@login_required
+def get_revision():
+    """
+    Return the revision of each roster table and their combined revision.
+    The combined revision doubles as the ETag, so pollers can ask with If-None-Match.
+    """
+    revisions = get_revisions()
+    revision = combined_revision(revisions)
+
+    response = jsonify({"revision": revision, "tables": revisions})
+    response.set_etag(str(revision))
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
@@ -140,6 +140,42 @@ def authenticated_client(app, client):
 
     return client
 
+@pytest.fixture
+def report_templates(app):
+    """Point REPORTS_DIR at a temporary directory holding minimal report templates."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for filename in ["lfr_template.tex", "sfr_template.tex", "expirations_template.tex",
+                         "vacancies_template.tex", "binder_template.tex"]:
+            with open(os.path.join(temp_dir, filename), "w", encoding="utf-8") as f:
+                f.write("\\documentclass{article}\n\\begin{document}\n\\VAR{title}\n\\end{document}")
+        # The per-body templates, which the binder's sections use
+        for filename in ["lfr_body.tex", "sfr_body.tex", "expirations_body.tex", "vacancies_body.tex"]:
+            with open(os.path.join(temp_dir, filename), "w", encoding="utf-8") as f:
+                f.write("\\VAR{body_name}")
+
+        original_reports_dir = app.config['REPORTS_DIR']
+        app.config['REPORTS_DIR'] = temp_dir
+        yield temp_dir
+        app.config['REPORTS_DIR'] = original_reports_dir
+
+
+@pytest.fixture
+def fake_compile(monkeypatch):
+    """Replace the xelatex compile step with one that writes a mock PDF and records each call."""
+    from utils import latex
+
+    calls = []
+
+    def compile_pdf(tex_source, jobname, dest_path, **kwargs):
+        calls.append(jobname)
+        with open(dest_path, "w") as f:
+            f.write(f"Mock PDF content for {jobname}")
+        return {"success": True, "path": dest_path}
+
+    monkeypatch.setattr(latex, "compile_pdf", compile_pdf)
+    return calls
+
+
 @pytest.fixture
 def test_data(app):
     """Create test data for the database."""
@@ -0,0 +1,125 @@
+# tests/test_compile_gate.py
+
+import threading
+import time
+
+import pytest
+
+from utils.compile_gate import CompileGate, CompileQueueFull, acquire_file_slot, compile_gate, release_file_slot
+
+
+@pytest.fixture
+def small_gate(app, tmp_path):
+    """The app's compile gate with one slot, no waiting room and a short wait."""
+    app.config.update(REPORT_COMPILE_SLOTS=1, REPORT_COMPILE_QUEUE=0, REPORT_COMPILE_WAIT=0.2,
+                      REPORT_COMPILE_LOCK_DIR=str(tmp_path / "slots"))
+    compile_gate.init_app(app)
+    yield compile_gate
+    for key in ("REPORT_COMPILE_SLOTS", "REPORT_COMPILE_QUEUE", "REPORT_COMPILE_WAIT", "REPORT_COMPILE_LOCK_DIR"):
+        app.config.pop(key)
+    compile_gate.init_app(app)
+
+
+def test_gate_queues_then_rejects(app, tmp_path):
+    """Compiles beyond the slots wait in the queue; beyond the queue they are turned away."""
+    app.config.update(REPORT_COMPILE_SLOTS=1, REPORT_COMPILE_QUEUE=1, REPORT_COMPILE_WAIT=5,
+                      REPORT_COMPILE_LOCK_DIR=str(tmp_path / "slots"))
+    gate = CompileGate()
+    gate.init_app(app)
+
+    waiter_done = threading.Event()
+
+    def waiter():
+        with gate.slot():
+            waiter_done.set()
+
+    with gate.slot():
+        thread = threading.Thread(target=waiter)
+        thread.start()
+        while gate.metrics()["waiting"] < 1:
+            time.sleep(0.01)
+
+        with pytest.raises(CompileQueueFull) as excinfo:
+            with gate.slot():
+                pass
+        assert excinfo.value.retry_after >= 1
+        assert not waiter_done.is_set()
+
+    thread.join(5)
+    assert waiter_done.is_set()
+    metrics = gate.metrics()
+    assert metrics["admitted"] == 2
+    assert metrics["rejected"] == 1
+    assert metrics["waiting"] == 0 and metrics["running"] == 0
+
+
+def test_slots_are_shared_across_processes(app, tmp_path):
+    """A slot held through the lock files (as by another process) blocks this process as well."""
+    app.config.update(REPORT_COMPILE_SLOTS=1, REPORT_COMPILE_WAIT=0.2, REPORT_COMPILE_LOCK_DIR=str(tmp_path))
+    gate = CompileGate()
+    gate.init_app(app)
+
+    held = acquire_file_slot(str(tmp_path), 1, timeout=0)
+    try:
+        with pytest.raises(CompileQueueFull):
+            with gate.slot():
+                pass
+    finally:
+        release_file_slot(held)
+
+    with gate.slot():
+        assert gate.metrics()["running"] == 1
+
+
+def test_busy_report_returns_503(authenticated_client, test_data, report_templates, fake_compile, small_gate):
+    """When no slot frees up the report endpoint answers 503 with Retry-After."""
+    held = acquire_file_slot(small_gate.lock_dir, 1, timeout=0)
+    try:
+        response = authenticated_client.get("/report/long")
+    finally:
+        release_file_slot(held)
+
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+    assert response.get_json()["success"] is False
+    assert fake_compile == []
+
+    assert authenticated_client.get("/report/long").status_code == 200
+    metrics = authenticated_client.get("/report/gate").get_json()
+    assert metrics["rejected"] == 1
+    assert metrics["admitted"] == 1
+
+
+def test_build_all_is_admitted_as_one_batch(app, authenticated_client, test_data, report_templates, fake_compile,
+                                            monkeypatch, tmp_path):
+    """/report/all is turned away whole when the queue is full, and once admitted none of its reports is."""
+    from utils import latex
+    from utils.report_jobs import report_jobs
+
+    app.config.update(REPORT_COMPILE_SLOTS=1, REPORT_COMPILE_QUEUE=0, REPORT_COMPILE_WAIT=10,
+                      REPORT_COMPILE_LOCK_DIR=str(tmp_path / "slots"))
+    compile_gate.init_app(app)
+    report_jobs.shutdown()
+    monkeypatch.setattr(report_jobs, "backend", "thread")
+    try:
+        # The queue is full: nothing of the batch is queued
+        pending = report_jobs.pending
+        monkeypatch.setattr(report_jobs, "pending", lambda: 1)
+        response = authenticated_client.get("/report/all")
+        assert response.status_code == 503
+        assert fake_compile == []
+
+        # An empty queue admits the batch, although its jobs alone exceed slots plus queue
+        monkeypatch.setattr(report_jobs, "pending", pending)
+        compile_pdf = latex.compile_pdf
+        monkeypatch.setattr(latex, "compile_pdf", lambda *args, **kwargs: time.sleep(0.05) or compile_pdf(*args, **kwargs))
+        response = authenticated_client.get("/report/all")
+        data = response.get_json()
+        assert response.status_code == 200
+        assert data["success"] is True
+        assert len(fake_compile) == len(data["reports"]) > 1
+    finally:
+        report_jobs.shutdown()
+        for key in ("REPORT_COMPILE_SLOTS", "REPORT_COMPILE_QUEUE", "REPORT_COMPILE_WAIT", "REPORT_COMPILE_LOCK_DIR"):
+            app.config.pop(key)
+        compile_gate.init_app(app)
@@ -338,3 +338,148 @@ ORDER BY body.body_precedence;
                     assert "\\item Test Office 1: John Doe" in content
                     assert "\\item Test Office 2: Jane Smith" in content
                     assert "\\item Test Office 3: Bob Johnson" in content
+
+
+def test_compile_pdf_uses_private_workspace(tmp_path, monkeypatch):
+    """Compiles run in a scratch workspace and only the finished PDF reaches the destination."""
+    import subprocess
+    from utils import latex
+
+    scratch_dir = tmp_path / "scratch"
+    dest_dir = tmp_path / "reports"
+    dest_dir.mkdir()
+    seen = {}
+
+    def mock_run(args, cwd=None, env=None, **kwargs):
+        seen["cwd"] = cwd
+        seen["texinputs"] = env["TEXINPUTS"]
+        tex_path = args[-1]
+        for ext in (".pdf", ".aux", ".log"):
+            with open(tex_path.replace(".tex", ext), "w") as f:
+                f.write("Mock output")
+        return subprocess.CompletedProcess(args, 0, stdout="", stderr="")
+
+    monkeypatch.setattr(subprocess, "run", mock_run)
+
+    result = latex.compile_pdf("\\documentclass{article}", "roster", str(dest_dir / "roster.pdf"),
+                               scratch_dir=str(scratch_dir), search_paths=["/templates"])
+
+    assert result["success"] is True
+    assert os.listdir(dest_dir) == ["roster.pdf"]
+    assert os.path.dirname(seen["cwd"]) == str(scratch_dir)
+    assert seen["texinputs"].startswith("/templates" + os.pathsep)
+    # The workspace is removed after the build
+    assert os.listdir(scratch_dir) == []
+
+
+def test_compile_pdf_starts_from_format(tmp_path, monkeypatch):
+    """A precompiled format is passed to xelatex by name and found through TEXFORMATS."""
+    import subprocess
+    from utils import latex
+
+    seen = {}
+
+    def mock_run(args, env=None, **kwargs):
+        seen["args"] = args
+        seen["texformats"] = env["TEXFORMATS"]
+        with open(args[-1].replace(".tex", ".pdf"), "w") as f:
+            f.write("Mock PDF")
+        return subprocess.CompletedProcess(args, 0, stdout="", stderr="")
+
+    monkeypatch.setattr(subprocess, "run", mock_run)
+
+    format_path = tmp_path / "formats" / "roster_preamble-0123456789abcdef.fmt"
+    result = latex.compile_pdf("\\input{roster_preamble}\n\\endofdump", "roster", str(tmp_path / "roster.pdf"),
+                               fmt=str(format_path))
+
+    assert result["success"] is True
+    assert "-fmt=roster_preamble-0123456789abcdef" in seen["args"]
+    assert seen["texformats"].startswith(str(tmp_path / "formats") + os.pathsep)
+
+
+def test_failed_format_dump_is_not_retried(tmp_path, monkeypatch):
+    """A format that cannot be dumped is tried once per preamble, in the background and under a slot."""
+    import time
+    from contextlib import contextmanager
+    from utils import latex_format, tex_runner
+
+    report_dir = tmp_path / "reports"
+    report_dir.mkdir()
+    (report_dir / latex_format.PREAMBLE).write_text("\\documentclass{article}", encoding="utf-8")
+    cache_dir = str(tmp_path / "cache")
+
+    runs, slots = [], []
+
+    def failing_run(command, cwd=None, env=None, limits=None):
+        runs.append(command)
+        return tex_runner.RunResult(command, 1, "! LaTeX Error: File `mylatexformat.ltx' not found.", False, 0.1,
+                                    False, dict(tex_runner.DEFAULT_LIMITS))
+
+    @contextmanager
+    def slot():
+        slots.append(True)
+        yield
+
+    monkeypatch.setattr(latex_format, "engine_version", lambda: "XeTeX 3.14")
+    monkeypatch.setattr(tex_runner, "run", failing_run)
+
+    assert latex_format.get_format(str(report_dir), cache_dir, slot=slot, wait=False) is None
+    name = latex_format.format_name(str(report_dir / latex_format.PREAMBLE))
+    failed = latex_format.failed_path(os.path.join(cache_dir, "formats"), name)
+    deadline = time.time() + 5
+    while not os.path.exists(failed) and time.time() < deadline:
+        time.sleep(0.01)
+    assert "mylatexformat.ltx" in open(failed, encoding="utf-8").read()
+    assert len(runs) == 1 and slots == [True]
+
+    assert latex_format.get_format(str(report_dir), cache_dir, slot=slot) is None
+    assert latex_format.get_format(str(report_dir), cache_dir, slot=slot, wait=False) is None
+    assert len(runs) == 1
+
+    # A new preamble is tried again
+    (report_dir / latex_format.PREAMBLE).write_text("\\documentclass{report}", encoding="utf-8")
+    assert latex_format.get_format(str(report_dir), cache_dir) is None
+    assert len(runs) == 2
+
+
+def test_format_name_follows_preamble(tmp_path):
+    """Editing the shared preamble gives its format a new name, so it is rebuilt."""
+    from utils import latex_format
+
+    preamble_path = tmp_path / latex_format.PREAMBLE
+    preamble_path.write_text("\\documentclass{article}", encoding="utf-8")
+    before = latex_format.format_name(str(preamble_path))
+    assert before.startswith("roster_preamble-")
+
+    preamble_path.write_text("\\documentclass{article}\n\\usepackage{graphicx}", encoding="utf-8")
+    assert latex_format.format_name(str(preamble_path)) != before
+
+
+def test_report_templates_share_preamble():
+    """Every roster template loads the shared preamble and ends the dumped part with \\endofdump."""
+    report_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "files_roster_reports")
+    for template_name in ["lfr_template.tex", "sfr_template.tex", "expirations_template.tex",
+                          "vacancies_template.tex", "lfr_fragment.tex", "roster_merge.tex",
+                          "binder_template.tex"]:
+        with open(os.path.join(report_dir, template_name), "r", encoding="utf-8") as f:
+            content = f.read()
+        assert content.startswith("\\input{roster_preamble}\n\\endofdump\n")
+        assert "\\documentclass" not in content
+
+
+def test_logo_converted_to_pdf(tmp_path):
+    """The JPEG logo is wrapped in a one-page PDF at its natural size, with the JPEG data untouched."""
+    from utils import graphics
+
+    static_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "static")
+    graphics.convert_graphics(static_dir, str(tmp_path), ["residentCouncilLogoSmall"])
+
+    with open(os.path.join(static_dir, "residentCouncilLogoSmall.jpg"), "rb") as f:
+        jpeg = f.read()
+    pdf = (tmp_path / "residentCouncilLogoSmall.pdf").read_bytes()
+    info = graphics.jpeg_info(jpeg)
+
+    assert pdf.startswith(b"%PDF-")
+    assert jpeg in pdf
+    width = info["width"] * 72 / info["dpi"][0]
+    assert f"/MediaBox [0 0 {width:.4f} ".encode("ascii") in pdf
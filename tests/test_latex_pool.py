@@ -0,0 +1,83 @@
+# tests/test_latex_pool.py
+
+import os
+import subprocess
+
+import pytest
+
+from utils import latex, latex_pool
+
+
+class FakeXelatex:
+    """Stands in for a waiting xelatex process: writes a PDF for the document it is fed."""
+
+    started = []
+
+    def __init__(self, args, cwd=None, env=None, **kwargs):
+        self.args = args
+        self.cwd = cwd
+        self.env = env
+        self.returncode = None
+        self.fed = None
+        FakeXelatex.started.append(self)
+
+    def poll(self):
+        return self.returncode
+
+    def communicate(self, input=None, timeout=None):
+        if input is not None:
+            self.fed = input
+            with open(os.path.join(self.cwd, f"{latex_pool.JOBNAME}.pdf"), "w") as f:
+                f.write("Mock PDF")
+        if self.returncode is None:
+            self.returncode = 0
+        return "Output written", None
+
+    def kill(self):
+        self.returncode = -9
+
+
+@pytest.fixture
+def fake_xelatex(monkeypatch):
+    FakeXelatex.started = []
+    monkeypatch.setattr(subprocess, "Popen", FakeXelatex)
+    latex_pool.shutdown()
+    yield FakeXelatex
+    latex_pool.shutdown()
+
+
+def test_warm_compile_feeds_document_over_stdin(fake_xelatex, tmp_path):
+    """A build runs in a waiting process, which is replaced straight away."""
+    dest = tmp_path / "roster.pdf"
+    result = latex.compile_pdf("\\begin{document}x\\end{document}", "roster", str(dest),
+                               search_paths=["/templates"], warm_pool={"size": 2, "max_age": 600, "timeout": 5})
+
+    assert result == {"success": True, "path": str(dest)}
+    assert dest.read_text() == "Mock PDF"
+
+    used = [process for process in fake_xelatex.started if process.fed]
+    assert len(used) == 1
+    assert used[0].fed == "\\nonstopmode\\input{document.tex}\n"
+    assert used[0].env["TEXINPUTS"].startswith("/templates" + os.pathsep)
+    # The pool is topped up to its size
+    assert len([process for process in fake_xelatex.started if process.returncode is None]) == 2
+
+
+def test_unhealthy_processes_are_discarded(fake_xelatex, tmp_path):
+    """A process that has exited or is too old is not used."""
+    pool = latex_pool.get_pool(None, (), None, size=2, max_age=600)
+    pool.fill()
+    dead, old = pool._idle
+    dead.process.returncode = 1
+    old.started = 0
+
+    process = pool.take()
+    assert process is not None
+    assert process not in (dead, old)
+    assert old.process.returncode == -9
+
+
+def test_pool_disabled_by_default():
+    """Without REPORT_WARM_POOL_SIZE builds compile cold."""
+    assert latex_pool.pool_options({}) is None
+    assert latex_pool.pool_options({"REPORT_WARM_POOL_SIZE": 2})["size"] == 2
@@ -213,3 +213,26 @@ def test_delete_pdf(authenticated_client, app):
 
                 # Check that the PDF file was deleted
                 assert not os.path.exists(pdf_path)
+
+def test_serve_letter_pdf_conditional(authenticated_client, app):
+    """Test the GET /api/letters/pdf/<filename> route with conditional requests."""
+    files_letters_dir = os.path.join(app.root_path, "files_letters")
+    os.makedirs(files_letters_dir, exist_ok=True)
+    pdf_path = os.path.join(files_letters_dir, "zz_test_letter.pdf")
+    with open(pdf_path, "wb") as f:
+        f.write(b"%PDF-1.5 letter")
+
+    try:
+        response = authenticated_client.get("/api/letters/pdf/zz_test_letter.pdf")
+        assert response.status_code == 200
+        assert response.mimetype == "application/pdf"
+
+        response = authenticated_client.get("/api/letters/pdf/zz_test_letter.pdf",
+                                            headers={"If-None-Match": response.headers["ETag"]})
+        assert response.status_code == 304
+
+        # Paths outside files_letters are not served
+        response = authenticated_client.get("/api/letters/pdf/..%2Fapp.py")
+        assert response.status_code in (302, 404)
+    finally:
+        os.remove(pdf_path)
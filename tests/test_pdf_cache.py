@@ -0,0 +1,101 @@
+# tests/test_pdf_cache.py
+
+import os
+import pathlib
+
+from utils import pdf_cache
+
+
+def test_source_key_ignores_generated_timestamp(tmp_path):
+    """Sources that differ only in their generated timestamp share a key, however they are split into pieces."""
+    template_path = tmp_path / "template.tex"
+    template_path.write_text("\\VAR{generated} \\VAR{title}", encoding="utf-8")
+    cache_dir = str(tmp_path / "cache")
+
+    first, path = pdf_cache.spool_source(["2024-01-01 10:00:00 Roster"], "2024-01-01 10:00:00", cache_dir,
+                                         str(template_path))
+    second, _ = pdf_cache.spool_source(["2024-06-30 17:45:12", " Roster"], "2024-06-30 17:45:12", cache_dir,
+                                       str(template_path))
+    changed, _ = pdf_cache.spool_source(["2024-06-30 17:45:12 Other"], "2024-06-30 17:45:12", cache_dir,
+                                        str(template_path))
+
+    assert first == second
+    assert first != changed
+    assert path == pathlib.Path(pdf_cache.source_path(cache_dir, first))
+    assert path.read_text(encoding="utf-8") == "2024-06-30 17:45:12 Roster"
+
+
+def test_source_key_includes_template_file(tmp_path):
+    """Editing the template invalidates the cache even if the rendered output is the same."""
+    template_path = tmp_path / "template.tex"
+    template_path.write_text("version 1", encoding="utf-8")
+    cache_dir = str(tmp_path / "cache")
+    before, _ = pdf_cache.spool_source(["Roster"], None, cache_dir, str(template_path))
+
+    template_path.write_text("version 2", encoding="utf-8")
+    assert pdf_cache.spool_source(["Roster"], None, cache_dir, str(template_path))[0] != before
+
+
+def test_publish_copies_only_when_changed(tmp_path):
+    """Publishing a key that is already published leaves the file alone."""
+    cache_dir = pdf_cache.get_cache_dir(str(tmp_path), {})
+    # Builds compile straight into the cache
+    with open(pdf_cache.cached_pdf_path(cache_dir, "abc"), "wb") as f:
+        f.write(b"%PDF-1.5 cached")
+
+    dest = tmp_path / "roster.pdf"
+    pdf_cache.publish(cache_dir, "abc", str(dest))
+    assert dest.read_bytes() == b"%PDF-1.5 cached"
+    assert pdf_cache.published_key(cache_dir, "roster.pdf") == "abc"
+
+    mtime = os.path.getmtime(dest)
+    pdf_cache.publish(cache_dir, "abc", str(dest))
+    assert os.path.getmtime(dest) == mtime
+
+
+def test_report_route_reuses_cached_pdf(authenticated_client, test_data, report_templates, fake_compile):
+    """A second request for an unchanged roster is served from the cache without compiling."""
+    response = authenticated_client.get("/report/long")
+    assert response.status_code == 200
+    assert response.get_json()["cached"] is False
+    assert len(fake_compile) == 1
+
+    # Remove the published PDF; the cache hit must restore it
+    os.remove(os.path.join(report_templates, "long_form_roster.pdf"))
+
+    response = authenticated_client.get("/report/long")
+    assert response.status_code == 200
+    json_data = response.get_json()
+    assert json_data["cached"] is True
+    assert json_data["filename"] == "long_form_roster.pdf"
+    assert len(fake_compile) == 1
+    assert os.path.exists(os.path.join(report_templates, "long_form_roster.pdf"))
+
+
+def test_prune_keeps_published_newest_and_recent(tmp_path):
+    """Pruning leaves the published PDFs, the newest ones and the recent ones; reusing a fragment renews it."""
+    import time
+
+    cache_dir = pdf_cache.get_cache_dir(str(tmp_path), {})
+    os.makedirs(os.path.join(cache_dir, "fragments"))
+    old = time.time() - 30 * 24 * 3600
+    paths = {}
+    for index, key in enumerate(["published", "stale", "recent", "fragments/stale", "fragments/used"]):
+        paths[key] = os.path.join(cache_dir, f"{key}.pdf")
+        with open(paths[key], "wb") as f:
+            f.write(b"%PDF")
+        os.utime(paths[key], (old + index, old + index))
+    pdf_cache.mark_published(cache_dir, "long_form_roster.pdf", "published")
+    os.utime(paths["recent"])
+    assert pdf_cache.touch(paths["fragments/used"]) == paths["fragments/used"]
+
+    assert pdf_cache.prune(cache_dir, keep=0, max_age=24 * 3600) == 2
+    assert sorted(key for key, path in paths.items() if os.path.exists(path)) == [
+        "fragments/used", "published", "recent"
+    ]
+
+    # The newest are kept however old
+    os.utime(paths["recent"], (old - 1, old - 1))
+    assert pdf_cache.prune(cache_dir, keep=2, max_age=24 * 3600) == 0
+    assert pdf_cache.prune(cache_dir, keep=1, max_age=24 * 3600) == 1
+    assert not os.path.exists(paths["recent"])
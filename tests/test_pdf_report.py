@@ -0,0 +1,66 @@
+# tests/test_pdf_report.py
+
+import os
+import re
+import zlib
+
+from utils import pdf_cache, pdf_report
+
+
+class _Grouped:
+    def __init__(self, groups):
+        self.groups = groups
+
+    def items(self):
+        return iter(self.groups.items())
+
+
+def _page_streams(data):
+    return [zlib.decompress(stream) for stream in re.findall(rb"stream\n(.*?)\nendstream", data, re.S)]
+
+
+def test_text_width_from_the_font_metrics():
+    """Widths come from the Helvetica metrics; accented letters measure as their base letter."""
+    assert pdf_report.text_width("Hi", "F1", 10) == (722 + 222) / 100
+    assert pdf_report.text_width("Hi", "F2", 10) == (722 + 278) / 100
+    assert pdf_report.text_width("é", "F1", 12) == pdf_report.text_width("e", "F1", 12)
+
+
+def test_render_pdf_flows_bodies_across_pages(tmp_path):
+    """A long table continues on further pages under its header, and every page has the footer."""
+    members = [(f"Office {n}", f"Member {n}") for n in range(120)]
+    pdf_path = tmp_path / "roster.pdf"
+    pdf_report.render_pdf(str(pdf_path), "Short Form Roster", "2026-01-02 03:04:05",
+                          _Grouped({"Council": members[:3], "Library (Main)": members}),
+                          ["Office", "Name"], list, columns=2)
+
+    data = pdf_path.read_bytes()
+    assert data.startswith(b"%PDF-")
+    streams = _page_streams(data)
+    page_count = int(re.search(rb"/Count (\d+)", data).group(1))
+    assert page_count == len(streams) > 1
+    assert b"(Library \\(Main\\)) Tj" in streams[0]
+    assert all(b"(Generated 2026-01-02 03:04:05) Tj" in stream for stream in streams)
+    assert all(b"(Office) Tj" in stream for stream in streams[1:])
+
+
+def test_direct_pdf_report_skips_tex(authenticated_client, app, test_data, report_templates, fake_compile,
+                                     monkeypatch):
+    """A report listed in REPORT_DIRECT_PDF is written in-process and replaces the published cached build."""
+    cache_dir = pdf_cache.get_cache_dir(report_templates, app.config)
+    assert authenticated_client.get("/report/short").status_code == 200
+    assert pdf_cache.published_key(cache_dir, "short_form_roster.pdf")
+
+    monkeypatch.setitem(app.config, "REPORT_DIRECT_PDF", ["short"])
+    response = authenticated_client.get("/report/short")
+    assert response.get_json()["filename"] == "short_form_roster.pdf"
+    assert fake_compile == ["short_form_roster"]
+    with open(os.path.join(report_templates, "short_form_roster.pdf"), "rb") as f:
+        assert f.read(5) == b"%PDF-"
+    assert pdf_cache.published_key(cache_dir, "short_form_roster.pdf") is None
+
+    # Back to TeX: the cached build is published again over the direct PDF
+    monkeypatch.setitem(app.config, "REPORT_DIRECT_PDF", [])
+    assert authenticated_client.get("/report/short").get_json()["cached"] is True
+    with open(os.path.join(report_templates, "short_form_roster.pdf")) as f:
+        assert f.read().startswith("Mock PDF")
@@ -0,0 +1,139 @@
+# tests/test_prebuild.py
+
+import time
+
+import pytest
+from werkzeug.datastructures import MultiDict
+
+from extensions import db
+from models.term import Term
+from utils import reports
+from utils.prebuild import prebuilder
+
+
+@pytest.fixture
+def prebuild_enabled(app):
+    app.config.update(REPORT_PREBUILD=True, REPORT_PREBUILD_DELAY=0.05, REPORT_PREBUILD_MAX_DELAY=1)
+    prebuilder.cancel()
+    prebuilder._variants.clear()
+    yield prebuilder
+    prebuilder.cancel()
+
+
+def wait_for_run(previous_run, timeout=5):
+    deadline = time.time() + timeout
+    while prebuilder.last_run == previous_run and time.time() < deadline:
+        time.sleep(0.02)
+    assert prebuilder.last_run != previous_run, "the pre-builder did not run"
+
+
+def test_dependency_map(app, test_data):
+    """Every report reads the tables behind report_record, none reads the letters, and a subset covers its bodies."""
+    with app.app_context():
+        context = reports.build_context()
+        long_roster = reports.REPORTS["long"]
+        subset = long_roster.with_params(context, MultiDict({"office_id": ["3"]}))
+        builds = [(definition, context) for definition in reports.REPORTS.values()] + [(long_roster, subset)]
+
+        dependencies = reports.dependency_map(builds)
+        assert dependencies["long_form_roster"] == ({"body", "office", "person", "term"}, None)
+        assert dependencies["long_form_roster_office-3"][1] == {2}
+        assert reports.builds_affected_by(builds, {"letters"}) == []
+        assert len(reports.builds_affected_by(builds, {"term"})) == len(builds)
+        # A change in body 1 leaves the subset of body 2 alone
+        assert (long_roster, subset) not in reports.builds_affected_by(builds, {"term"}, frozenset({1}))
+        assert (long_roster, subset) in reports.builds_affected_by(builds, {"term"}, frozenset({2}))
+
+
+def test_term_edit_prebuilds_reports(app, test_data, report_templates, fake_compile, prebuild_enabled):
+    """A burst of edits leads to one rebuild; unchanged reports come from the cache."""
+    previous_run = prebuilder.last_run
+    with app.app_context():
+        for ordinal in ("2nd", "3rd"):
+            term = Term.query.first()
+            term.ordinal = ordinal
+            db.session.commit()
+
+    wait_for_run(previous_run)
+    assert sorted(fake_compile) == sorted(definition.name for definition in reports.REPORTS.values()
+                                          if not definition.sections)
+    assert set(prebuilder.last_results.values()) == {"built"}
+
+    # Nothing that the (minimal) templates show has changed: no compile the second time
+    fake_compile.clear()
+    previous_run = prebuilder.last_run
+    with app.app_context():
+        term = Term.query.first()
+        term.ordinal = "4th"
+        db.session.commit()
+
+    wait_for_run(previous_run)
+    assert fake_compile == []
+    assert set(prebuilder.last_results.values()) == {"unchanged"}
+
+
+def test_edit_prebuilds_the_subsets_of_its_body(app, authenticated_client, test_data, report_templates, fake_compile,
+                                                prebuild_enabled):
+    """A subset roster asked for is rebuilt after an edit in its bodies, and only then."""
+    for body_id in (1, 2):
+        assert authenticated_client.get(f"/report/short?body_id={body_id}").status_code == 200
+
+    # An edit in body 2 reaches the subset of body 2, not that of body 1
+    fake_compile.clear()
+    previous_run = prebuilder.last_run
+    with app.app_context():
+        term = Term.query.filter_by(term_office_id=3).one()
+        term.ordinal = "9th"
+        db.session.commit()
+
+    wait_for_run(previous_run)
+    assert "short_form_roster_body-2" in prebuilder.last_results
+    assert "short_form_roster_body-1" not in prebuilder.last_results
+    assert "short_form_roster" in prebuilder.last_results
+
+
+def test_binder_is_prebuilt_once_asked_for(app, authenticated_client, test_data, report_templates, fake_compile,
+                                           prebuild_enabled):
+    """The meeting binder is not rebuilt after edits until someone has built it."""
+    binder = next(definition for definition in reports.REPORTS.values() if definition.sections)
+
+    def edit_and_wait(ordinal):
+        fake_compile.clear()
+        previous_run = prebuilder.last_run
+        with app.app_context():
+            term = Term.query.first()
+            term.ordinal = ordinal
+            db.session.commit()
+        wait_for_run(previous_run)
+
+    edit_and_wait("2nd")
+    assert binder.name not in fake_compile and binder.name not in prebuilder.last_results
+
+    assert authenticated_client.get(f"/report/{binder.kind}").status_code == 200
+    edit_and_wait("3rd")
+    assert binder.name in prebuilder.last_results
+
+
+def test_failed_and_busy_builds_leave_no_sources(app, authenticated_client, test_data, report_templates, monkeypatch):
+    """A compile that fails, and a pre-build turned away by the compile gate, remove their spooled sources."""
+    import os
+    from contextlib import contextmanager
+    from utils import latex, pdf_cache
+    from utils.compile_gate import CompileQueueFull, compile_gate
+
+    monkeypatch.setattr(latex, "compile_pdf", lambda *args, **kwargs: {"success": False, "error": "! Emergency stop."})
+    assert authenticated_client.get("/report/short").status_code == 500
+    sources_dir = os.path.join(pdf_cache.get_cache_dir(report_templates, app.config), "sources")
+    assert os.listdir(sources_dir) == []
+
+    @contextmanager
+    def busy():
+        raise CompileQueueFull(5)
+        yield
+
+    monkeypatch.setattr(compile_gate, "slot", busy)
+    with app.app_context():
+        retry = prebuilder.rebuild({"term"})
+    assert retry == {"term"}
+    assert set(prebuilder.last_results.values()) == {"busy"}
+    assert os.listdir(sources_dir) == []
@@ -0,0 +1,188 @@
+# tests/test_report_jobs.py
+
+import os
+import time
+
+import pytest
+
+from utils import latex
+from utils.report_jobs import report_jobs
+
+
+@pytest.fixture
+def thread_jobs(fake_compile, monkeypatch):
+    """Run report jobs on threads so that the fake compile step applies to them."""
+    report_jobs.shutdown()
+    monkeypatch.setattr(report_jobs, "backend", "thread")
+    yield report_jobs
+    report_jobs.shutdown()
+
+
+def wait_for_job(client, status_url, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        data = client.get(status_url).get_json()
+        if data["status"] not in ("queued", "running"):
+            return data
+        time.sleep(0.05)
+    raise AssertionError("Report job did not finish in time")
+
+
+def test_post_queues_report_job(authenticated_client, test_data, report_templates, thread_jobs):
+    """A POST answers 202 straight away and the job endpoint reports the resulting filename."""
+    response = authenticated_client.post("/report/long")
+    assert response.status_code == 202
+    json_data = response.get_json()
+    assert json_data["success"] is True
+    assert json_data["kind"] == "long"
+    assert json_data["status_url"] == f"/report/jobs/{json_data['job_id']}"
+
+    result = wait_for_job(authenticated_client, json_data["status_url"])
+    assert result["status"] == "done"
+    assert result["filename"] == "long_form_roster.pdf"
+    assert os.path.exists(os.path.join(report_templates, "long_form_roster.pdf"))
+
+
+def test_failed_job_reports_error(authenticated_client, test_data, report_templates, thread_jobs, monkeypatch):
+    """A compile that produces no PDF ends in the failed state with the LaTeX output."""
+    monkeypatch.setattr(latex, "compile_pdf",
+                        lambda tex_source, jobname, dest_path, **kwargs: {"success": False, "error": "PDF not found."})
+
+    response = authenticated_client.post("/report/short")
+    result = wait_for_job(authenticated_client, response.get_json()["status_url"])
+    assert result["status"] == "failed"
+    assert result["success"] is False
+    assert result["error"] == "PDF not found."
+
+
+def test_unknown_job(authenticated_client):
+    """Polling a job id that was never queued returns 404."""
+    response = authenticated_client.get("/report/jobs/does-not-exist")
+    assert response.status_code == 404
+    assert response.get_json()["success"] is False
+
+
+def test_build_all_reports(authenticated_client, test_data, report_templates, thread_jobs, fake_compile):
+    """/report/all builds every registered report and returns their filenames together; the binder on request."""
+    response = authenticated_client.get("/report/all")
+    assert response.status_code == 200
+    json_data = response.get_json()
+    assert json_data["success"] is True
+    assert sorted(json_data["filenames"]) == ["expirations_report.pdf", "long_form_roster.pdf",
+                                              "short_form_roster.pdf", "vacancies_report.pdf"]
+    assert sorted(f"{name}.pdf" for name in fake_compile) == sorted(json_data["filenames"])
+
+    # Nothing changed, so a second run is served entirely from the cache
+    json_data = authenticated_client.get("/report/all").get_json()
+    assert all(report["cached"] for report in json_data["reports"].values())
+
+    # Only the binder is new
+    fake_compile.clear()
+    json_data = authenticated_client.get("/report/all?binder=1").get_json()
+    assert json_data["success"] is True and "meeting_binder.pdf" in json_data["filenames"]
+    assert fake_compile == ["meeting_binder"]
+
+
+def test_stale_pdf_served_while_rebuilding(app, authenticated_client, report_templates, thread_jobs, fake_compile):
+    """A recent previous PDF is returned at once, marked stale, while the fresh build runs as a job."""
+    from utils import pdf_cache
+
+    def edit_template(text):
+        template_path = os.path.join(report_templates, "lfr_template.tex")
+        with open(template_path, "a", encoding="utf-8") as f:
+            f.write(text)
+        later = time.time() + 5
+        os.utime(template_path, (later, later))
+
+    app.config["REPORT_MAX_STALE"] = {"long": 3600}
+    try:
+        assert authenticated_client.get("/report/long").get_json()["cached"] is False
+        assert fake_compile == ["long_form_roster"]
+
+        edit_template("\\relax")
+        response = authenticated_client.get("/report/long")
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data["stale"] is True and data["filename"] == "long_form_roster.pdf"
+        assert int(response.headers["X-Report-Stale"]) == data["stale_seconds"]
+        assert wait_for_job(authenticated_client, data["status_url"])["status"] == "done"
+        assert fake_compile == ["long_form_roster", "long_form_roster"]
+
+        # Too old to serve: the request waits for the fresh build
+        cache_dir = pdf_cache.get_cache_dir(report_templates, app.config)
+        cached_path = pdf_cache.lookup(cache_dir, pdf_cache.published_key(cache_dir, "long_form_roster.pdf"))
+        os.utime(cached_path, (time.time() - 7200, time.time() - 7200))
+        edit_template("\\relax")
+        data = authenticated_client.get("/report/long").get_json()
+        assert data["cached"] is False and "stale" not in data
+    finally:
+        app.config.pop("REPORT_MAX_STALE")
+
+
+def test_home_page_follows_a_stale_report(app, authenticated_client, report_templates, thread_jobs, fake_compile):
+    """The buttons POST; a stale answer carries what the page needs to say so and poll for the fresh PDF."""
+    page = authenticated_client.get("/").get_data(as_text=True)
+    assert 'id="reportStatus"' in page and "data.stale" in page
+
+    app.config["REPORT_MAX_STALE"] = {"long": 3600}
+    try:
+        response = authenticated_client.post("/report/long")
+        assert response.status_code == 202
+        assert wait_for_job(authenticated_client, response.get_json()["status_url"])["status"] == "done"
+        template_path = os.path.join(report_templates, "lfr_template.tex")
+        with open(template_path, "a", encoding="utf-8") as f:
+            f.write("\\relax")
+        later = time.time() + 5
+        os.utime(template_path, (later, later))
+
+        data = authenticated_client.post("/report/long").get_json()
+        assert data["stale"] is True and data["filename"] == "long_form_roster.pdf"
+        assert data["stale_seconds"] >= 0
+        assert wait_for_job(authenticated_client, data["status_url"])["filename"] == "long_form_roster.pdf"
+    finally:
+        app.config.pop("REPORT_MAX_STALE")
+
+
+def test_stale_pdf_turned_away_discards_its_source(app, authenticated_client, report_templates, thread_jobs,
+                                                  fake_compile, monkeypatch):
+    """When the queue has no room for the rebuild, the stale PDF is served and its spooled source removed."""
+    from utils import pdf_cache
+    from utils.compile_gate import CompileQueueFull, compile_gate
+
+    app.config["REPORT_MAX_STALE"] = {"long": 3600}
+    try:
+        assert authenticated_client.get("/report/long").get_json()["cached"] is False
+
+        template_path = os.path.join(report_templates, "lfr_template.tex")
+        with open(template_path, "a", encoding="utf-8") as f:
+            f.write("\\relax")
+        later = time.time() + 5
+        os.utime(template_path, (later, later))
+
+        def full(pending):
+            raise CompileQueueFull(5)
+
+        monkeypatch.setattr(compile_gate, "check_queue", full)
+        data = authenticated_client.get("/report/long").get_json()
+        assert data["stale"] is True and "job_id" not in data
+        assert fake_compile == ["long_form_roster"]
+        cache_dir = pdf_cache.get_cache_dir(report_templates, app.config)
+        assert os.listdir(os.path.join(cache_dir, "sources")) == []
+    finally:
+        app.config.pop("REPORT_MAX_STALE")
+
+
+def test_process_backend_under_mod_wsgi_needs_python(app, monkeypatch):
+    """Threads are the default; worker processes under mod_wsgi without REPORT_JOB_PYTHON fail at startup."""
+    import sys
+    from utils.report_jobs import ReportJobQueue
+
+    queue = ReportJobQueue()
+    queue.init_app(app)
+    assert queue.backend == "thread"
+
+    monkeypatch.setitem(sys.modules, "mod_wsgi", object())
+    monkeypatch.setitem(app.config, "REPORT_JOB_BACKEND", "process")
+    monkeypatch.setitem(app.config, "REPORT_JOB_PYTHON", None)
+    with pytest.raises(RuntimeError):
+        queue.init_app(app)
@@ -0,0 +1,328 @@
+# tests/test_reports.py
+
+import os
+import time
+
+from utils import reports
+
+
+def test_registry_has_the_four_reports():
+    """The report routes are driven by the registered definitions."""
+    assert set(reports.REPORTS) >= {"long", "short", "expirations", "vacancies"}
+    assert reports.get_report("long").pdf_filename == "long_form_roster.pdf"
+    assert reports.get_report("nonexistent") is None
+
+
+def test_unknown_report_kind(authenticated_client):
+    """Asking for a report that is not registered returns 404."""
+    response = authenticated_client.get("/report/nonexistent")
+    assert response.status_code == 404
+    assert response.get_json()["success"] is False
+
+
+def test_latex_environment_is_shared_and_reloads(app, report_templates):
+    """One environment serves every build, and edits to a template are picked up."""
+    with app.app_context():
+        env = reports.get_latex_environment(report_templates, app.config)
+        assert reports.get_latex_environment(report_templates, app.config) is env
+
+        template = env.get_template("lfr_template.tex")
+        assert env.get_template("lfr_template.tex") is template
+
+        template_path = os.path.join(report_templates, "lfr_template.tex")
+        with open(template_path, "w", encoding="utf-8") as f:
+            f.write("Edited \\VAR{title}")
+        later = time.time() + 5
+        os.utime(template_path, (later, later))
+
+        assert env.get_template("lfr_template.tex").render(title="Roster") == "Edited Roster"
+
+
+def test_definition_render(app, test_data, report_templates):
+    """A definition queries, groups and renders its records."""
+    with app.app_context():
+        context = reports.build_context()
+        definition = reports.get_report("long")
+
+        grouped = definition.group(definition.query(context))
+        assert list(grouped) == ["Test Body 1", "Test Body 2"]
+
+        rendered = definition.render_build(report_templates, app.config, context)
+        assert "Long Form Roster" in rendered.tex.read_text(encoding="utf-8")
+        assert rendered.generated == context["now"].strftime(reports.GENERATED_FORMAT)
+
+
+def test_render_build_streams_into_the_cache(authenticated_client, app, test_data, report_templates, fake_compile):
+    """The build source is streamed to a file keyed by its templates and text, and removed once compiled."""
+    import hashlib
+
+    with app.app_context():
+        context = reports.build_context()
+        definition = reports.get_report("short")
+        rendered = definition.render_build(report_templates, app.config, context)
+
+        env = reports.get_latex_environment(report_templates, app.config)
+        rendered_tex = env.get_template(definition.template).render(
+            generated=rendered.generated,
+            title=definition.get_title(context),
+            grouped=definition.group(definition.query(context))
+        )
+        assert rendered.tex.read_text(encoding="utf-8") == rendered_tex
+
+        digest = hashlib.sha256()
+        for path in reports.template_files(env, definition.template):
+            with open(path, "rb") as f:
+                digest.update(f.read() + b"\0")
+        digest.update(rendered_tex.replace(rendered.generated, "\\GENERATED").encode("utf-8"))
+        assert rendered.key == digest.hexdigest()
+
+        # Body by body: the second body's records are not read before the first body is handed out
+        read = []
+        records = (read.append(r.name) or r for r in definition.query(context))
+        body_name, members = next(iter(definition.group(records).items()))
+        assert body_name == "Test Body 1" and read == ["Test Body 1"] * len(members) + ["Test Body 2"]
+
+    assert authenticated_client.get("/report/short").status_code == 200
+    assert not os.path.exists(rendered.tex)
+
+
+def test_replacing_the_logo_changes_the_cache_key(app, test_data, report_templates, tmp_path, monkeypatch):
+    """The logo is part of what a build depends on, like its templates."""
+    import shutil
+
+    static_dir = tmp_path / "static"
+    static_dir.mkdir()
+    logo_path = static_dir / f"{reports.GRAPHICS[0]}.jpg"
+    shutil.copy(os.path.join(app.static_folder, logo_path.name), logo_path)
+    monkeypatch.setattr(app, "static_folder", str(static_dir))
+
+    with app.app_context():
+        context = reports.build_context()
+        definition = reports.get_report("long")
+        key = definition.render_build(report_templates, app.config, context).key
+        assert definition.render_build(report_templates, app.config, context).key == key
+
+        logo_path.write_bytes(logo_path.read_bytes() + b"\0")
+        assert definition.render_build(report_templates, app.config, context).key != key
+
+
+def test_fragmented_roster_recompiles_changed_bodies_only(authenticated_client, app, test_data, report_templates,
+                                                          fake_compile, monkeypatch):
+    """Each group of bodies is compiled once; editing a body recompiles its group and the merge only."""
+    from extensions import db
+    from models.person import Person
+
+    for filename, content in [
+        ("lfr_fragment.tex", "\\BLOCK{ for body_name, members in grouped.items() }"
+                             "\\VAR{body_name}: \\BLOCK{ include 'lfr_body.tex' }\\BLOCK{ endfor }"),
+        ("lfr_body.tex", "\\BLOCK{ for member in members }\\VAR{member.first} \\BLOCK{ endfor }"),
+        ("roster_merge.tex", "\\BLOCK{ for fragment in fragments }\\VAR{fragment}\n\\BLOCK{ endfor }"),
+    ]:
+        with open(os.path.join(report_templates, filename), "w", encoding="utf-8") as f:
+            f.write(content)
+    monkeypatch.setattr(reports.get_report("long"), "bodies_per_fragment", 1)
+
+    assert authenticated_client.get("/report/long").status_code == 200
+    assert fake_compile == ["long_form_roster-fragment", "long_form_roster-fragment", "long_form_roster"]
+
+    fake_compile.clear()
+    with app.app_context():
+        db.session.get(Person, 3).first = "Robert"
+        db.session.commit()
+    assert authenticated_client.get("/report/long").status_code == 200
+    assert fake_compile == ["long_form_roster-fragment", "long_form_roster"]
+
+    # Editing an included template changes the key of every fragment that uses it
+    fake_compile.clear()
+    with open(os.path.join(report_templates, "lfr_body.tex"), "a", encoding="utf-8") as f:
+        f.write("\\par")
+    later = time.time() + 5
+    os.utime(os.path.join(report_templates, "lfr_body.tex"), (later, later))
+    assert authenticated_client.get("/report/long").status_code == 200
+    assert fake_compile == ["long_form_roster-fragment", "long_form_roster-fragment", "long_form_roster"]
+
+
+def test_short_roster_is_one_document(authenticated_client, test_data, report_templates, fake_compile):
+    """The two-column short roster flows from body to body, so it is compiled whole, not in fragments."""
+    assert reports.get_report("short").fragment_template is None
+    assert authenticated_client.get("/report/short").status_code == 200
+    assert fake_compile == ["short_form_roster"]
+
+
+def test_query_snapshot_splits_one_query(app, test_data):
+    """A snapshot reads the records of all view-backed reports with one query and matches each report's own query."""
+    from sqlalchemy import event
+    from extensions import db
+
+    with app.app_context():
+        context = reports.build_context()
+        definitions = [definition for definition in reports.REPORTS.values()
+                       if not definition.sections and not definition.source]
+
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, "before_cursor_execute", listener)
+        try:
+            snapshot = reports.query_snapshot(definitions, context)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", listener)
+
+        assert len(statements) == 1
+        for definition in definitions:
+            expected = [(r.term_person_id, r.term_office_id) for r in definition.query(context)]
+            assert [(r.term_person_id, r.term_office_id) for r in snapshot[definition.kind]] == expected
+
+
+def test_report_formats_without_latex(authenticated_client, test_data, fake_compile):
+    """HTML, CSV and JSON renderings come straight from the query, with no compile."""
+    response = authenticated_client.get("/report/long?format=json")
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["title"] == "Long Form Roster"
+    assert [body["name"] for body in data["bodies"]] == ["Test Body 1", "Test Body 2"]
+    assert data["bodies"][0]["members"][0] == {
+        "incumbent": "John Doe", "office": "Test Office 1", "email": "john@example.com",
+        "phone": "(123) 456-7890", "apt": "101"
+    }
+
+    response = authenticated_client.get("/report/short?format=csv")
+    assert response.status_code == 200
+    assert response.mimetype == "text/csv"
+    lines = response.get_data(as_text=True).splitlines()
+    assert lines[0] == "Body,Incumbent,Office"
+    assert "Test Body 1,John Doe,Test Office 1" in lines
+
+    response = authenticated_client.get("/report/long?format=html")
+    assert response.status_code == 200
+    assert b"Test Office 3" in response.data
+
+    # The CSV and JSON links keep the parameters of the page
+    response = authenticated_client.get("/report/short?format=html&body_id=1&office_id=1&office_id=2")
+    page = response.get_data(as_text=True)
+    assert 'href="/report/short?format=csv&amp;body_id=1&amp;office_id=1&amp;office_id=2"' in page
+    assert 'href="/report/short?format=json&amp;body_id=1&amp;office_id=1&amp;office_id=2"' in page
+
+    assert authenticated_client.get("/report/long?format=docx").status_code == 400
+    assert fake_compile == []
+
+
+def test_export_streams_csv_and_xlsx(authenticated_client, test_data):
+    """The export streams report_record rows, filtered like the reports."""
+    import io
+    import zipfile
+
+    response = authenticated_client.get("/report/export")
+    assert response.status_code == 200
+    assert response.is_streamed
+    lines = response.get_data(as_text=True).splitlines()
+    assert lines[0] == "Body,Office,First,Last,Email,Phone,Apt,Term,Start,End"
+    assert len(lines) == 4
+    assert lines[1].startswith("Test Body 1,Test Office 1,John,Doe,")
+
+    response = authenticated_client.get("/report/export?body=2")
+    lines = response.get_data(as_text=True).splitlines()
+    assert [line.split(",")[0] for line in lines[1:]] == ["Test Body 2"]
+
+    response = authenticated_client.get("/report/export?format=xlsx&body=1")
+    assert response.status_code == 200
+    with zipfile.ZipFile(io.BytesIO(response.get_data())) as workbook:
+        assert workbook.testzip() is None
+        sheet = workbook.read("xl/worksheets/sheet1.xml").decode("utf-8")
+    assert sheet.count("<row>") == 3
+    assert "Jane" in sheet and "Bob" not in sheet
+
+    assert authenticated_client.get("/report/export?body=x").status_code == 400
+
+
+def test_expirations_window(authenticated_client, app, test_data):
+    """The expirations report takes a date window, answered from the index on term."end"."""
+    from sqlalchemy import text
+    from extensions import db
+
+    response = authenticated_client.get("/report/expirations?format=json&start=2021-01-01&end=2022-12-31")
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["title"] == "Expirations — 2021-01-01 to 2022-12-31"
+    offices = [member["office"] for body in data["bodies"] for member in body["members"]]
+    assert offices == ["Test Office 1", "Test Office 3"]
+
+    for query in ["within_days=-1", "start=yesterday", "start=2023-01-01&end=2022-01-01"]:
+        assert authenticated_client.get(f"/report/expirations?format=json&{query}").status_code == 400
+
+    with app.app_context():
+        plan = db.session.execute(text(
+            'EXPLAIN QUERY PLAN SELECT * FROM report_record WHERE "end" BETWEEN :start AND :end'
+        ), {"start": "2021-01-01", "end": "2022-12-31"}).fetchall()
+        assert any("ix_term_end" in row[-1] for row in plan)
+
+
+def test_subset_roster(authenticated_client, test_data, report_templates, fake_compile):
+    """body_id and office_id limit a roster to those bodies and offices, built under its own name."""
+    response = authenticated_client.get("/report/long?format=json&body_id=2")
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["title"] == "Long Form Roster — Test Body 2"
+    assert [body["name"] for body in data["bodies"]] == ["Test Body 2"]
+
+    response = authenticated_client.get("/report/short?format=json&body_id=1&office_id=2&office_id=3")
+    offices = [member["office"] for body in response.get_json()["bodies"] for member in body["members"]]
+    assert offices == ["Test Office 2"]
+
+    response = authenticated_client.get("/report/long?body_id=2&body_id=1")
+    assert response.status_code == 200
+    assert response.get_json()["filename"] == "long_form_roster_body-1-2.pdf"
+    assert authenticated_client.get("/report/long").get_json()["filename"] == "long_form_roster.pdf"
+    assert fake_compile == ["long_form_roster_body-1-2", "long_form_roster"]
+
+    for query in ["body_id=x", "office_id=0"]:
+        assert authenticated_client.get(f"/report/long?format=json&{query}").status_code == 400
+
+
+def test_expirations_cached_per_window(app, test_data):
+    """A window's records are reused until the roster changes."""
+    from datetime import date
+    from sqlalchemy import event
+    from extensions import db
+    from models.term import Term
+
+    with app.app_context():
+        context = dict(reports.build_context(), start=date(2021, 1, 1), end=date(2023, 12, 31))
+        assert len(reports.expiring_records(context)) == 3
+
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, "before_cursor_execute", listener)
+        try:
+            assert len(reports.expiring_records(context)) == 3
+            assert not any("roster_flat" in statement for statement in statements)
+
+            db.session.get(Term, (1, 1)).end = date(2030, 1, 1)
+            db.session.commit()
+            assert len(reports.expiring_records(context)) == 2
+        finally:
+            event.remove(db.engine, "before_cursor_execute", listener)
+
+
+def test_binder_renders_all_reports_as_sections(authenticated_client, app, test_data, report_templates, fake_compile,
+                                                tmp_path):
+    """The binder puts every report in one source, each section laid out by the report's body template."""
+    report_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "files_roster_reports")
+    with app.app_context():
+        binder = reports.get_report("binder")
+        rendered = binder.render_build(report_dir, {"REPORT_CACHE_DIR": str(tmp_path)}, reports.build_context())
+        source = rendered.tex.read_text(encoding="utf-8")
+
+    assert source.count("\\documentclass") == 0 and source.count("\\begin{document}") == 1
+    titles = ["Long Form Roster", "Short Form Roster", "Vacancies", "Expirations"]
+    positions = [source.index(f"{{\\LARGE \\textbf{{{title}") for title in titles]
+    assert positions == sorted(positions)
+    assert "\\textbf{D} & Expirations" in source
+    assert "john@example.com" in source and "Open seats" in source
+    assert binder.tables == reports.ROSTER_TABLES
+
+
+    # One compile, under a name that carries the parameters passed on to the sections
+    response = authenticated_client.get("/report/binder?body_id=2")
+    assert response.get_json()["filename"] == "meeting_binder_body-2.pdf"
+    assert fake_compile == ["meeting_binder_body-2"]
+    assert authenticated_client.get("/report/binder?format=json").status_code == 400
@@ -0,0 +1,76 @@
+# tests/test_revisions.py
+
+import sqlite3
+
+from extensions import db
+from models.body import Body
+from models.person import Person
+from models.term import Term
+from utils import revisions
+
+
+def test_commits_bump_revisions(app, test_data):
+    """Inserting roster data through the ORM bumps the counters of the touched tables."""
+    with app.app_context():
+        before = revisions.get_revisions()
+        assert before["body"] > 0
+        assert before["term"] > 0
+        assert before["letters"] == 0
+
+        body = db.session.get(Body, 1)
+        body.name = "Renamed Body"
+        db.session.commit()
+
+        after = revisions.get_revisions()
+        assert after["body"] > before["body"]
+        assert after["person"] == before["person"]
+        assert revisions.combined_revision(after) > revisions.combined_revision(before)
+
+
+def test_external_edit_bumps_revision(app, test_data):
+    """An edit made directly on the database file, outside Flask, is caught by the triggers."""
+    with app.app_context():
+        before = revisions.get_revisions()["person"]
+
+    with sqlite3.connect(app.config['DATABASE']) as conn:
+        conn.execute("UPDATE person SET phone = '(000) 000-0000' WHERE personid = 1")
+
+    with app.app_context():
+        assert revisions.get_revisions()["person"] > before
+
+
+def test_change_listener_receives_tables(app, test_data, monkeypatch):
+    """Registered listeners hear which tracked tables a commit changed, and in which bodies."""
+    seen = []
+    monkeypatch.setattr(revisions, "_listeners", [lambda tables, bodies: seen.append((tables, bodies))])
+
+    with app.app_context():
+        body = db.session.get(Body, 2)
+        body.mission = "Updated mission"
+        db.session.commit()
+
+        # A term counts for the body of its office, a person for the bodies of their terms
+        term = Term.query.filter_by(term_office_id=1).one()
+        term.ordinal = "5th"
+        db.session.commit()
+        person = db.session.get(Person, 3)
+        person.phone = "(555) 555-0000"
+        db.session.commit()
+
+    assert seen == [
+        (frozenset({"body"}), frozenset({2})),
+        (frozenset({"term"}), frozenset({1})),
+        (frozenset({"person"}), frozenset({2})),
+    ]
+
+
+def test_revision_endpoint(authenticated_client, test_data):
+    """The endpoint returns all counters and answers 304 to a matching If-None-Match."""
+    response = authenticated_client.get("/api/revision")
+    assert response.status_code == 200
+    json_data = response.get_json()
+    assert set(json_data["tables"]) == set(revisions.TRACKED_TABLES)
+    assert json_data["revision"] == sum(json_data["tables"].values())
+
+    response = authenticated_client.get("/api/revision", headers={"If-None-Match": response.headers["ETag"]})
+    assert response.status_code == 304
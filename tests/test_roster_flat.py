@@ -0,0 +1,62 @@
+# tests/test_roster_flat.py
+
+import sqlite3
+
+from sqlalchemy import text
+
+from extensions import db
+from models.body import Body
+from models.office import Office
+from models.person import Person
+from models.term import Term
+
+VIEW_COLUMNS = ("person_id, first, last, email, phone, apt, start, \"end\", ordinal, term_person_id, term_office_id, "
+                "office_id, title, office_precedence, office_body_id, body_id, name, body_precedence")
+
+
+def _rows(app, source):
+    with sqlite3.connect(app.config['DATABASE']) as conn:
+        return sorted(conn.execute(f"SELECT {VIEW_COLUMNS} FROM {source}").fetchall())
+
+
+def test_roster_flat_follows_the_base_tables(app, test_data):
+    """Every write to term, office, body or person is reflected in roster_flat straight away."""
+    assert _rows(app, "roster_flat") == _rows(app, "report_record")
+    assert len(_rows(app, "roster_flat")) == 3
+
+    with app.app_context():
+        db.session.get(Person, 1).first = "Johnny"
+        db.session.get(Office, 3).title = "Chair"
+        db.session.get(Body, 1).body_precedence = 5.0
+        db.session.delete(db.session.get(Term, (2, 2)))
+        db.session.commit()
+    assert _rows(app, "roster_flat") == _rows(app, "report_record")
+    assert len(_rows(app, "roster_flat")) == 2
+
+    # Edits made outside Flask are caught by the triggers too
+    with sqlite3.connect(app.config['DATABASE']) as conn:
+        conn.execute("UPDATE term SET \"end\" = '2030-06-30' WHERE termpersonid = 1")
+        conn.execute("INSERT INTO person (personid, first, last) VALUES (4, '(Vacant)', ' ')")
+        conn.execute("INSERT INTO term (termpersonid, termofficeid) VALUES (4, 2)")
+    assert _rows(app, "roster_flat") == _rows(app, "report_record")
+
+
+def test_rebuild_roster_command(app, runner, test_data):
+    """flask rebuild-roster refills a damaged roster_flat table."""
+    with sqlite3.connect(app.config['DATABASE']) as conn:
+        conn.execute("DELETE FROM roster_flat")
+
+    result = runner.invoke(args=["rebuild-roster"])
+    assert "3 rows" in result.output
+    assert _rows(app, "roster_flat") == _rows(app, "report_record")
+
+
+def test_roster_order_uses_index(app, test_data):
+    """Reading the roster in precedence order walks the index instead of sorting."""
+    with app.app_context():
+        plan = db.session.execute(text(
+            "EXPLAIN QUERY PLAN SELECT * FROM roster_flat ORDER BY body_precedence, office_precedence"
+        )).fetchall()
+    details = " ".join(row[-1] for row in plan)
+    assert "ix_roster_flat_order" in details
+    assert "TEMP B-TREE" not in details
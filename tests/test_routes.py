@@ -215,10 +215,16 @@ def test_report_routes(authenticated_client, test_data, app):
         import subprocess
         original_run = subprocess.run
 
+        # LaTeX sources passed to xelatex, by file name
+        compiled_sources = {}
+
         def mock_run(*args, **kwargs):
-            # Create a mock PDF file
-            report_name = args[0][-1].split("\\")[-1].replace(".tex", ".pdf")
-            with open(os.path.join(temp_dir, report_name), "w") as f:
+            # Builds run in a private workspace: record the source and create a mock PDF next to it,
+            # as xelatex would in its -output-directory
+            tex_path = args[0][-1]
+            with open(tex_path, "r", encoding="utf-8") as f:
+                compiled_sources[os.path.basename(tex_path)] = f.read()
+            with open(tex_path.replace(".tex", ".pdf"), "w") as f:
                 f.write("Mock PDF content")
 
             # Return a mock CompletedProcess object
@@ -242,17 +248,16 @@ def test_report_routes(authenticated_client, test_data, app):
                 assert json_data.get("success") is True
                 assert "filename" in json_data
 
-                # Check that the .tex file was created
+                # Check that only the finished PDF was published to the reports directory
+                assert os.path.exists(os.path.join(temp_dir, json_data["filename"]))
                 tex_filename = json_data["filename"].replace(".pdf", ".tex")
-                tex_path = os.path.join(temp_dir, tex_filename)
-                assert os.path.exists(tex_path)
+                assert not os.path.exists(os.path.join(temp_dir, tex_filename))
 
-                # Check the content of the .tex file
-                with open(tex_path, "r", encoding="utf-8") as f:
-                    tex_content = f.read()
-                    assert "\\documentclass{article}" in tex_content
-                    assert "\\begin{document}" in tex_content
-                    assert "\\end{document}" in tex_content
+                # Check the content of the .tex file that was compiled
+                tex_content = compiled_sources[tex_filename]
+                assert "\\documentclass{article}" in tex_content
+                assert "\\begin{document}" in tex_content
+                assert "\\end{document}" in tex_content
 
         finally:
             # Restore the original subprocess.run function
@@ -261,3 +266,33 @@ def test_report_routes(authenticated_client, test_data, app):
             app.config['REPORTS_DIR'] = original_reports_dir
 
             # No need to clean up files as the temporary directory will be automatically deleted
+
+
+def test_serve_pdf_conditional_and_ranges(authenticated_client, report_templates):
+    """Served PDFs carry a content ETag, answer 304 when unchanged and honour byte ranges."""
+    pdf_path = os.path.join(report_templates, "roster.pdf")
+    with open(pdf_path, "wb") as f:
+        f.write(b"%PDF-1.5 " + b"x" * 1000)
+
+    response = authenticated_client.get("/serve_pdf/roster.pdf")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert not etag.startswith("W/")
+    assert response.headers["Last-Modified"]
+    assert response.headers["Accept-Ranges"] == "bytes"
+    assert "no-cache" in response.headers["Cache-Control"]
+
+    response = authenticated_client.get("/serve_pdf/roster.pdf", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b""
+
+    response = authenticated_client.get("/serve_pdf/roster.pdf", headers={"Range": "bytes=0-7"})
+    assert response.status_code == 206
+    assert response.data == b"%PDF-1.5"
+
+    # A rebuilt PDF gets a new ETag
+    with open(pdf_path, "wb") as f:
+        f.write(b"%PDF-1.5 rebuilt")
+    response = authenticated_client.get("/serve_pdf/roster.pdf", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
@@ -0,0 +1,127 @@
+# tests/test_single_flight.py
+
+import os
+import threading
+import time
+
+from utils import latex, pdf_cache
+from utils.report_jobs import build_report, report_jobs
+from utils.single_flight import SingleFlight, build_lock
+
+
+def test_single_flight_shares_one_call():
+    """Callers arriving while a call for their key runs get its result instead of calling again."""
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return "built"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("key", slow))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    while flight.coalesced < 3:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert calls == [1]
+    assert results == ["built"] * 4
+    assert flight.in_flight() == 0
+
+
+def test_concurrent_report_requests_compile_once(app, test_data, report_templates, fake_compile, monkeypatch):
+    """Identical GETs from several threads share one compile and all get its PDF."""
+    compile_pdf = latex.compile_pdf
+
+    def slow_compile(*args, **kwargs):
+        time.sleep(0.3)
+        return compile_pdf(*args, **kwargs)
+
+    monkeypatch.setattr(latex, "compile_pdf", slow_compile)
+
+    clients = []
+    for _ in range(3):
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session["user_id"] = 1
+        clients.append(client)
+
+    responses = []
+    threads = [threading.Thread(target=lambda c=c: responses.append(c.get("/report/long"))) for c in clients]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+    assert [response.status_code for response in responses] == [200] * 3
+    assert {response.get_json()["filename"] for response in responses} == {"long_form_roster.pdf"}
+    assert fake_compile == ["long_form_roster"]
+
+
+def test_build_waits_for_identical_build_elsewhere(tmp_path, fake_compile):
+    """A build whose key is locked (as by another process) publishes that build's PDF once it is done."""
+    cache_dir, output_dir = pdf_cache.get_cache_dir(str(tmp_path), {}), str(tmp_path)
+    key = "0" * 64
+    results = []
+
+    with build_lock(cache_dir, key):
+        thread = threading.Thread(target=lambda: results.append(
+            build_report("source", "roster", output_dir, cache_dir=cache_dir, cache_key=key)))
+        thread.start()
+        time.sleep(0.2)
+        assert results == []
+        # The other build finishes and stores its PDF
+        with open(pdf_cache.cached_pdf_path(cache_dir, key), "w") as f:
+            f.write("built elsewhere")
+
+    thread.join(5)
+    assert results == [{"success": True, "filename": "roster.pdf", "coalesced": True}]
+    assert fake_compile == []
+    assert (tmp_path / "roster.pdf").read_text() == "built elsewhere"
+
+
+def test_build_lock_leaves_no_lock_files(tmp_path):
+    """A released build lock removes its file, and a waiter holding the removed file locks the new one."""
+    cache_dir = pdf_cache.get_cache_dir(str(tmp_path), {})
+    inflight_dir = os.path.join(cache_dir, "inflight")
+    acquired = []
+
+    def wait_for_lock():
+        with build_lock(cache_dir, "k"):
+            acquired.append(os.listdir(inflight_dir))
+
+    with build_lock(cache_dir, "k"):
+        thread = threading.Thread(target=wait_for_lock)
+        thread.start()
+        time.sleep(0.2)
+        assert acquired == []
+    thread.join(5)
+
+    assert acquired == [["k.lock"]]
+    assert os.listdir(inflight_dir) == []
+
+
+def test_identical_jobs_share_one_job(tmp_path, fake_compile, monkeypatch):
+    """Submitting a build identical to a pending job returns that job."""
+    release = threading.Event()
+    compile_pdf = latex.compile_pdf
+    monkeypatch.setattr(latex, "compile_pdf", lambda *args, **kwargs: release.wait(5) and compile_pdf(*args, **kwargs))
+
+    report_jobs.shutdown()
+    monkeypatch.setattr(report_jobs, "backend", "thread")
+    try:
+        first = report_jobs.submit("long", "source", "roster", str(tmp_path), coalesce_key="k")
+        assert report_jobs.submit("long", "source", "roster", str(tmp_path), coalesce_key="k") is first
+        release.set()
+        first.future.result(5)
+        time.sleep(0.05)
+        assert report_jobs.submit("long", "source", "roster", str(tmp_path), coalesce_key="k") is not first
+    finally:
+        release.set()
+        report_jobs.shutdown()
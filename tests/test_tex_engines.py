@@ -0,0 +1,114 @@
+# tests/test_tex_engines.py
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from utils import latex, tex_engines, tex_runner
+
+
+def test_engine_chosen_per_template():
+    """TEX_ENGINES picks the engine of a template, TEX_ENGINE that of the others; unknown names fail."""
+    config = {"TEX_ENGINE": "lualatex", "TEX_ENGINES": {"sfr_template.tex": "pdflatex"}}
+    assert tex_engines.engine_for("sfr_template.tex", config) == "pdflatex"
+    assert tex_engines.engine_for("lfr_template.tex", config) == "lualatex"
+    assert tex_engines.engine_for("lfr_template.tex", {}) == "xelatex"
+    with pytest.raises(ValueError):
+        tex_engines.engine_for("lfr_template.tex", {"TEX_ENGINE": "troff"})
+
+
+def test_engine_commands():
+    """Only xelatex starts from a format; tectonic gets the search paths on its command line."""
+    xelatex, pdflatex, tectonic = (tex_engines.get_engine(name) for name in ("xelatex", "pdflatex", "tectonic"))
+    assert xelatex.command("a.tex", "/ws", fmt="/formats/pre-1.fmt")[:2] == ["xelatex", "-fmt=pre-1"]
+    assert pdflatex.command("a.tex", "/ws", fmt="/formats/pre-1.fmt") == [
+        "pdflatex", "-interaction=nonstopmode", "-output-directory", "/ws", "a.tex"
+    ]
+    assert tectonic.command("a.tex", "/ws", search_paths=["/reports"]) == [
+        "tectonic", "--outdir", "/ws", "-Z", "search-path=/reports", "a.tex"
+    ]
+
+
+def test_compile_pdf_runs_the_chosen_engine(tmp_path, monkeypatch):
+    """compile_pdf runs the engine it is given, without the xelatex format or warm pool."""
+    commands = []
+
+    def fake_run(command, **kwargs):
+        commands.append(command)
+        with open(tmp_path / "ws.pdf", "w") as f:
+            f.write("pdf")
+        return subprocess.CompletedProcess(command, 0, "", "")
+
+    monkeypatch.setattr(tex_runner.subprocess, "run", fake_run)
+    monkeypatch.setattr(latex, "build_workspace", lambda scratch_dir=None: _Workspace(tmp_path))
+    result = latex.compile_pdf("source", "ws", str(tmp_path / "out.pdf"), fmt="/formats/pre-1.fmt",
+                               warm_pool={"size": 1}, engine="lualatex")
+    assert result["success"] is True
+    engine_command = ["lualatex", "-interaction=nonstopmode", "-output-directory", str(tmp_path),
+                      str(tmp_path / "ws.tex")]
+    assert commands == [tex_runner.limited_command(engine_command, tex_runner.DEFAULT_LIMITS)]
+
+
+class _Workspace:
+    def __init__(self, path):
+        self.path = path
+
+    def __enter__(self):
+        return str(self.path)
+
+    def __exit__(self, *exc):
+        return False
+
+
+def test_report_built_with_its_templates_engine(authenticated_client, app, test_data, report_templates,
+                                               monkeypatch):
+    """A report is compiled with the engine configured for its template."""
+    engines = []
+
+    def compile_pdf(tex_source, jobname, dest_path, **kwargs):
+        engines.append((kwargs.get("engine"), "fmt" in kwargs, "warm_pool" in kwargs))
+        with open(dest_path, "w") as f:
+            f.write("pdf")
+        return {"success": True, "path": dest_path}
+
+    monkeypatch.setattr(latex, "compile_pdf", compile_pdf)
+    monkeypatch.setitem(app.config, "TEX_ENGINES", {"sfr_template.tex": "pdflatex"})
+    monkeypatch.setitem(app.config, "REPORT_WARM_POOL_SIZE", 1)
+    assert authenticated_client.get("/report/short").status_code == 200
+    assert engines == [("pdflatex", False, False)]
+
+
+class _ScriptEngine(tex_engines.TexEngine):
+    """Stands in for a TeX engine: allocates some memory and writes a PDF."""
+
+    def command(self, tex_path, workspace, fmt=None, search_paths=()):
+        script = ("import os, sys; block = bytearray(64 * 2 ** 20); "
+                  "open(os.path.join(sys.argv[1], 'benchmark.pdf'), 'w').write('x' * 2048)")
+        return [sys.executable, "-c", script, workspace]
+
+
+def test_benchmark_measures_each_compile(tmp_path):
+    """The benchmark reports the fastest wall time, the peak RSS and the PDF size of each source and engine."""
+    results = list(tex_engines.benchmark({"a.tex": "source", "b.tex": "source"}, [_ScriptEngine("script")],
+                                         scratch_dir=str(tmp_path), runs=2))
+    assert [(result["name"], result["engine"], result["ok"]) for result in results] == [
+        ("a.tex", "script", True), ("b.tex", "script", True)
+    ]
+    assert all(result["pdf_size"] == 2048 for result in results)
+    assert all(result["peak_rss"] > 64 * 2 ** 20 for result in results)
+    assert all(0 < result["seconds"] < 30 for result in results)
+
+
+def test_run_measured_without_wait4(tmp_path, monkeypatch):
+    """Where os.wait4 is missing (Windows) the run is still timed, and its peak RSS is unknown."""
+    monkeypatch.delattr(os, "wait4")
+    returncode, seconds, peak_rss = tex_engines.run_measured([sys.executable, "-c", "raise SystemExit(3)"],
+                                                             str(tmp_path))
+    assert returncode == 3
+    assert 0 < seconds < 30
+    assert peak_rss is None
+
+    results = list(tex_engines.benchmark({"a.tex": "source"}, [_ScriptEngine("script")], scratch_dir=str(tmp_path)))
+    assert results[0]["ok"] is True and results[0]["peak_rss"] is None
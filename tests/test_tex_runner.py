@@ -0,0 +1,107 @@
+# tests/test_tex_runner.py
+
+import os
+import shutil
+import sys
+
+import pytest
+
+from extensions import db
+from models.letters import LetterTemplate
+from utils import latex, tex_engines, tex_runner
+
+
+def _python(script):
+    return [sys.executable, "-c", script]
+
+
+def test_run_stops_at_its_timeout(tmp_path):
+    """A run past its wall-clock limit is killed and reported as timed out."""
+    run = tex_runner.run(_python("import time; print('started', flush=True); time.sleep(30)"), str(tmp_path),
+                         limits={"timeout": 0.5})
+    assert run.stopped == tex_runner.TIMEOUT
+    assert run.seconds < 10
+    assert "started" in run.output
+    assert run.to_dict()["stopped"] == "timeout"
+    assert "did not finish within 0.5 seconds" in run.describe()
+
+
+def test_run_keeps_the_end_of_the_output(tmp_path):
+    """Only the last output_bytes of the output are kept."""
+    run = tex_runner.run(_python("print('x' * 200000); print('! Undefined control sequence.')"), str(tmp_path),
+                         limits={"output_bytes": 1000})
+    assert run.stopped is None
+    assert run.truncated is True
+    assert len(run.output) == 1000
+    assert run.output.rstrip().endswith("! Undefined control sequence.")
+
+
+@pytest.mark.skipif(os.name != "posix" or shutil.which("prlimit") is None, reason="needs the prlimit command")
+def test_run_applies_resource_limits(tmp_path):
+    """CPU time beyond RLIMIT_CPU stops the run; RLIMIT_AS makes a large allocation fail."""
+    run = tex_runner.run(_python("while True: pass"), str(tmp_path), limits={"cpu_seconds": 1, "timeout": 30})
+    assert run.stopped == tex_runner.CPU_LIMIT
+    assert run.signal_name == "SIGXCPU"
+
+    run = tex_runner.run(_python("block = bytearray(1024 * 2 ** 20)"), str(tmp_path),
+                         limits={"memory_bytes": 512 * 2 ** 20})
+    assert run.returncode != 0
+    assert "MemoryError" in run.output
+
+
+@pytest.mark.skipif(tex_runner.resource is None, reason="resource limits are POSIX only")
+def test_limits_are_set_by_prlimit(monkeypatch, caplog):
+    """The CPU and memory limits are set by the prlimit command, not in the forked child; without it they are not."""
+    limits = {"cpu_seconds": 10, "memory_bytes": 2 ** 30}
+    assert "preexec_fn" not in tex_runner.popen_options()
+
+    monkeypatch.setattr(tex_runner.shutil, "which", lambda name: "/usr/bin/prlimit")
+    unlimited = (tex_runner.resource.RLIM_INFINITY, tex_runner.resource.RLIM_INFINITY)
+    monkeypatch.setattr(tex_runner.resource, "getrlimit", lambda limit: unlimited)
+    assert tex_runner.limited_command(["xelatex", "doc.tex"], limits) == [
+        "/usr/bin/prlimit", f"--cpu=10:{10 + tex_runner.CPU_GRACE}", f"--as={2 ** 30}:{2 ** 30}", "--",
+        "xelatex", "doc.tex"
+    ]
+    assert tex_runner.limited_command(["xelatex"], {"cpu_seconds": 0, "memory_bytes": 0}) == ["xelatex"]
+
+    monkeypatch.setattr(tex_runner.shutil, "which", lambda name: None)
+    monkeypatch.setattr(tex_runner, "_warned", False)
+    assert tex_runner.limited_command(["xelatex", "doc.tex"], limits) == ["xelatex", "doc.tex"]
+    assert "only the timeout and the output limit apply" in caplog.text
+
+
+class _SleepingEngine(tex_engines.TexEngine):
+    """Stands in for a TeX engine caught in a loop."""
+
+    def command(self, tex_path, workspace, fmt=None, search_paths=()):
+        return _python("import time; time.sleep(30)")
+
+
+def test_stopped_letter_is_reported(authenticated_client, app, monkeypatch):
+    """A letter whose compile hits the time limit answers with the reason, not a hung request."""
+    monkeypatch.setitem(tex_engines.ENGINES, "sleepy", _SleepingEngine("sleepy"))
+    monkeypatch.setitem(app.config, "TEX_ENGINES", {tex_engines.LETTERS: "sleepy"})
+    monkeypatch.setitem(app.config, "TEX_TIMEOUT", 0.5)
+    with app.app_context():
+        if not LetterTemplate.query.first():
+            db.session.add(LetterTemplate(header="\\documentclass{article}\n\\begin{document}", body="\\end{document}"))
+            db.session.commit()
+
+    response = authenticated_client.post("/api/letters/generate_letter", data={
+        "recipient": "John Sleeper", "salutation": "Dear John", "apartment": "101"
+    })
+    data = response.get_json()
+    assert data["success"] is False
+    assert data["run"]["stopped"] == "timeout"
+    assert data["run"]["engine"] == os.path.basename(sys.executable)
+    assert not os.path.exists(os.path.join(app.root_path, "files_letters", "Sleeper.pdf"))
+
+
+def test_stopped_compile_carries_the_run(tmp_path, monkeypatch):
+    """The failure of a compile stopped by a limit carries how the run ended."""
+    monkeypatch.setitem(tex_engines.ENGINES, "sleepy", _SleepingEngine("sleepy"))
+    result = latex.compile_pdf("source", "roster", str(tmp_path / "roster.pdf"), engine="sleepy",
+                               limits={"timeout": 0.5})
+    assert result["success"] is False
+    assert result["run"]["stopped"] == "timeout"
+    assert result["error"].startswith(f"{os.path.basename(sys.executable)} did not finish within 0.5 seconds")
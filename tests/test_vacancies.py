@@ -0,0 +1,94 @@
+# tests/test_vacancies.py
+
+from datetime import date
+
+from extensions import db
+from models.office import Office
+from models.person import Person
+from models.term import Term
+from utils import vacancies
+
+AS_OF = date(2021, 6, 1)  # All three terms of the test data are active
+
+
+def test_open_seats_from_seat_counts(app, test_data):
+    """Offices are open when they have fewer active terms than seats, or no terms at all."""
+    with app.app_context():
+        assert vacancies.open_seats(AS_OF) == []
+
+        db.session.get(Office, 1).seats = 2
+        db.session.add(Office(office_id=4, title="Test Office 4", office_precedence=3.0, office_body_id=1))
+        # A legacy placeholder does not fill a seat
+        db.session.add(Person(person_id=4, first="(Vacant)", last=" "))
+        db.session.add(Term(term_person_id=4, term_office_id=4, start=date(2021, 1, 1), end=date(2022, 12, 31)))
+        db.session.commit()
+
+        rows = vacancies.open_seats(AS_OF)
+        assert [(row.title, row.seats, row.filled, row.open_seats) for row in rows] == [
+            ("Test Office 1", 2, 1, 1),
+            ("Test Office 4", 1, 0, 1),
+        ]
+
+        # Once a term has ended its seat is open again
+        assert [row.title for row in vacancies.open_seats(date(2022, 6, 1))] == [
+            "Test Office 1", "Test Office 4", "Test Office 3"
+        ]
+
+
+def test_vacancies_endpoint(authenticated_client, test_data):
+    """/api/office/vacancies lists the open offices, optionally for one body."""
+    response = authenticated_client.get("/api/office/vacancies?as_of=2022-06-01")
+    assert response.status_code == 200
+    assert [(office["title"], office["open"]) for office in response.get_json()] == [
+        ("Test Office 3", 1)
+    ]
+
+    response = authenticated_client.get("/api/office/vacancies?as_of=2022-06-01&body_id=1")
+    assert response.get_json() == []
+
+    assert authenticated_client.get("/api/office/vacancies?as_of=soon").status_code == 400
+
+
+def test_office_seats(authenticated_client, test_data):
+    """Offices are created with one seat unless told otherwise, and seats must be positive."""
+    response = authenticated_client.post("/api/office/create", json={"title": "Board", "body_id": 1})
+    assert response.get_json()["seats"] == 1
+
+    response = authenticated_client.post("/api/office/update", json={"id": 1, "seats": 3})
+    assert response.get_json()["seats"] == 3
+
+    assert authenticated_client.post("/api/office/update", json={"id": 1, "seats": 0}).status_code == 400
+    assert authenticated_client.post("/api/office/create",
+                                     json={"title": "Board", "body_id": 1, "seats": 1.5}).status_code == 400
+
+
+def test_vacancies_report_uses_seats(authenticated_client, test_data):
+    """The vacancies report lists open seats; every test term has ended by now."""
+    response = authenticated_client.get("/report/vacancies?format=json")
+    assert response.status_code == 200
+    members = [member for body in response.get_json()["bodies"] for member in body["members"]]
+    assert [(member["office"], member["open_seats"]) for member in members] == [
+        ("Test Office 1", 1), ("Test Office 2", 1), ("Test Office 3", 1)
+    ]
+
+
+def test_export_vacant_lists_open_seats(authenticated_client, app, test_data):
+    """?vacant=1 exports the open seats, not the terms of offices with one."""
+    with app.app_context():
+        # Office 1 is held again, by someone other than its past incumbent; office 4 has never been held
+        db.session.add(Term(term_person_id=2, term_office_id=1, start=date(2020, 1, 1), end=None))
+        db.session.add(Office(office_id=4, title="Test Office 4", office_precedence=3.0, office_body_id=1))
+        db.session.commit()
+
+    response = authenticated_client.get("/report/export?vacant=1")
+    assert response.status_code == 200
+    assert response.get_data(as_text=True).splitlines() == [
+        "Body,Office,Seats,Filled,Open",
+        "Test Body 1,Test Office 2,1,0,1",
+        "Test Body 1,Test Office 4,1,0,1",
+        "Test Body 2,Test Office 3,1,0,1",
+    ]
+
+    response = authenticated_client.get("/report/export?vacant=1&body=2")
+    assert response.get_data(as_text=True).splitlines()[1:] == ["Test Body 2,Test Office 3,1,0,1"]
+    assert authenticated_client.get("/report/export?vacant=1&expiring=2022").status_code == 400
@@ -0,0 +1,261 @@
+# utils/compile_gate.py — admission control for LaTeX compiles.
+#
+# Every xelatex run needs a slot.  Slots are limited twice: by a semaphore within the process and
+# by a set of lock files shared by all processes of the app (WSGI processes and report job
+# workers), so the total number of concurrent compiles on the server stays at REPORT_COMPILE_SLOTS.
+# Requests wait for a slot in a bounded queue; when REPORT_COMPILE_QUEUE requests are already
+# waiting, or the wait exceeds REPORT_COMPILE_WAIT seconds, the request is turned away with
+# CompileQueueFull, which the routes answer with 503 and a Retry-After header.
+#
+# The gate counts queue depth, wait times and rejections; /report/gate shows them.
+
+import hashlib
+import math
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class CompileQueueFull(Exception):
+    """No compile slot is available; try again after `retry_after` seconds."""
+
+    def __init__(self, retry_after, message="The server is busy compiling other documents. Please try again shortly."):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _try_lock(f):
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def acquire_file_slot(lock_dir, slots, timeout, poll_interval=0.05):
+    """
+    Lock one of the `slots` lock files in `lock_dir`, waiting up to `timeout` seconds.  Returns the
+    open lock file (closing it releases the slot), or None on timeout.  The operating system drops
+    the lock if the process dies, so a crashed compile cannot leak a slot.
+    """
+    os.makedirs(lock_dir, exist_ok=True)
+    deadline = time.monotonic() + timeout
+    while True:
+        for i in range(slots):
+            f = open(os.path.join(lock_dir, f"slot-{i}.lock"), "a+")
+            if _try_lock(f):
+                return f
+            f.close()
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(poll_interval)
+
+
+def acquire_file_lock(path, timeout, poll_interval=0.05):
+    """
+    Lock the file at `path`, waiting up to `timeout` seconds.  Returns the open lock file (release
+    it with release_file_lock), or None on timeout.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    deadline = time.monotonic() + timeout
+    while True:
+        f = open(path, "a+")
+        if _try_lock(f):
+            if _is_linked(f, path):
+                return f
+            # Its holder removed the file on release; lock the one now at `path`
+            _unlock(f)
+            f.close()
+            continue
+        f.close()
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(poll_interval)
+
+
+def _is_linked(f, path):
+    try:
+        return os.fstat(f.fileno()).st_ino == os.stat(path).st_ino
+    except FileNotFoundError:
+        return False
+
+
+def release_file_lock(f):
+    """Release a lock taken with acquire_file_lock and remove its file, so that lock files do not pile up."""
+    if fcntl is not None:
+        # Removed while still locked: a waiter that opened it meanwhile sees it unlinked and retries
+        os.remove(f.name)
+        release_file_slot(f)
+        return
+    # Windows cannot remove an open file; whoever has it open now will remove it in turn
+    release_file_slot(f)
+    try:
+        os.remove(f.name)
+    except OSError:
+        pass
+
+
+def release_file_slot(f):
+    try:
+        _unlock(f)
+    finally:
+        f.close()
+
+
+@contextmanager
+def file_slot(lock_dir, slots, timeout):
+    """
+    Hold a cross-process compile slot for the duration of the block; raises CompileQueueFull when
+    none frees up within `timeout` seconds.  Used by report job workers, which have no gate.
+    """
+    f = acquire_file_slot(lock_dir, slots, timeout)
+    if f is None:
+        raise CompileQueueFull(retry_after=max(1, int(timeout)))
+    try:
+        yield
+    finally:
+        release_file_slot(f)
+
+
+class CompileGate:
+    """
+    Process-wide gate in front of the LaTeX compiles.
+
+    Configuration (read in init_app):
+        REPORT_COMPILE_SLOTS     compiles running at once across all processes (default: CPUs)
+        REPORT_COMPILE_QUEUE     requests allowed to wait for a slot (default: 2 per slot)
+        REPORT_COMPILE_WAIT      seconds a request waits for a slot before it is turned away (default: 30)
+        REPORT_COMPILE_LOCK_DIR  directory of the shared slot lock files (default: under the system
+                                 temporary directory, one per app)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.slots = os.cpu_count() or 2
+        self.max_queue = 2 * self.slots
+        self.max_wait = 30
+        self.lock_dir = None
+        self._semaphore = threading.BoundedSemaphore(self.slots)
+        self.reset_metrics()
+
+    def init_app(self, app):
+        self.slots = int(app.config.get("REPORT_COMPILE_SLOTS") or os.cpu_count() or 2)
+        queue = app.config.get("REPORT_COMPILE_QUEUE")
+        self.max_queue = int(queue) if queue is not None else 2 * self.slots
+        self.max_wait = app.config.get("REPORT_COMPILE_WAIT", 30)
+        self.lock_dir = app.config.get("REPORT_COMPILE_LOCK_DIR") or os.path.join(
+            tempfile.gettempdir(),
+            "clerk-compile-slots-" + hashlib.sha256(app.root_path.encode("utf-8")).hexdigest()[:12]
+        )
+        self._semaphore = threading.BoundedSemaphore(self.slots)
+        self.reset_metrics()
+
+    def reset_metrics(self):
+        with self._lock:
+            self.waiting = 0
+            self.running = 0
+            self.admitted = 0
+            self.rejected = 0
+            self.total_wait = 0.0
+            self.max_wait_seen = 0.0
+            self.average_compile = None
+
+    def slot_options(self):
+        """The settings a report job worker needs to take a cross-process slot (see file_slot)."""
+        return {"lock_dir": self.lock_dir, "slots": self.slots, "timeout": self.max_wait}
+
+    def retry_after(self):
+        """Seconds a turned-away client should wait, estimated from the queue and compile times."""
+        average = self.average_compile or 5
+        return max(1, math.ceil(average * (self.waiting / self.slots + 1)))
+
+    def check_queue(self, pending):
+        """Turn a new queued job away when `pending` jobs already fill the slots and the queue."""
+        if pending >= self.slots + self.max_queue:
+            with self._lock:
+                self.rejected += 1
+            raise CompileQueueFull(self.retry_after())
+
+    @contextmanager
+    def slot(self):
+        """Wait in the bounded queue for a compile slot and hold it for the duration of the block."""
+        started = time.monotonic()
+        with self._lock:
+            acquired = self._semaphore.acquire(blocking=False)
+            if not acquired and self.waiting >= self.max_queue:
+                self.rejected += 1
+                raise CompileQueueFull(self.retry_after())
+            self.waiting += 1
+
+        lock_file = None
+        try:
+            if acquired or self._semaphore.acquire(timeout=self.max_wait):
+                # A free slot in this process; now one across all processes
+                remaining = max(0, self.max_wait - (time.monotonic() - started))
+                lock_file = acquire_file_slot(self.lock_dir, self.slots, remaining)
+                if lock_file is None:
+                    self._semaphore.release()
+        finally:
+            waited = time.monotonic() - started
+            with self._lock:
+                self.waiting -= 1
+                if lock_file is None:
+                    self.rejected += 1
+                else:
+                    self.admitted += 1
+                    self.running += 1
+                    self.total_wait += waited
+                    self.max_wait_seen = max(self.max_wait_seen, waited)
+
+        if lock_file is None:
+            raise CompileQueueFull(self.retry_after())
+
+        compile_started = time.monotonic()
+        try:
+            yield
+        finally:
+            release_file_slot(lock_file)
+            self._semaphore.release()
+            duration = time.monotonic() - compile_started
+            with self._lock:
+                self.running -= 1
+                # Moving average of the compile time, for Retry-After
+                self.average_compile = (duration if self.average_compile is None
+                                        else 0.8 * self.average_compile + 0.2 * duration)
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "slots": self.slots,
+                "max_queue": self.max_queue,
+                "max_wait": self.max_wait,
+                "waiting": self.waiting,
+                "running": self.running,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "average_wait": self.total_wait / self.admitted if self.admitted else 0.0,
+                "longest_wait": self.max_wait_seen,
+                "average_compile": self.average_compile,
+            }
+
+
+compile_gate = CompileGate()
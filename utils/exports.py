@@ -0,0 +1,181 @@
+# utils/exports.py — streaming CSV and XLSX exports of the roster rows (ReportRecord).
+#
+# Exports can cover years of history, so rows are never collected into a list: the query is
+# iterated with yield_per (plain column tuples, no ORM objects) and each row is written out as it
+# arrives.  The XLSX workbook is a zip written to an unseekable buffer that the generator drains
+# after every row, so memory use does not grow with the number of rows.
+
+import csv
+import io
+import zipfile
+from xml.sax.saxutils import escape
+
+from sqlalchemy import select
+
+from extensions import db
+from models.report_record import ReportRecord
+from utils import vacancies
+
+BATCH_SIZE = 500
+
+# Exported columns: (heading, ReportRecord column)
+COLUMNS = [
+    ("Body", ReportRecord.name),
+    ("Office", ReportRecord.title),
+    ("First", ReportRecord.first),
+    ("Last", ReportRecord.last),
+    ("Email", ReportRecord.email),
+    ("Phone", ReportRecord.phone),
+    ("Apt", ReportRecord.apt),
+    ("Term", ReportRecord.ordinal),
+    ("Start", ReportRecord.start),
+    ("End", ReportRecord.end),
+]
+
+HEADINGS = [heading for heading, _ in COLUMNS]
+
+# Exported columns of the open seats (?vacant=1): one row per office, not per term
+VACANCY_HEADINGS = ["Body", "Office", "Seats", "Filled", "Open"]
+
+
+def iter_rows(conditions=(), batch_size=BATCH_SIZE):
+    """Yield the exported columns of the matching roster rows, in roster order, in batches."""
+    statement = (
+        select(*[column for _, column in COLUMNS])
+        .where(*conditions)
+        .order_by(ReportRecord.body_precedence, ReportRecord.office_precedence, ReportRecord.start)
+        .execution_options(yield_per=batch_size)
+    )
+    for row in db.session.execute(statement):
+        yield tuple(row)
+
+
+def iter_vacancies(body_id=None, as_of=None, batch_size=BATCH_SIZE):
+    """Yield the offices with open seats on `as_of` (default: today), as in the vacancies report."""
+    seats = vacancies.open_seats_query(as_of, body_id).subquery()
+    statement = (
+        select(seats.c.name, seats.c.title, seats.c.seats, seats.c.filled, seats.c.open_seats)
+        .order_by(seats.c.body_precedence, seats.c.office_precedence)
+        .execution_options(yield_per=batch_size)
+    )
+    for row in db.session.execute(statement):
+        yield tuple(row)
+
+
+def _cell_text(value):
+    if value is None:
+        return ""
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+
+def stream_csv(rows, headings=HEADINGS):
+    """Yield CSV text, one line per row."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def drain():
+        data = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+
+    writer.writerow(headings)
+    yield drain()
+    for row in rows:
+        writer.writerow([_cell_text(value) for value in row])
+        yield drain()
+
+
+class _StreamBuffer:
+    """A write-only, unseekable file that collects bytes until they are taken."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+
+_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+
+_SHEET_END = '</sheetData></worksheet>'
+
+
+def _xlsx_row(values):
+    # Inline strings keep the sheet self-contained: no shared string table to build up in memory
+    cells = "".join(
+        f'<c t="inlineStr"><is><t xml:space="preserve">{escape(_cell_text(value))}</t></is></c>'
+        for value in values
+    )
+    return f"<row>{cells}</row>"
+
+
+def stream_xlsx(rows, headings=HEADINGS, sheet_name="Roster"):
+    """Yield the bytes of an XLSX workbook with one sheet holding `headings` and `rows`."""
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as workbook:
+        workbook.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        workbook.writestr("_rels/.rels", _ROOT_RELS)
+        workbook.writestr("xl/workbook.xml", _WORKBOOK.format(name=escape(sheet_name, {'"': "&quot;"})))
+        workbook.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS)
+        yield buffer.take()
+
+        with workbook.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+            sheet.write((_SHEET_START + _xlsx_row(headings)).encode("utf-8"))
+            for row in rows:
+                sheet.write(_xlsx_row(row).encode("utf-8"))
+                data = buffer.take()
+                if data:
+                    yield data
+            sheet.write(_SHEET_END.encode("utf-8"))
+    yield buffer.take()
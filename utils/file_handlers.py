@@ -1,6 +1,14 @@
+import hashlib
 import os
+import shutil
+import threading
+import uuid
 from flask import send_file, current_app
 
+# Content hashes of served files, by path, valid while (mtime, size, inode) are unchanged
+_etags = {}
+_etags_lock = threading.Lock()
+
 def get_file_path(filename):
     """
     Determine the file path based on the file extension.
@@ -37,13 +45,46 @@ def validate_file_exists(filename, file_path=None):
 
     return True, file_path
 
+def file_etag(file_path):
+    """
+    Return a strong ETag for the file: the SHA-256 of its content.  The hash is remembered until
+    the file's modification time, size or inode changes, so a file is hashed once per version.
+    """
+    stat = os.stat(file_path)
+    version = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    with _etags_lock:
+        cached = _etags.get(file_path)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    etag = digest.hexdigest()
+
+    with _etags_lock:
+        _etags[file_path] = (version, etag)
+    return etag
+
+
 def serve_file(file_path, mimetype):
     """
     Serve a file with the specified mimetype.
     Returns a Flask response object or raises an exception.
+
+    The response carries a content-derived ETag and Last-Modified and must be revalidated on every
+    use, so reopening an unchanged file is answered 304 without a body.  Range requests get 206
+    partial content, which lets PDF viewers fetch pages as they need them.
     """
     try:
-        return send_file(file_path, mimetype=mimetype)
+        return send_file(
+            file_path,
+            mimetype=mimetype,
+            conditional=True,
+            etag=file_etag(file_path),
+            max_age=0
+        )
     except Exception as e:
         raise Exception(f"Error opening file: {e}")
 
@@ -60,3 +101,18 @@ def check_directory_for_files(directory, extension, error_message):
         return False, f"There are currently no files with extension {extension} in the directory."
 
     return True, files
+
+
+def atomic_copy(src, dest):
+    """
+    Copy `src` to `dest` so that readers of `dest` never see a partially written file.
+    The copy goes to a temporary name in the destination directory and is then renamed into place,
+    which also works when `src` is on another filesystem.
+    """
+    tmp_path = f"{dest}.{uuid.uuid4().hex}.tmp"
+    try:
+        shutil.copyfile(src, tmp_path)
+        os.replace(tmp_path, dest)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
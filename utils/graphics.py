@@ -0,0 +1,162 @@
+# utils/graphics.py — graphics for the LaTeX builds, converted once instead of on every compile.
+#
+# The report logo is a JPEG.  Wrapping it in a one-page PDF lets xelatex place it as a ready-made
+# XObject; the JPEG data is embedded as is (DCTDecode), so nothing is re-encoded and the page has
+# the image's natural size, which is what \includegraphics used before.
+
+import os
+import struct
+import uuid
+
+# SOF markers carry the image size; C4 (DHT), C8 (JPG) and CC (DAC) share the range but do not
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+_COLOR_SPACES = {1: "/DeviceGray", 3: "/DeviceRGB", 4: "/DeviceCMYK"}
+
+
+def _exif_resolution(data):
+    """Return (x_dpi, y_dpi) from the TIFF structure of an Exif segment, or None."""
+    if data[:6] != b"Exif\0\0":
+        return None
+    tiff = data[6:]
+    order = {b"II": "<", b"MM": ">"}.get(tiff[:2])
+    if order is None:
+        return None
+
+    try:
+        (ifd_offset,) = struct.unpack(order + "I", tiff[4:8])
+        (count,) = struct.unpack(order + "H", tiff[ifd_offset:ifd_offset + 2])
+        values = {}
+        for i in range(count):
+            entry = tiff[ifd_offset + 2 + 12 * i:ifd_offset + 14 + 12 * i]
+            tag, field_type, _, value = struct.unpack(order + "HHI4s", entry)
+            if tag in (0x011A, 0x011B) and field_type == 5:
+                (offset,) = struct.unpack(order + "I", value)
+                numerator, denominator = struct.unpack(order + "II", tiff[offset:offset + 8])
+                values[tag] = numerator / denominator if denominator else 0
+            elif tag == 0x0128 and field_type == 3:
+                values[tag] = struct.unpack(order + "H", value[:2])[0]
+    except struct.error:
+        return None
+
+    x_res, y_res = values.get(0x011A), values.get(0x011B)
+    if not x_res or not y_res:
+        return None
+    if values.get(0x0128, 2) == 3:  # pixels per centimetre
+        x_res, y_res = x_res * 2.54, y_res * 2.54
+    return x_res, y_res
+
+
+def jpeg_info(data):
+    """
+    Read the size, components and resolution of a JPEG.
+
+    Returns a dict with "width", "height", "components", "dpi" (x, y; 72 when the file does not say,
+    as xelatex assumes) and "adobe_inverted" for Adobe CMYK files stored with inverted values.
+    """
+    if data[:2] != b"\xff\xd8":
+        raise ValueError("Not a JPEG file")
+
+    info = {"dpi": None, "adobe_inverted": False}
+    i = 2
+    while i + 4 <= len(data):
+        if data[i] != 0xFF:
+            raise ValueError("Corrupt JPEG marker")
+        marker = data[i + 1]
+        if marker == 0xFF:  # fill byte
+            i += 1
+            continue
+        (length,) = struct.unpack(">H", data[i + 2:i + 4])
+        segment = data[i + 4:i + 2 + length]
+
+        if marker == 0xE0 and segment[:5] == b"JFIF\0" and info["dpi"] is None:
+            units, x_density, y_density = struct.unpack(">BHH", segment[7:12])
+            if units and x_density and y_density:
+                scale = 2.54 if units == 2 else 1
+                info["dpi"] = (x_density * scale, y_density * scale)
+        elif marker == 0xE1 and info["dpi"] is None:
+            info["dpi"] = _exif_resolution(segment)
+        elif marker == 0xEE and segment[:5] == b"Adobe":
+            info["adobe_inverted"] = True
+        elif marker in _SOF_MARKERS:
+            _, height, width, components = struct.unpack(">BHHB", segment[:6])
+            info.update(width=width, height=height, components=components)
+            break
+        i += 2 + length
+
+    if "width" not in info:
+        raise ValueError("JPEG has no frame header")
+    info["dpi"] = info["dpi"] or (72, 72)
+    return info
+
+
+def jpeg_image(data):
+    """
+    Return the PDF image XObject (as an object body) embedding the JPEG `data` as is, and the
+    image's natural width and height in points.
+    """
+    info = jpeg_info(data)
+    color_space = _COLOR_SPACES.get(info["components"])
+    if color_space is None:
+        raise ValueError(f"Unsupported JPEG with {info['components']} components")
+    decode = " /Decode [1 0 1 0 1 0 1 0]" if info["components"] == 4 and info["adobe_inverted"] else ""
+
+    body = (f"<< /Type /XObject /Subtype /Image /Width {info['width']} /Height {info['height']} "
+            f"/ColorSpace {color_space} /BitsPerComponent 8{decode} /Filter /DCTDecode "
+            f"/Length {len(data)} >>\nstream\n").encode("ascii") + data + b"\nendstream"
+    return body, info["width"] * 72 / info["dpi"][0], info["height"] * 72 / info["dpi"][1]
+
+
+def write_pdf(objects, pdf_path):
+    """
+    Write a PDF file of `objects` (object bodies as bytes; object n is objects[n - 1], the first
+    is the catalog) to `pdf_path`, replacing it atomically.
+    """
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode("ascii") + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("ascii")
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode("ascii")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("ascii")
+
+    tmp_path = f"{pdf_path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(out)
+    os.replace(tmp_path, pdf_path)
+
+
+def jpeg_to_pdf(jpeg_path, pdf_path):
+    """Write a one-page PDF showing the JPEG at `jpeg_path` at its natural size."""
+    with open(jpeg_path, "rb") as f:
+        data = f.read()
+    image, width_pt, height_pt = jpeg_image(data)
+    content = f"q {width_pt:.4f} 0 0 {height_pt:.4f} 0 0 cm /Im0 Do Q".encode("ascii")
+
+    write_pdf([
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {width_pt:.4f} {height_pt:.4f}] "
+         f"/Resources << /XObject << /Im0 4 0 R >> >> /Contents 5 0 R >>").encode("ascii"),
+        image,
+        f"<< /Length {len(content)} >>\nstream\n".encode("ascii") + content + b"\nendstream",
+    ], pdf_path)
+
+
+def convert_graphics(source_dir, dest_dir, names):
+    """
+    Make a PDF copy in `dest_dir` of each JPEG `<name>.jpg` in `source_dir`, converting only those
+    that are new or changed since their last conversion.  Returns `dest_dir`, for the TeX search path.
+    """
+    os.makedirs(dest_dir, exist_ok=True)
+    for name in names:
+        jpeg_path = os.path.join(source_dir, f"{name}.jpg")
+        pdf_path = os.path.join(dest_dir, f"{name}.pdf")
+        if not os.path.exists(jpeg_path):
+            continue
+        if os.path.exists(pdf_path) and os.path.getmtime(pdf_path) >= os.path.getmtime(jpeg_path):
+            continue
+        jpeg_to_pdf(jpeg_path, pdf_path)
+    return dest_dir
@@ -0,0 +1,114 @@
+# utils/latex.py — helpers for compiling LaTeX sources to PDF.
+#
+# The functions here do not touch Flask or the database, so they can be run in a worker process
+# of the report job queue as well as inline in a request.
+#
+# Every compile runs in its own temporary workspace, optionally on a fast scratch filesystem such
+# as a tmpfs.  The .tex, .aux and .log files never touch the shared output directories; only the
+# finished PDF is moved into place, atomically, so concurrent builds cannot clobber each other.
+# The engine runs under the time, CPU, memory and output limits of utils/tex_runner.py.
+
+import os
+import shutil
+import tempfile
+
+from utils import tex_engines, tex_runner
+from utils.file_handlers import atomic_copy
+
+
+def build_workspace(scratch_dir=None):
+    """
+    Return a TemporaryDirectory for one compile, created under `scratch_dir` when given (otherwise
+    the system temporary directory).  It is removed, with everything in it, when the build ends.
+    """
+    if scratch_dir:
+        os.makedirs(scratch_dir, exist_ok=True)
+    return tempfile.TemporaryDirectory(prefix="clerk-build-", dir=scratch_dir or None, ignore_cleanup_errors=True)
+
+
+def write_source(tex_source, path):
+    """
+    Write a LaTeX source to `path`.  `tex_source` is the source itself, or the os.PathLike of a file
+    holding it (such as a report spooled by pdf_cache.spool_source), which is copied without
+    reading it into memory.
+    """
+    if isinstance(tex_source, os.PathLike):
+        shutil.copyfile(tex_source, path)
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(tex_source)
+
+
+def latex_env(search_paths=(), source_date_epoch=None, format_dir=None):
+    """
+    Build the environment for a TeX run.
+
+    `search_paths` are prepended to TEXINPUTS so that \\input and \\includegraphics find files that
+    used to be looked up relative to the output directory.  When `source_date_epoch` is given it is
+    passed to TeX as SOURCE_DATE_EPOCH (with FORCE_SOURCE_DATE), so the PDF's dates and document ID
+    come from it rather than the clock and an identical source compiles to identical bytes.
+    `format_dir` is prepended to TEXFORMATS so that -fmt finds a precompiled format there.
+    """
+    env = dict(os.environ)
+    if search_paths:
+        # The trailing separator keeps TeX's default search path after ours
+        env["TEXINPUTS"] = os.pathsep.join(search_paths) + os.pathsep + env.get("TEXINPUTS", "")
+    if source_date_epoch is not None:
+        env["SOURCE_DATE_EPOCH"] = str(int(source_date_epoch))
+        env["FORCE_SOURCE_DATE"] = "1"
+    if format_dir:
+        env["TEXFORMATS"] = format_dir + os.pathsep + env.get("TEXFORMATS", "")
+    return env
+
+
+def compile_pdf(tex_source, jobname, dest_path, scratch_dir=None, search_paths=(), source_date_epoch=None,
+                fmt=None, warm_pool=None, engine=None, limits=None):
+    """
+    Compile the LaTeX source `tex_source` (a string or a file path, see write_source) with `engine`
+    (see utils/tex_engines.py; xelatex by default) and move the PDF to `dest_path`.
+    `fmt` is the path of a precompiled format (see utils/latex_format.py) to start from.
+
+    `warm_pool` holds the settings of utils/latex_pool.py (see pool_options); when given, the
+    source is compiled in an already started xelatex process if one is available.  Such a process
+    was started before `source_date_epoch` was known, so that is not applied to it.  Engines other
+    than xelatex ignore `fmt` and `warm_pool`.  `limits` (see tex_runner.limit_options) bound
+    the run; DEFAULT_LIMITS apply when it is not given.
+
+    Returns a dict with "success" and "path" on success, or "success" set to False, the LaTeX
+    output under "error", the raw engine output (its last part) under "log" and how the run ended
+    (RunResult.to_dict) under "run" when no PDF was produced or the run was stopped by a limit.
+    """
+    engine = tex_engines.get_engine(engine)
+    if not engine.precompiled:
+        fmt = warm_pool = None
+
+    if warm_pool:
+        from utils import latex_pool
+        result = latex_pool.compile_warm(tex_source, dest_path, fmt, search_paths, scratch_dir, limits=limits,
+                                         **warm_pool)
+        if result is not None:
+            return result
+
+    with build_workspace(scratch_dir) as workspace:
+        tex_path = os.path.join(workspace, f"{jobname}.tex")
+        write_source(tex_source, tex_path)
+
+        command = engine.command(tex_path, workspace, fmt, search_paths)
+        format_dir = os.path.dirname(fmt) if fmt else None
+
+        run = tex_runner.run(command, workspace, latex_env(search_paths, source_date_epoch, format_dir), limits)
+
+        pdf_path = os.path.join(workspace, f"{jobname}.pdf")
+        if run.stopped or not os.path.exists(pdf_path):
+            return failure(run)
+
+        atomic_copy(pdf_path, dest_path)
+
+    return {"success": True, "path": dest_path}
+
+
+def failure(run):
+    """The result of a compile that produced no PDF, or was stopped by a limit (see compile_pdf)."""
+    reason = run.describe() or "PDF not found."
+    output = "LaTeX output (last part)" if run.truncated else "LaTeX output"
+    return {"success": False, "error": f"{reason}\n\n{output}:\n{run.output}", "log": run.output, "run": run.to_dict()}
@@ -0,0 +1,155 @@
+# utils/latex_format.py — precompiled xelatex format for the shared report preamble.
+#
+# Loading the preamble's packages takes most of a report compile.  The preamble is dumped once,
+# mylatexformat style, into a format file named after a hash of the preamble and the xelatex
+# version; report builds then start from that format.  Editing the preamble or upgrading TeX
+# changes the hash, so the format is rebuilt on the next build and the old one is removed.
+#
+# A dump that fails (e.g. mylatexformat is not installed) leaves <name>.failed next to where the
+# format would be, holding the end of xelatex's output, and is not tried again for that preamble
+# and xelatex.  Report requests do not wait for the dump: it runs on a background thread under a
+# compile slot, and the reports compile without the format until it exists.
+#
+# Like utils/latex.py this module does not touch Flask, so formats can be built in any process.
+
+import functools
+import glob
+import hashlib
+import os
+import shutil
+import threading
+from contextlib import nullcontext
+
+from utils import latex, tex_runner
+from utils.file_handlers import atomic_copy
+
+PREAMBLE = "roster_preamble.tex"
+
+_build_lock = threading.Lock()
+# Held by the dump, so that one process dumps a format once
+_dump_lock = threading.Lock()
+# Names of the formats being built on a background thread in this process
+_building = set()
+
+
+@functools.lru_cache(maxsize=None)
+def engine_version():
+    """The first line of `xelatex --version`, or None when xelatex is not installed."""
+    if shutil.which("xelatex") is None:
+        return None
+    result = tex_runner.run(["xelatex", "--version"], limits={"timeout": 30})
+    return result.output.splitlines()[0] if result.output else ""
+
+
+def format_name(preamble_path):
+    """Name of the format for the preamble at `preamble_path` with the installed xelatex."""
+    digest = hashlib.sha256()
+    with open(preamble_path, "rb") as f:
+        digest.update(f.read())
+    digest.update(b"\0")
+    digest.update((engine_version() or "").encode("utf-8"))
+    stem = os.path.splitext(os.path.basename(preamble_path))[0]
+    return f"{stem}-{digest.hexdigest()[:16]}"
+
+
+def build_format(preamble_path, format_dir, name, scratch_dir=None, search_paths=(), limits=None):
+    """
+    Dump the preamble into `format_dir/<name>.fmt`, with xelatex under `limits` (see
+    tex_runner.limit_options).  Returns the path of the format file, or None when xelatex (or
+    mylatexformat) failed to produce one; `format_dir/<name>.failed` then records why.
+    """
+    preamble_dir, preamble_file = os.path.split(preamble_path)
+    with latex.build_workspace(scratch_dir) as workspace:
+        # mylatexformat reads this driver up to \endofdump and dumps everything loaded so far
+        driver = os.path.join(workspace, "format_driver.tex")
+        with open(driver, "w", encoding="utf-8") as f:
+            f.write(f"\\input{{{os.path.splitext(preamble_file)[0]}}}\n\\endofdump\n")
+
+        run = tex_runner.run(
+            ["xelatex", "-ini", "-interaction=nonstopmode", f"-jobname={name}",
+             "-output-directory", workspace, "&xelatex", "mylatexformat.ltx", "format_driver.tex"],
+            workspace,
+            latex.latex_env([preamble_dir, *search_paths]),
+            limits
+        )
+
+        built = os.path.join(workspace, f"{name}.fmt")
+        if run.stopped or not os.path.exists(built):
+            with open(failed_path(format_dir, name), "w", encoding="utf-8") as f:
+                f.write(run.describe() or run.output)
+            return None
+
+        format_path = os.path.join(format_dir, f"{name}.fmt")
+        atomic_copy(built, format_path)
+
+    # Formats (and failures) of earlier versions of the preamble are no use any more
+    stem = name.rsplit("-", 1)[0]
+    for old in [*glob.glob(os.path.join(format_dir, f"{stem}-*.fmt")),
+                *glob.glob(os.path.join(format_dir, f"{stem}-*.failed"))]:
+        if old != format_path:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+    return format_path
+
+
+def failed_path(format_dir, name):
+    """The marker of a failed dump of format `name`."""
+    return os.path.join(format_dir, f"{name}.failed")
+
+
+def get_format(report_dir, cache_dir, scratch_dir=None, search_paths=(), limits=None, slot=None, wait=True):
+    """
+    Return the path of the precompiled format for the preamble in `report_dir`, building it first
+    if it is missing or out of date.  Returns None when there is no preamble, xelatex is not
+    installed or the format cannot be built (now or before, see failed_path); the report then
+    compiles without it.
+
+    The dump holds `slot` (a context manager such as compile_gate.slot) while it runs.  With
+    wait=False it runs on a background thread, and None is returned until the format exists.
+    """
+    preamble_path = os.path.join(report_dir, PREAMBLE)
+    if not os.path.exists(preamble_path) or engine_version() is None:
+        return None
+
+    format_dir = os.path.join(cache_dir, "formats")
+    name = format_name(preamble_path)
+    format_path = os.path.join(format_dir, f"{name}.fmt")
+    if os.path.exists(format_path):
+        return format_path
+    if os.path.exists(failed_path(format_dir, name)):
+        return None
+
+    build = functools.partial(_build, preamble_path, format_dir, name, scratch_dir, search_paths, limits, slot)
+    if wait:
+        return build()
+    with _build_lock:
+        if name in _building:
+            return None
+        _building.add(name)
+    threading.Thread(target=_build_in_background, args=(name, build), name="format-build", daemon=True).start()
+    return None
+
+
+def _build(preamble_path, format_dir, name, scratch_dir, search_paths, limits, slot):
+    format_path = os.path.join(format_dir, f"{name}.fmt")
+    with _dump_lock:
+        if os.path.exists(format_path):
+            return format_path
+        if os.path.exists(failed_path(format_dir, name)):
+            return None
+        os.makedirs(format_dir, exist_ok=True)
+        with slot() if slot else nullcontext():
+            return build_format(preamble_path, format_dir, name, scratch_dir, search_paths, limits)
+
+
+def _build_in_background(name, build):
+    try:
+        build()
+    except Exception:
+        # E.g. no compile slot came free (CompileQueueFull): a later request tries again
+        pass
+    finally:
+        with _build_lock:
+            _building.discard(name)
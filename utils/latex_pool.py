@@ -0,0 +1,228 @@
+# utils/latex_pool.py — a pool of warm xelatex processes.
+#
+# Starting xelatex costs the process spawn, loading the format (with the report preamble when a
+# precompiled format is used) and font discovery.  The pool starts its processes ahead of time:
+# each one loads its format and then waits on stdin at TeX's "**" prompt.  A build takes a waiting
+# process, writes its document into that process's private workspace and feeds it the line that
+# inputs the document over stdin.  TeX ends its run at \end{document}, so a process serves exactly
+# one document; the pool starts a replacement as soon as one is taken.
+#
+# Processes are checked before use: one that has exited (e.g. because its format failed to load),
+# has waited longer than max_age (TeX or font updates since it started) or whose format file has
+# been replaced is discarded.  Builds that cannot get a healthy process compile cold.
+#
+# There is one pool per process and per (format, search path) combination; with the process
+# backend of the report job queue, each worker process keeps its own.  Processes start under the
+# limits of utils/tex_runner.py, and a run that exceeds its timeout is killed with its session.
+
+import atexit
+import os
+import subprocess
+import threading
+import time
+
+from utils import latex, tex_runner
+from utils.file_handlers import atomic_copy
+
+JOBNAME = "document"
+
+
+def pool_options(config):
+    """
+    Return the warm pool settings from the app config, for passing to latex.compile_pdf as
+    `warm_pool`, or None when the pool is disabled (REPORT_WARM_POOL_SIZE of 0, the default).
+    """
+    size = int(config.get("REPORT_WARM_POOL_SIZE", 0) or 0)
+    if size <= 0:
+        return None
+    return {
+        "size": size,
+        "max_age": config.get("REPORT_WARM_POOL_MAX_AGE", 600),
+        "timeout": config.get("REPORT_WARM_POOL_TIMEOUT", 120),
+    }
+
+
+class WarmProcess:
+    """An xelatex process waiting for its document, and the workspace it will compile in."""
+
+    def __init__(self, fmt, search_paths, scratch_dir, limits=None):
+        self.fmt = fmt
+        self.limits = dict(tex_runner.DEFAULT_LIMITS, **(limits or {}))
+        self.started = time.time()
+        self._workspace = latex.build_workspace(scratch_dir)
+        self.workspace = self._workspace.name
+        self._output = tex_runner.output_file(self.workspace)
+
+        command = ["xelatex", f"-jobname={JOBNAME}", "-output-directory", self.workspace]
+        format_dir = None
+        if fmt:
+            format_dir, format_file = os.path.split(fmt)
+            command.insert(1, f"-fmt={os.path.splitext(format_file)[0]}")
+
+        self.command = command
+        self.process = subprocess.Popen(
+            tex_runner.limited_command(command, self.limits),
+            cwd=self.workspace,
+            stdin=subprocess.PIPE,
+            stdout=self._output,
+            stderr=subprocess.STDOUT,
+            text=True,
+            env=latex.latex_env(search_paths, format_dir=format_dir),
+            **tex_runner.popen_options()
+        )
+        self._job = tex_runner.limit_process(self.process, self.limits)
+
+    def healthy(self, max_age):
+        """True if the process is still waiting, is not too old and its format is still current."""
+        if self.process.poll() is not None:
+            return False
+        if max_age and time.time() - self.started > max_age:
+            return False
+        return not self.fmt or os.path.exists(self.fmt)
+
+    def run(self, tex_source, timeout):
+        """
+        Compile `tex_source` in this process.  Returns (pdf_path or None, tex_runner.RunResult).
+        The PDF stays in the workspace until close().
+        """
+        latex.write_source(tex_source, os.path.join(self.workspace, f"{JOBNAME}.tex"))
+
+        start = time.monotonic()
+        timed_out = False
+        try:
+            # nonstopmode from here on: an error must not make TeX wait for more terminal input
+            self.process.communicate(f"\\nonstopmode\\input{{{JOBNAME}.tex}}\n", timeout=timeout)
+        except subprocess.TimeoutExpired:
+            timed_out = True
+            tex_runner.kill(self.process)
+            self.process.communicate()
+        output, truncated = tex_runner.read_tail(self._output, self.limits["output_bytes"])
+        run = tex_runner.RunResult(self.command, None if timed_out else self.process.returncode, output,
+                                   truncated, time.monotonic() - start, timed_out, dict(self.limits, timeout=timeout),
+                                   tex_runner.job_exceeded_cpu(self._job))
+
+        pdf_path = os.path.join(self.workspace, f"{JOBNAME}.pdf")
+        return (pdf_path if os.path.exists(pdf_path) and not run.stopped else None), run
+
+    def close(self):
+        if self.process.poll() is None:
+            self.process.kill()
+            try:
+                self.process.communicate(timeout=5)
+            except (subprocess.TimeoutExpired, ValueError, OSError):
+                pass
+        tex_runner.release_job(self._job)
+        self._output.close()
+        self._workspace.cleanup()
+
+
+class WarmPool:
+    """Keeps `size` WarmProcesses for one format and search path ready."""
+
+    def __init__(self, fmt, search_paths, scratch_dir, size, max_age, limits=None):
+        self.fmt = fmt
+        self.limits = limits
+        self.search_paths = tuple(search_paths)
+        self.scratch_dir = scratch_dir
+        self.size = size
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._idle = []
+
+    def _spawn(self):
+        try:
+            return WarmProcess(self.fmt, self.search_paths, self.scratch_dir, self.limits)
+        except OSError:
+            # xelatex is not installed (or cannot start); builds fall back to cold compiles
+            return None
+
+    def fill(self):
+        """Start processes until `size` are waiting."""
+        with self._lock:
+            while len(self._idle) < self.size:
+                process = self._spawn()
+                if process is None:
+                    break
+                self._idle.append(process)
+
+    def take(self):
+        """Return a healthy waiting process, or None when none can be started."""
+        process = None
+        with self._lock:
+            while self._idle:
+                candidate = self._idle.pop(0)
+                if candidate.healthy(self.max_age):
+                    process = candidate
+                    break
+                candidate.close()
+        if process is None:
+            # Nothing warm yet (first build, or all discarded): start one for this build
+            process = self._spawn()
+        # Replace the process taken (and any discarded) straight away, so the next build finds one
+        self.fill()
+        return process
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for process in idle:
+            process.close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(fmt, search_paths, scratch_dir, size, max_age, limits=None):
+    key = (fmt, tuple(search_paths), scratch_dir)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = WarmPool(fmt, search_paths, scratch_dir, size, max_age, limits)
+        # Processes started from now on get the new settings
+        pool.size, pool.max_age, pool.limits = size, max_age, limits
+    return pool
+
+
+def compile_warm(tex_source, dest_path, fmt=None, search_paths=(), scratch_dir=None, size=1, max_age=600,
+                 timeout=120, limits=None):
+    """
+    Compile `tex_source` in a warm process and move the PDF to `dest_path`.  The process runs under
+    `limits` (see tex_runner.limit_options) but stops at `timeout`, the warm pool's own.
+
+    Returns a result like latex.compile_pdf, or None when no warm process was available, in which
+    case the caller compiles cold.
+    """
+    pool = get_pool(fmt, search_paths, scratch_dir, size, max_age, limits)
+    process = pool.take()
+    if process is None:
+        return None
+
+    try:
+        pdf_path, run = process.run(tex_source, timeout)
+        if pdf_path is None:
+            return latex.failure(run)
+        atomic_copy(pdf_path, dest_path)
+        return {"success": True, "path": dest_path}
+    finally:
+        process.close()
+
+
+def _forget_inherited_pools():
+    # A forked worker inherits the parent's Popen objects; those processes still belong to the
+    # parent, so the child starts with pools of its own
+    _pools.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_inherited_pools)
+
+
+@atexit.register
+def shutdown():
+    """Stop every waiting process."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,194 @@
+# utils/pdf_cache.py — content-addressed cache of compiled report PDFs.
+#
+# A report is keyed by the SHA-256 of its template files and its rendered .tex source, with the
+# "generated" timestamp replaced by a placeholder.  Two builds of an unchanged roster therefore
+# share a key, and the PDF compiled the first time is reused instead of running xelatex again.
+#
+# Layout of the cache directory:
+#     <key>.pdf                   compiled PDFs, one per distinct source
+#     published/<filename>.key    the key of the PDF currently published under <filename>
+#     fragments/<key>.pdf         compiled fragments of the fragmented rosters (see reports.py)
+#     sources/<key>.tex           rendered sources waiting to be compiled; removed once compiled
+#
+# Every edit of the roster, subset, window and binder adds a PDF, so the cache is pruned after
+# each compile (see prune): the published PDFs stay, and of the others the `keep` newest and those
+# built within `max_age` seconds.  The time of a PDF is when it was built (the stale-while-revalidate
+# age of a report is read from it), except that a fragment's is refreshed whenever it is reused, so
+# the fragments of unchanged bodies stay as long as the roster uses them.
+
+import glob
+import hashlib
+import os
+import pathlib
+import time
+import uuid
+
+from utils.file_handlers import atomic_copy
+
+GENERATED_PLACEHOLDER = "\\GENERATED"
+
+DEFAULT_KEEP = 200  # Unpublished PDFs kept, newest first, in the cache and in its fragments
+DEFAULT_MAX_AGE = 7 * 24 * 3600  # Seconds an unpublished PDF is kept after it was built
+
+
+def get_cache_dir(report_dir, config):
+    """
+    Return the cache directory for reports built in `report_dir`, creating it if necessary.
+    REPORT_CACHE_DIR overrides the default of a ".cache" directory inside the reports directory.
+    """
+    cache_dir = config.get("REPORT_CACHE_DIR") or os.path.join(report_dir, ".cache")
+    os.makedirs(os.path.join(cache_dir, "published"), exist_ok=True)
+    return cache_dir
+
+
+def _template_digest(template_path, *dependency_paths):
+    digest = hashlib.sha256()
+    for path in (template_path, *dependency_paths):
+        with open(path, "rb") as f:
+            digest.update(f.read())
+        digest.update(b"\0")
+    return digest
+
+
+def source_path(cache_dir, key):
+    return os.path.join(cache_dir, "sources", f"{key}.tex")
+
+
+def spool_source(chunks, generated, cache_dir, template_path, *dependency_paths):
+    """
+    Write a source rendered piece by piece (e.g. by Template.generate) to the cache's sources
+    directory as the pieces arrive, hashing them on the way, so the whole source is never held in
+    memory.  The key hashes the template file, any files it depends on (such as the shared
+    preamble) and the source with the `generated` timestamp normalized out; a timestamp is always
+    rendered within one piece.  Returns (key, pathlib.Path of the source).
+    """
+    digest = _template_digest(template_path, *dependency_paths)
+    os.makedirs(os.path.join(cache_dir, "sources"), exist_ok=True)
+    tmp_path = os.path.join(cache_dir, "sources", f".{uuid.uuid4().hex}.tmp")
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for chunk in chunks:
+                f.write(chunk)
+                digest.update((chunk.replace(generated, GENERATED_PLACEHOLDER) if generated else chunk).encode("utf-8"))
+        key = digest.hexdigest()
+        # Identical renders share the file; replacing it keeps the same content
+        os.replace(tmp_path, source_path(cache_dir, key))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return key, pathlib.Path(source_path(cache_dir, key))
+
+
+def discard_sources(cache_dir, *keys):
+    """Remove the spooled sources of `keys`, once their PDFs are cached and nothing needs them."""
+    for key in keys:
+        try:
+            os.remove(source_path(cache_dir, key))
+        except FileNotFoundError:
+            pass
+
+
+def cached_pdf_path(cache_dir, key):
+    return os.path.join(cache_dir, f"{key}.pdf")
+
+
+def lookup(cache_dir, key):
+    """Return the path of the cached PDF for `key`, or None on a miss."""
+    path = cached_pdf_path(cache_dir, key)
+    return path if os.path.exists(path) else None
+
+
+def touch(path):
+    """Mark the cached fragment at `path` as just used (see prune); returns `path`, or None if it is not there."""
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    return path
+
+
+def prune_options(config):
+    """Return how much of the cache prune keeps, from the app config, for passing as `prune`."""
+    return {
+        "keep": config.get("REPORT_CACHE_KEEP", DEFAULT_KEEP),
+        "max_age": config.get("REPORT_CACHE_MAX_AGE", DEFAULT_MAX_AGE),
+    }
+
+
+def prune(cache_dir, keep=DEFAULT_KEEP, max_age=DEFAULT_MAX_AGE):
+    """
+    Remove the cached PDFs and fragments that are not published, not among the `keep` newest of
+    their directory and not built (or, for fragments, reused) within `max_age` seconds.  Returns
+    the number removed.
+    """
+    published = set()
+    for marker in glob.glob(os.path.join(cache_dir, "published", "*.key")):
+        try:
+            with open(marker, "r", encoding="utf-8") as f:
+                published.add(f.read().strip())
+        except FileNotFoundError:
+            pass
+
+    removed = 0
+    cutoff = time.time() - max_age
+    for directory in (cache_dir, os.path.join(cache_dir, "fragments")):
+        entries = []
+        for path in glob.glob(os.path.join(directory, "*.pdf")):
+            try:
+                entries.append((os.path.getmtime(path), path))
+            except FileNotFoundError:
+                pass
+        entries.sort(reverse=True)
+        for mtime, path in entries[keep:]:
+            if mtime >= cutoff or os.path.splitext(os.path.basename(path))[0] in published:
+                continue
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+    return removed
+
+
+def _marker_path(cache_dir, filename):
+    return os.path.join(cache_dir, "published", f"{filename}.key")
+
+
+def published_key(cache_dir, filename):
+    """Return the key of the PDF currently published as `filename`, or None if unknown."""
+    try:
+        with open(_marker_path(cache_dir, filename), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def mark_published(cache_dir, filename, key):
+    """Record that the PDF published as `filename` was built from `key`."""
+    marker = _marker_path(cache_dir, filename)
+    tmp_path = f"{marker}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(key)
+    os.replace(tmp_path, marker)
+
+
+def unmark_published(cache_dir, filename):
+    """Forget which cached PDF is published as `filename`, once a PDF from elsewhere replaced it."""
+    try:
+        os.remove(_marker_path(cache_dir, filename))
+    except FileNotFoundError:
+        pass
+
+
+def publish(cache_dir, key, dest_path):
+    """
+    Make the cached PDF for `key` available at `dest_path`.
+    Nothing is copied when `dest_path` already holds that PDF.
+    """
+    filename = os.path.basename(dest_path)
+    if os.path.exists(dest_path) and published_key(cache_dir, filename) == key:
+        return
+
+    atomic_copy(cached_pdf_path(cache_dir, key), dest_path)
+    mark_published(cache_dir, filename, key)
@@ -0,0 +1,254 @@
+# utils/pdf_report.py — the PDF of a tabular report, written in-process without TeX.
+#
+# The reports listed in REPORT_DIRECT_PDF (by kind) are laid out here rather than compiled: the
+# logo and title at the top of the first page, each body under a centered heading with its table
+# (the definition's columns, bold header row and a rule), in one or two columns as in the LaTeX
+# template (section_columns), and the footer of the templates: a rule, the generated timestamp and
+# the page number, swapping sides on even pages.  Page size and margins are those of the preamble.
+# The text is set in the standard Helvetica fonts, which every PDF viewer has, so no font is
+# embedded.  A report takes milliseconds and needs no TeX installation.
+#
+# Like utils/latex.py this module does not touch Flask or the database.
+
+import os
+import unicodedata
+import zlib
+
+from utils import graphics
+
+# US letter, with the margins of roster_preamble.tex's geometry
+PAGE_WIDTH, PAGE_HEIGHT = 612, 792
+MARGIN_TOP, MARGIN_BOTTOM, MARGIN_SIDE = 46.8, 54, 54
+COLUMN_GAP = 10
+CELL_PADDING = 6
+
+# Sizes of 12pt article: normal, \small, \Large (body headings), \LARGE (title)
+NORMAL, SMALL, LARGE, TITLE = 12, 10.95, 17.28, 20.74
+ROW_HEIGHT = 13.6
+FOOTER_BASELINE, FOOTER_RULE = 26, 40
+
+# Advance widths in 1/1000 em of the characters 32-126 (space to tilde), from the standard AFM files
+_WIDTHS = {
+    "F1": (  # Helvetica
+        278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+        556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+        1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+        667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+        333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+        556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+    ),
+    "F2": (  # Helvetica-Bold
+        278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+        556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+        975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+        667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+        333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+        611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,
+    ),
+}
+# Beyond ASCII: dashes, quotes and the ellipsis; accented letters take the width of their base letter
+_SPECIAL_WIDTHS = {"—": 1000, "–": 556, "‘": 222, "’": 222, "“": 333, "”": 333,
+                   "…": 1000, " ": 278}
+
+
+def _char_width(char, font):
+    code = ord(char)
+    if 32 <= code <= 126:
+        return _WIDTHS[font][code - 32]
+    if char in _SPECIAL_WIDTHS:
+        return _SPECIAL_WIDTHS[char]
+    base = unicodedata.normalize("NFKD", char)[:1]
+    if base and 32 <= ord(base) <= 126:
+        return _WIDTHS[font][ord(base) - 32]
+    return 556
+
+
+def text_width(text, font, size):
+    """The width in points of `text` set in `font` ("F1" regular, "F2" bold) at `size`."""
+    return sum(_char_width(char, font) for char in text) * size / 1000
+
+
+def _pdf_string(text):
+    # WinAnsiEncoding is cp1252; characters it lacks become "?"
+    data = text.encode("cp1252", "replace")
+    return "(" + data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)").decode("latin-1") + ")"
+
+
+def _fit(text, font, size, width):
+    """`text`, cut short with an ellipsis if it is wider than `width`."""
+    if text_width(text, font, size) <= width:
+        return text
+    while text and text_width(text + "…", font, size) > width:
+        text = text[:-1]
+    return text + "…"
+
+
+def _text(x, y, text, font="F1", size=NORMAL):
+    return f"BT /{font} {size} Tf {x:.2f} {y:.2f} Td {_pdf_string(text)} Tj ET"
+
+
+def _rule(x1, x2, y, width=0.4):
+    return f"{width} w {x1:.2f} {y:.2f} m {x2:.2f} {y:.2f} l S"
+
+
+class _Pages:
+    """Content streams of the pages, and the position of the layout on the current page."""
+
+    def __init__(self, columns, column_top):
+        self.streams = [[]]
+        self.columns = columns
+        self.column = 0
+        self.column_width = (PAGE_WIDTH - 2 * MARGIN_SIDE - (columns - 1) * COLUMN_GAP) / columns
+        self.column_top = self.y = column_top
+
+    @property
+    def ops(self):
+        return self.streams[-1]
+
+    @property
+    def column_x(self):
+        return MARGIN_SIDE + self.column * (self.column_width + COLUMN_GAP)
+
+    def fits(self, height):
+        return self.y - height >= MARGIN_BOTTOM
+
+    def next_column(self):
+        if self.column + 1 < self.columns:
+            self.column += 1
+        else:
+            self.streams.append([])
+            self.column = 0
+            self.column_top = PAGE_HEIGHT - MARGIN_TOP
+        self.y = self.column_top
+
+    def text(self, x, y, text, font="F1", size=NORMAL):
+        self.ops.append(_text(x, y, text, font, size))
+
+    def centered(self, y, text, font, size, left, width):
+        self.text(left + (width - text_width(text, font, size)) / 2, y, text, font, size)
+
+    def rule(self, x1, x2, y):
+        self.ops.append(_rule(x1, x2, y))
+
+
+class _Table:
+    """One body's table: its headings and rows of text, with the column widths that fit them."""
+
+    def __init__(self, headings, rows, max_width):
+        self.headings = list(headings)
+        self.rows = [[str(value) for value in row] for row in rows]
+        widths = [
+            max([text_width(heading, "F2", SMALL)] + [text_width(row[i], "F1", SMALL) for row in self.rows])
+            for i, heading in enumerate(self.headings)
+        ]
+        # Too wide for the column: shorten the widest column's cells until the table fits
+        excess = sum(widths) + 2 * CELL_PADDING * len(widths) - max_width
+        if excess > 0:
+            widest = widths.index(max(widths))
+            widths[widest] = max(widths[widest] - excess, 24)
+            for row in self.rows:
+                row[widest] = _fit(row[widest], "F1", SMALL, widths[widest])
+        self.widths = widths
+        self.width = sum(widths) + 2 * CELL_PADDING * len(widths)
+
+    def draw_row(self, pages, left, cells, font):
+        pages.y -= ROW_HEIGHT
+        x = left + CELL_PADDING
+        for cell, width in zip(cells, self.widths):
+            pages.text(x, pages.y + 3.5, cell, font, SMALL)
+            x += width + 2 * CELL_PADDING
+
+    def draw_header(self, pages, left):
+        self.draw_row(pages, left, self.headings, "F2")
+        pages.rule(left, left + self.width, pages.y + 1)
+        pages.y -= 1
+
+
+def render_pdf(pdf_path, title, generated, grouped, headings, row_values, columns=1, logo_path=None):
+    """
+    Write the PDF of a tabular report to `pdf_path`.
+
+    `grouped` yields (body name, members) as from ReportDefinition.group, `headings` are the column
+    headings and `row_values(member)` returns the cells of a member's row.  `columns` is 1 or 2, and
+    `logo_path` the JPEG shown above the title.
+    """
+    logo = None
+    if logo_path and os.path.exists(logo_path):
+        with open(logo_path, "rb") as f:
+            logo = graphics.jpeg_image(f.read())
+
+    # The first page: logo and title, as in roster_title.tex
+    y = PAGE_HEIGHT - MARGIN_TOP
+    first_page = []
+    if logo:
+        _, logo_width, logo_height = logo
+        y -= logo_height
+        first_page.append(f"q {logo_width:.4f} 0 0 {logo_height:.4f} {(PAGE_WIDTH - logo_width) / 2:.4f} {y:.4f} cm "
+                          f"/Im0 Do Q")
+        y -= NORMAL / 2
+    y -= TITLE
+    pages = _Pages(columns, y - NORMAL)
+    pages.ops.extend(first_page)
+    pages.centered(y, title, "F2", TITLE, MARGIN_SIDE, PAGE_WIDTH - 2 * MARGIN_SIDE)
+
+    for body_name, members in grouped.items():
+        table = _Table(headings, (row_values(member) for member in members), pages.column_width)
+        heading_height = NORMAL / 2 + LARGE * 1.2 + NORMAL / 2
+        # Keep the heading with the table's header and first row
+        if not pages.fits(heading_height + ROW_HEIGHT * (2 if table.rows else 1) + 1) and pages.y < pages.column_top:
+            pages.next_column()
+        pages.y -= NORMAL / 2 + LARGE
+        pages.centered(pages.y, body_name, "F2", LARGE, pages.column_x, pages.column_width)
+        pages.y -= LARGE * 0.2 + NORMAL / 2
+
+        left = pages.column_x + (pages.column_width - table.width) / 2
+        table.draw_header(pages, left)
+        for cells in table.rows:
+            if not pages.fits(ROW_HEIGHT):
+                # The table goes on in the next column, under its header again
+                pages.next_column()
+                left = pages.column_x + (pages.column_width - table.width) / 2
+                table.draw_header(pages, left)
+            table.draw_row(pages, left, cells, "F1")
+
+    # The footer of the templates: page number outside, timestamp inside
+    version = f"Generated {generated}"
+    right_edge = PAGE_WIDTH - MARGIN_SIDE
+    for number, ops in enumerate(pages.streams, start=1):
+        page_number = str(number)
+        ops.append(_rule(MARGIN_SIDE, right_edge, FOOTER_RULE))
+        if number % 2:
+            ops.append(_text(MARGIN_SIDE, FOOTER_BASELINE, version, "F1", SMALL))
+            ops.append(_text(right_edge - text_width(page_number, "F1", NORMAL), FOOTER_BASELINE, page_number))
+        else:
+            ops.append(_text(MARGIN_SIDE, FOOTER_BASELINE, page_number))
+            ops.append(_text(right_edge - text_width(version, "F1", SMALL), FOOTER_BASELINE, version, "F1", SMALL))
+
+    _write(pdf_path, pages.streams, logo)
+
+
+def _write(pdf_path, streams, logo):
+    # 1 catalog, 2 pages, 3-4 fonts, 5 logo (if any), then each page and its content stream
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+    ]
+    resources = "/Font << /F1 3 0 R /F2 4 0 R >>"
+    if logo:
+        objects.append(logo[0])
+        resources += " /XObject << /Im0 5 0 R >>"
+
+    kids = []
+    for ops in streams:
+        content = zlib.compress("\n".join(ops).encode("latin-1"))
+        page_number = len(objects) + 1
+        kids.append(f"{page_number} 0 R")
+        objects.append((f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+                        f"/Resources << {resources} >> /Contents {page_number + 1} 0 R >>").encode("ascii"))
+        objects.append(f"<< /Length {len(content)} /Filter /FlateDecode >>\nstream\n".encode("ascii")
+                       + content + b"\nendstream")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode("ascii")
+
+    graphics.write_pdf(objects, pdf_path)
@@ -0,0 +1,173 @@
+# utils/prebuild.py — rebuild the reports in the background after the roster changes.
+#
+# Every commit that changes a tracked table is reported by utils/revisions.py.  The pre-builder
+# collects the changed tables and waits until no further change has arrived for
+# REPORT_PREBUILD_DELAY seconds (but never longer than REPORT_PREBUILD_MAX_DELAY after the first),
+# so a clerk editing a dozen terms causes one rebuild rather than twelve.  It then re-renders the
+# reports that read any of those tables and cover any of the changed bodies (see
+# reports.dependency_map) and compiles those whose source actually changed; the others are found in
+# the PDF cache.  By the time somebody presses a report button the PDF is usually in the cache.
+#
+# Besides the registered reports, the pre-builder keeps the most recent parameterized builds that
+# were asked for (a subset roster, an expirations window), so that they are rebuilt as well once
+# their bodies change.  Within a fragmented roster only the fragments of changed bodies compile:
+# the others render to the same source and are found in the cache.
+
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, has_app_context
+
+from utils import revisions
+from utils.compile_gate import CompileQueueFull, compile_gate
+
+
+class ReportPrebuilder:
+    """
+    Debounced background rebuild of the reports affected by data changes.
+
+    Configuration:
+        REPORT_PREBUILD            enable the pre-builder (default: off, on in config.Config)
+        REPORT_PREBUILD_DELAY      quiet period in seconds before rebuilding (default: 10)
+        REPORT_PREBUILD_MAX_DELAY  longest a change waits while edits keep coming (default: 60)
+    """
+
+    # Parameterized builds and binders remembered for rebuilding, most recently asked for last
+    MAX_VARIANTS = 16
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._pending_bodies = set()
+        self._first_change = None
+        self._timer = None
+        self._variants = OrderedDict()
+        self.last_run = None
+        self.last_results = {}
+
+    def remember(self, definition, context, args):
+        """Keep a parameterized build or a binder (`args`, its request arguments) for rebuilding after changes."""
+        stem = definition.file_stem(context)
+        with self._lock:
+            self._variants[stem] = (definition.kind, args.copy())
+            self._variants.move_to_end(stem)
+            while len(self._variants) > self.MAX_VARIANTS:
+                self._variants.popitem(last=False)
+
+    def schedule(self, app, tables, bodies=None):
+        """Note that `tables` changed in `bodies` (None: any body) and (re)start the quiet period."""
+        delay = app.config.get("REPORT_PREBUILD_DELAY", 10)
+        max_delay = app.config.get("REPORT_PREBUILD_MAX_DELAY", 60)
+
+        with self._lock:
+            self._pending |= set(tables)
+            if bodies is None or self._pending_bodies is None:
+                self._pending_bodies = None
+            else:
+                self._pending_bodies |= set(bodies)
+            now = time.monotonic()
+            if self._first_change is None:
+                self._first_change = now
+            # Keep postponing while edits keep coming, but not past the maximum delay
+            delay = max(0, min(delay, self._first_change + max_delay - now))
+
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(delay, self._run, args=(app,))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def cancel(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = None
+            self._pending = set()
+            self._pending_bodies = set()
+            self._first_change = None
+
+    def _run(self, app):
+        with self._lock:
+            tables, self._pending = self._pending, set()
+            bodies, self._pending_bodies = self._pending_bodies, set()
+            self._first_change = None
+            self._timer = None
+
+        with app.app_context():
+            try:
+                retry = self.rebuild(tables, bodies)
+            except Exception as e:
+                app.logger.error(f"Report pre-build failed: {e}")
+                retry = set()
+            finally:
+                from extensions import db
+                db.session.remove()
+
+        if retry:
+            # The compile gate was full; try again after another quiet period
+            self.schedule(app, retry, bodies)
+
+    def builds(self, context):
+        """
+        The builds to keep fresh, as (definition, context): the registered reports and the remembered
+        variants.  The meeting binder repeats the other reports, so it is kept fresh only once it
+        has been asked for (and remembered, as the variants are).
+        """
+        from utils.reports import REPORTS
+
+        builds = [(definition, context) for definition in REPORTS.values() if not definition.sections]
+        with self._lock:
+            variants = list(self._variants.values())
+        for kind, args in variants:
+            definition = REPORTS.get(kind)
+            if definition is not None:
+                builds.append((definition, definition.with_params(context, args)))
+        return builds
+
+    def rebuild(self, tables, bodies=None):
+        """
+        Rebuild the reports that read any of `tables` and cover any of `bodies` (None: any body).
+        Runs in an app context.  Returns the tables of the reports that could not get a compile
+        slot, to be retried.  Results are by file stem.
+        """
+        from routes.report import get_reports_dir, prepare_build, renders_direct
+        from utils.report_jobs import build_report
+        from utils.reports import build_context, builds_affected_by
+
+        report_dir = get_reports_dir()
+        results = {}
+        retry = set()
+
+        for definition, context in builds_affected_by(self.builds(build_context()), tables, bodies):
+            if renders_direct(definition):
+                # Written on request in milliseconds; nothing to warm
+                continue
+            rendered = definition.render_build(report_dir, current_app.config, context)
+            cached, build_options = prepare_build(definition, report_dir, rendered)
+            if cached:
+                results[rendered.name] = "unchanged"
+                continue
+            try:
+                result = build_report(rendered.tex, rendered.name, report_dir, slot=compile_gate.slot, **build_options)
+            except CompileQueueFull:
+                retry |= definition.tables & set(tables)
+                results[rendered.name] = "busy"
+                continue
+            results[rendered.name] = "built" if result["success"] else "failed"
+            if not result["success"]:
+                current_app.logger.error(f"Pre-building {rendered.name} failed: {result['error']}")
+
+        self.last_run = time.time()
+        self.last_results = results
+        return retry
+
+
+prebuilder = ReportPrebuilder()
+
+
+@revisions.on_change
+def _schedule_prebuild(tables, bodies):
+    # Called after each commit that changed a tracked table, in the committing request's context
+    if has_app_context() and current_app.config.get("REPORT_PREBUILD", False):
+        prebuilder.schedule(current_app._get_current_object(), tables, bodies)
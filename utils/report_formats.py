@@ -0,0 +1,35 @@
+# utils/report_formats.py — renderings of a roster report that need no LaTeX.
+#
+# The PDF stays the print format.  For looking up who holds an office the same grouped records
+# are also offered as an HTML page, a CSV download and a JSON document (/report/<kind>?format=...),
+# which take no longer than the query.  Each report's columns come from its ReportDefinition.
+
+import csv
+import io
+
+FORMATS = ("pdf", "html", "csv", "json")
+
+
+def to_csv(definition, grouped):
+    """The report as CSV text: one row per member, with the body name in the first column."""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(["Body"] + [heading for _, heading, _ in definition.columns])
+    for body_name, members in grouped.items():
+        for row in definition.rows(members):
+            writer.writerow([body_name] + list(row.values()))
+    return output.getvalue()
+
+
+def to_json(definition, grouped, title, generated):
+    """The report as a JSON-serializable dict, with the bodies in precedence order."""
+    return {
+        "kind": definition.kind,
+        "title": title,
+        "generated": generated,
+        "columns": [{"key": key, "heading": heading} for key, heading, _ in definition.columns],
+        "bodies": [
+            {"name": body_name, "members": list(definition.rows(members))}
+            for body_name, members in grouped.items()
+        ]
+    }
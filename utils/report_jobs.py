@@ -0,0 +1,260 @@
+# utils/report_jobs.py — a small in-process queue of report builds backed by a bounded worker pool.
+#
+# A request renders the .tex source (which needs the database) and then hands the slow xelatex
+# compile to the pool, answering straight away with a job id.  The browser polls
+# /report/jobs/<job_id> until the job is done.
+
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
+
+from utils import latex, pdf_cache
+from utils.compile_gate import CompileQueueFull, file_slot
+from utils.single_flight import build_lock
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+def compile_fragments(fragments, name, fragment_dir, **compile_options):
+    """
+    Compile the fragments of a report that are not in `fragment_dir` yet, each as `<key>.pdf`.
+    Returns None on success, or the failed compile's result.
+    """
+    os.makedirs(fragment_dir, exist_ok=True)
+    for key, fragment_tex in fragments:
+        fragment_path = os.path.join(fragment_dir, f"{key}.pdf")
+        if pdf_cache.touch(fragment_path):
+            continue
+        try:
+            result = latex.compile_pdf(fragment_tex, f"{name}-fragment", fragment_path, **compile_options)
+        except FileNotFoundError:
+            # A build sharing this fragment compiled it meanwhile and removed its spooled source
+            if os.path.exists(fragment_path):
+                continue
+            raise
+        if not result["success"]:
+            return result
+    return None
+
+
+def build_report(rendered_tex, name, output_dir, cache_dir=None, cache_key=None, compile_slots=None,
+                 slot=None, fragments=(), prune=None, **compile_options):
+    """
+    Compile a rendered report and publish it as `output_dir/<name>.pdf`.  Used both by queued jobs
+    and by inline builds.
+
+    With a cache key the PDF is compiled into the report cache and published from there, so the
+    cached copy is always the one this build produced.  `compile_options` (scratch_dir,
+    search_paths, source_date_epoch, limits, ...) are passed on to latex.compile_pdf.  With `compile_slots`
+    (see CompileGate.slot_options) the compile first waits for a cross-process compile slot; with
+    `slot` (CompileGate.slot, for inline builds) it waits in the gate instead, and CompileQueueFull
+    is raised to the caller rather than returned as a failure.
+
+    A build with a cache key holds that key's build lock (see utils/single_flight.py).  If an
+    identical build finished while this one waited for the lock, its PDF is published instead.
+    `fragments` ([(key, source)], see reports.RenderedReport) are compiled into the cache's
+    fragments directory unless already there, and the document finds them on its search path.
+    Sources spooled into the cache (see pdf_cache.spool_source) are removed once the build is
+    over, whether it succeeded or not.  With `prune` (see pdf_cache.prune_options) the cache is
+    pruned after a compile added to it.
+    """
+    pdf_filename = f"{name}.pdf"
+    dest_path = os.path.join(output_dir, pdf_filename)
+
+    try:
+        try:
+            with build_lock(cache_dir, cache_key) if cache_key else nullcontext():
+                if cache_key and pdf_cache.lookup(cache_dir, cache_key):
+                    pdf_cache.publish(cache_dir, cache_key, dest_path)
+                    return {"success": True, "filename": pdf_filename, "coalesced": True}
+
+                with slot() if slot else file_slot(**compile_slots) if compile_slots else nullcontext():
+                    result = _compile(rendered_tex, name, dest_path, cache_dir, cache_key, fragments, compile_options)
+        except CompileQueueFull as e:
+            if slot:
+                raise
+            return {"success": False, "error": str(e)}
+    finally:
+        # Compiled, failed, stopped or turned away: nothing compiles these sources again
+        if cache_dir:
+            pdf_cache.discard_sources(cache_dir, *([cache_key] if cache_key else []), *(key for key, _ in fragments))
+
+    if cache_dir and prune is not None:
+        pdf_cache.prune(cache_dir, **prune)
+
+    if not result["success"]:
+        failed = {"success": False, "error": result["error"]}
+        if result.get("run"):
+            # How the engine run ended, e.g. stopped at its timeout (see utils/tex_runner.py)
+            failed["run"] = result["run"]
+        return failed
+    return {"success": True, "filename": pdf_filename}
+
+
+def _compile(rendered_tex, name, dest_path, cache_dir, cache_key, fragments, compile_options):
+    if fragments:
+        fragment_dir = os.path.join(cache_dir or os.path.dirname(dest_path), "fragments")
+        failed = compile_fragments(fragments, name, fragment_dir, **compile_options)
+        if failed:
+            return failed
+        compile_options = dict(compile_options,
+                               search_paths=[fragment_dir, *compile_options.get("search_paths", ())])
+
+    # Looked up through the module so that the compile step can be replaced in tests
+    if not cache_key:
+        return latex.compile_pdf(rendered_tex, name, dest_path, **compile_options)
+    result = latex.compile_pdf(rendered_tex, name, pdf_cache.cached_pdf_path(cache_dir, cache_key), **compile_options)
+    if result["success"]:
+        pdf_cache.publish(cache_dir, cache_key, dest_path)
+    return result
+
+
+class ReportJob:
+    """The state of a single queued report build."""
+
+    def __init__(self, kind):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.created = time.time()
+        self.finished = None
+        self.future = None
+        self.result = None
+
+    @property
+    def status(self):
+        if self.result is not None:
+            return DONE if self.result.get("success") else FAILED
+        if self.future is not None and (self.future.running() or self.future.done()):
+            return RUNNING
+        return QUEUED
+
+    def to_dict(self):
+        data = {"job_id": self.id, "kind": self.kind, "status": self.status}
+        if self.result is not None:
+            data["success"] = bool(self.result.get("success"))
+            if self.result.get("filename"):
+                data["filename"] = self.result["filename"]
+            if self.result.get("error"):
+                data["error"] = self.result["error"]
+            if self.result.get("run"):
+                data["run"] = self.result["run"]
+        else:
+            data["success"] = True
+        return data
+
+
+class ReportJobQueue:
+    """
+    Runs report compiles on a bounded process (or thread) pool and keeps track of their status.
+
+    Configuration (read in init_app):
+        REPORT_JOB_WORKERS  maximum number of concurrent compiles (default: number of CPUs)
+        REPORT_JOB_BACKEND  "thread" (default) or "process"; each compile is a TeX subprocess
+                            either way, so threads run as many compiles side by side
+        REPORT_JOB_TTL      seconds a finished job stays queryable (default: 3600)
+        REPORT_JOB_PYTHON   python executable for worker processes, needed under mod_wsgi where
+                            sys.executable is the web server rather than python
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._in_flight = {}
+        self.coalesced = 0
+        self._executor = None
+        self.workers = os.cpu_count() or 2
+        self.backend = "thread"
+        self.ttl = 3600
+
+    def init_app(self, app):
+        self.workers = app.config.get("REPORT_JOB_WORKERS") or os.cpu_count() or 2
+        self.backend = app.config.get("REPORT_JOB_BACKEND", "thread")
+        self.ttl = app.config.get("REPORT_JOB_TTL", 3600)
+
+        python = app.config.get("REPORT_JOB_PYTHON")
+        if python:
+            multiprocessing.set_executable(python)
+        elif self.backend == "process" and "mod_wsgi" in sys.modules:
+            # Worker processes would be started with sys.executable, which is httpd.exe here
+            raise RuntimeError("REPORT_JOB_BACKEND = 'process' under mod_wsgi needs REPORT_JOB_PYTHON, "
+                               "the python executable for the worker processes")
+
+    def _get_executor(self):
+        # The pool is created on first use so that importing the app (CLI, tests) starts no workers
+        if self._executor is None:
+            if self.backend == "thread":
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="report-job")
+            else:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def submit(self, kind, rendered_tex, name, output_dir, coalesce_key=None, **build_options):
+        """
+        Queue the build of report `name` from `rendered_tex` into `output_dir` and return the new
+        ReportJob.  `build_options` are passed on to build_report.  While a job submitted with the
+        same `coalesce_key` is still pending, that job is returned instead of queueing another.
+        """
+        with self._lock:
+            existing = self._in_flight.get(coalesce_key) if coalesce_key else None
+            if existing is not None and existing.result is None:
+                self.coalesced += 1
+                return existing
+
+            job = ReportJob(kind)
+            self._expire_finished()
+            self._jobs[job.id] = job
+            if coalesce_key:
+                self._in_flight[coalesce_key] = job
+            job.future = self._get_executor().submit(build_report, rendered_tex, name, output_dir, **build_options)
+
+        job.future.add_done_callback(lambda future: self._finish(job, future, coalesce_key))
+        return job
+
+    def in_flight(self, coalesce_key):
+        """Whether a job submitted with `coalesce_key` is still pending, so submit would return it."""
+        with self._lock:
+            existing = self._in_flight.get(coalesce_key)
+            return existing is not None and existing.result is None
+
+    def pending(self):
+        """The number of jobs that are queued or running."""
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job.result is None)
+
+    def get(self, job_id):
+        """Return the ReportJob with the given id, or None if it is unknown or has expired."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def _finish(self, job, future, coalesce_key=None):
+        try:
+            job.result = future.result()
+        except Exception as e:
+            job.result = {"success": False, "error": f"Report build failed: {e}"}
+        job.finished = time.time()
+        with self._lock:
+            if coalesce_key and self._in_flight.get(coalesce_key) is job:
+                del self._in_flight[coalesce_key]
+
+    def _expire_finished(self):
+        cutoff = time.time() - self.ttl
+        expired = [job_id for job_id, job in self._jobs.items() if job.finished and job.finished < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+report_jobs = ReportJobQueue()
@@ -0,0 +1,767 @@
+# utils/reports.py — declarative definitions of the roster reports and the shared LaTeX Jinja environment.
+#
+# Each report is a ReportDefinition: which ReportRecord rows it selects, how rows are prepared for
+# the template, which .tex template renders them and what the document is called; the meeting
+# binder, which combines reports, is a BinderDefinition.  The report routes look definitions up
+# by kind, so adding a report is a matter of registering another definition at the bottom of this
+# module.
+
+import os
+import string
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from itertools import groupby, islice
+
+from flask import current_app
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, meta
+from sqlalchemy import and_, select, true
+
+from extensions import db
+from models.body import Body
+from models.office import Office
+from models.report_record import ReportRecord
+from utils import latex_format, pdf_cache, pdf_report, revisions, vacancies
+
+GENERATED_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Images in the static folder that the templates include; converted to PDF once for the builds
+GRAPHICS = ("residentCouncilLogoSmall",)
+
+# The tables behind the roster rows (ReportRecord)
+ROSTER_TABLES = frozenset({"body", "office", "person", "term"})
+
+# Roster rows read from the database at a time while a report streams through its template
+STREAM_BATCH_SIZE = 200
+
+# Joins the compiled fragments of a fragmented report (see ReportDefinition.fragment_template)
+MERGE_TEMPLATE = "roster_merge.tex"
+
+_environments = {}
+_environments_lock = threading.Lock()
+
+
+def get_latex_environment(report_dir, config):
+    """
+    Return the process-wide Jinja environment for the LaTeX templates in `report_dir`.
+
+    Templates are parsed once and kept in memory; auto_reload re-reads a template only when its file
+    changes, and the bytecode cache lets other processes skip the parse as well.
+    """
+    with _environments_lock:
+        env = _environments.get(report_dir)
+        if env is None:
+            bytecode_dir = os.path.join(pdf_cache.get_cache_dir(report_dir, config), "jinja")
+            os.makedirs(bytecode_dir, exist_ok=True)
+            env = Environment(
+                loader=FileSystemLoader(report_dir),
+                block_start_string='\\BLOCK{', block_end_string='}',
+                variable_start_string='\\VAR{', variable_end_string='}',
+                comment_start_string='\\%{', comment_end_string='}',
+                autoescape=False,
+                auto_reload=True,
+                bytecode_cache=FileSystemBytecodeCache(bytecode_dir)
+            )
+            _environments[report_dir] = env
+        return env
+
+
+def template_files(env, template_name, *included_names):
+    """
+    Return the paths of `template_name` and every template it includes, directly or indirectly, of
+    the shared preamble when there is one and of the GRAPHICS in the static folder: the files a
+    rendered source depends on besides its data, so that replacing the logo rebuilds the reports.
+    `included_names` are templates it includes by a name only known when rendering.
+    """
+    seen = []
+    pending = [*reversed(included_names), template_name]
+    while pending:
+        name = pending.pop()
+        if name in seen:
+            continue
+        seen.append(name)
+        source, _, _ = env.loader.get_source(env, name)
+        pending.extend(included for included in meta.find_referenced_templates(env.parse(source)) if included)
+
+    report_dir = env.loader.searchpath[0]
+    paths = [os.path.join(report_dir, name) for name in seen]
+    preamble_path = os.path.join(report_dir, latex_format.PREAMBLE)
+    if os.path.exists(preamble_path):
+        paths.append(preamble_path)
+    for name in GRAPHICS:
+        graphic_path = os.path.join(current_app.static_folder, f"{name}.jpg")
+        if os.path.exists(graphic_path):
+            paths.append(graphic_path)
+    return paths
+
+
+class RenderedReport:
+    """
+    The LaTeX source of a report, ready to compile.
+
+    name        file stem of the .tex and .pdf (the definition's name, plus its variant if any)
+    tex         the document source: the path of the file it was streamed to (see pdf_cache.spool_source)
+    generated   its generated timestamp
+    key         its PDF cache key
+    fragments   for a fragmented report, [(cache key, source path)] of the fragments the document
+                includes; these are compiled (or found in the cache) before the document
+    """
+
+    def __init__(self, name, tex, generated, key, fragments=()):
+        self.name = name
+        self.tex = tex
+        self.generated = generated
+        self.key = key
+        self.fragments = list(fragments)
+
+    @property
+    def pdf_filename(self):
+        return f"{self.name}.pdf"
+
+
+class GroupedRecords:
+    """
+    Records grouped by body name as they are read.  items() yields (body name, members) one body at
+    a time, so only that body's records are held however long the roster's history grows.  The
+    records must come in body order, as the report queries return them.  Can be iterated once.
+    """
+
+    def __init__(self, records, prepare=None):
+        self._records = records
+        self._prepare = prepare
+
+    def items(self):
+        for name, members in groupby(self._records, key=lambda r: r.name):
+            members = list(members)
+            if self._prepare:
+                for r in members:
+                    self._prepare(r)
+            yield name, members
+
+    def __iter__(self):
+        return (name for name, _ in self.items())
+
+
+class DocumentDefinition:
+    """
+    What a report (ReportDefinition) and a binder of reports (BinderDefinition) share: how their
+    builds are named, parameterized and tracked.  The attributes are those of ReportDefinition; each
+    subclass renders itself for compiling with render_build.
+    """
+
+    # The kinds of the reports a binder combines; none for an ordinary report
+    sections = ()
+
+    def __init__(self, kind, name, template, title, tables=ROSTER_TABLES, params=None, variant=None, bodies=None):
+        self.kind = kind
+        self.name = name
+        self.template = template
+        self.title = title
+        self.tables = frozenset(tables)
+        self.params = params
+        self.variant = variant
+        self.bodies = bodies
+
+    @property
+    def tex_filename(self):
+        return f"{self.name}.tex"
+
+    @property
+    def pdf_filename(self):
+        return f"{self.name}.pdf"
+
+    def get_title(self, context):
+        return self.title(context) if callable(self.title) else self.title
+
+    def with_params(self, context, args):
+        """Return the build context with this report's parameters from `args` added (ValueError if invalid)."""
+        if not self.params:
+            return context
+        return dict(context, **self.params(args, context))
+
+    def body_ids(self, context):
+        """The ids of the bodies a build with this context covers, or None for every body."""
+        body_ids = self.bodies(context) if self.bodies else None
+        return frozenset(body_ids) if body_ids is not None else None
+
+    def file_stem(self, context):
+        """The file name (without extension) of a build with this context."""
+        suffix = self.variant(context) if self.variant else None
+        return f"{self.name}_{suffix}" if suffix else self.name
+
+
+class ReportDefinition(DocumentDefinition):
+    """
+    A roster report.
+
+    kind      URL name of the report (/report/<kind>)
+    name      file stem of the generated .tex and .pdf
+    template  LaTeX template in the reports directory
+    title     document title, or a callable taking the build context
+    criteria  optional callable taking the build context and returning ReportRecord filters
+    prepare   optional callable applied to each record before grouping, for template-only fields
+    columns   the table of each body as (key, heading, callable taking a prepared record), for the
+              HTML, CSV and JSON renderings; the LaTeX template lays out the PDF itself
+    tables    the tables whose changes can alter the report (see dependency_map)
+    fragment_template    optional template for a group of bodies; when it is in the reports directory
+                         the groups are compiled (and cached) separately and joined by MERGE_TEMPLATE,
+                         so editing one body recompiles one group rather than the whole roster
+    bodies_per_fragment  bodies per fragment; each fragment starts on a new page, so a layout that
+                         flows bodies across columns (the short roster) is not fragmented
+    params    optional callable taking the request arguments and the build context and returning the
+              report's parameters to add to the context; raises ValueError for invalid ones
+    variant   optional callable taking the build context and returning a suffix for the file name
+              of a parameterized build, or None for the default one
+    bodies    optional callable taking the build context and returning the ids of the bodies a
+              parameterized build covers, or None for all of them (see dependency_map)
+    fetch     optional callable taking the build context and returning the records, in place of
+              the query (e.g. from a cache)
+    source    optional callable taking the build context and returning the rows of a report that
+              does not read the roster rows (ReportRecord); each row needs a `name` (the body's)
+    section_template  the template of one body (body_name, members), for the report's section of
+              the meeting binder (see BinderDefinition)
+    section_columns   the number of columns of that section
+    """
+
+    def __init__(self, kind, name, template, title, criteria=None, prepare=None, columns=(),
+                 tables=ROSTER_TABLES, fragment_template=None, bodies_per_fragment=1, params=None,
+                 variant=None, bodies=None, fetch=None, source=None, section_template=None, section_columns=1):
+        super().__init__(kind, name, template, title, tables=tables, params=params, variant=variant, bodies=bodies)
+        self.criteria = criteria
+        self.prepare = prepare
+        self.columns = columns
+        self.fragment_template = fragment_template
+        self.bodies_per_fragment = bodies_per_fragment
+        self.fetch = fetch
+        self.source = source
+        self.section_template = section_template
+        self.section_columns = section_columns
+
+    def condition(self, context):
+        """The SQL condition a ReportRecord row must meet to appear in this report."""
+        conditions = self.criteria(context) if self.criteria else []
+        return and_(*conditions) if conditions else true()
+
+    def query(self, context):
+        """Return the records of this report in body and office precedence order."""
+        if self.source:
+            return self.source(context)
+        if self.fetch:
+            return self.fetch(context)
+        return self._roster_query(context).all()
+
+    def records(self, context):
+        """Like query(), but iterate the records, reading roster rows from the database in batches."""
+        if self.source or self.fetch:
+            return iter(self.query(context))
+        return iter(self._roster_query(context).yield_per(STREAM_BATCH_SIZE))
+
+    def _roster_query(self, context):
+        query = ReportRecord.query
+        if self.criteria:
+            query = query.filter(*self.criteria(context))
+        return query.order_by(
+            ReportRecord.body_precedence,
+            ReportRecord.office_precedence
+        )
+
+    def group(self, records):
+        """Group the records (in body order) by body name, preparing them for the template; see GroupedRecords."""
+        return GroupedRecords(records, self.prepare)
+
+    def rows(self, members):
+        """Yield each member as {key: value} for the columns of this report."""
+        for member in members:
+            yield {key: value(member) for key, _, value in self.columns}
+
+    def render_build(self, report_dir, config, context, records=None):
+        """
+        Query, group and render the report for compiling; returns a RenderedReport.  The records
+        flow from the query through the template's generate() into a source file in the PDF cache
+        (see pdf_cache.spool_source), so neither the records nor the source are held whole.
+
+        Reports with a fragment template (and a reports directory holding it and the merge template)
+        are rendered as fragments of bodies_per_fragment bodies each plus the document joining them;
+        the others as one document.
+        """
+        env = get_latex_environment(report_dir, config)
+        cache_dir = pdf_cache.get_cache_dir(report_dir, config)
+        grouped = self.group(self.records(context) if records is None else records)
+        generated = context["now"].strftime(GENERATED_FORMAT)
+        title = self.get_title(context)
+
+        if not self._fragmented(report_dir, config):
+            chunks = env.get_template(self.template).generate(generated=generated, title=title, grouped=grouped)
+            key, path = pdf_cache.spool_source(chunks, generated, cache_dir, *template_files(env, self.template))
+            return RenderedReport(self.file_stem(context), path, generated, key)
+
+        template = env.get_template(self.fragment_template)
+        fragment_files = template_files(env, self.fragment_template)
+
+        # A fragment's key covers its source and templates only, not the generated timestamp, so
+        # the fragments of unchanged bodies are reused from the cache
+        fragments = []
+        groups = grouped.items()
+        size = max(1, self.bodies_per_fragment)
+        while True:
+            batch = dict(islice(groups, size))
+            if not batch and fragments:
+                break
+            chunks = template.generate(first=not fragments, title=title, grouped=batch)
+            fragments.append(pdf_cache.spool_source(chunks, None, cache_dir, *fragment_files))
+            if not batch:
+                break
+
+        chunks = env.get_template(MERGE_TEMPLATE).generate(
+            generated=generated,
+            title=title,
+            fragments=[f"{key}.pdf" for key, _ in fragments]
+        )
+        key, path = pdf_cache.spool_source(chunks, generated, cache_dir, *template_files(env, MERGE_TEMPLATE))
+        return RenderedReport(self.file_stem(context), path, generated, key, fragments)
+
+    def render_pdf(self, pdf_path, context, logo_path=None, records=None):
+        """
+        Write the report's PDF to `pdf_path` in-process, from its columns (see utils/pdf_report.py),
+        with no TeX involved.  `records` replaces the query as in render_build().
+        """
+        pdf_report.render_pdf(
+            pdf_path,
+            self.get_title(context),
+            context["now"].strftime(GENERATED_FORMAT),
+            self.group(self.records(context) if records is None else records),
+            [heading for _, heading, _ in self.columns],
+            lambda member: [value(member) for _, _, value in self.columns],
+            columns=self.section_columns,
+            logo_path=logo_path
+        )
+
+    def _fragmented(self, report_dir, config):
+        return bool(
+            self.fragment_template
+            and config.get("REPORT_FRAGMENTS", True)
+            and os.path.exists(os.path.join(report_dir, self.fragment_template))
+            and os.path.exists(os.path.join(report_dir, MERGE_TEMPLATE))
+        )
+
+
+class BinderDefinition(DocumentDefinition):
+    """
+    A document made of other reports, one section each, compiled in a single xelatex run: the
+    meeting binder.  `sections` are the kinds of the reports, in order; each must have a
+    section_template.  The binder takes the parameters of all its sections (e.g. a body subset for
+    the rosters and a window for the expirations) and is PDF only: it has no records or columns of
+    its own, so it is not a ReportDefinition.
+    """
+
+    def __init__(self, kind, name, template, title, sections):
+        self.sections = tuple(sections)
+        super().__init__(
+            kind, name, template, title,
+            tables=frozenset().union(*(definition.tables for definition in self.section_definitions())),
+            params=self._section_params,
+            variant=self._section_variant,
+            bodies=self._section_bodies,
+        )
+
+    def section_definitions(self):
+        return [REPORTS[kind] for kind in self.sections]
+
+    def _section_params(self, args, context):
+        params = {}
+        for definition in self.section_definitions():
+            if definition.params:
+                params.update(definition.params(args, context))
+        return params
+
+    def _section_variant(self, context):
+        suffixes = [definition.variant(context) for definition in self.section_definitions() if definition.variant]
+        return "_".join(dict.fromkeys(suffix for suffix in suffixes if suffix)) or None
+
+    def _section_bodies(self, context):
+        section_bodies = [definition.body_ids(context) for definition in self.section_definitions()]
+        if any(body_ids is None for body_ids in section_bodies):
+            return None
+        return frozenset().union(*section_bodies)
+
+    def render_build(self, report_dir, config, context, records=None):
+        """
+        Render the binder for compiling; returns a RenderedReport.  `records` ({kind: records}, e.g.
+        from query_snapshot) replaces the queries of the sections.  Each section's records stream
+        through the template in turn, as in ReportDefinition.render_build.
+        """
+        env = get_latex_environment(report_dir, config)
+        generated = context["now"].strftime(GENERATED_FORMAT)
+        sections = []
+        for tab, definition in zip(string.ascii_uppercase, self.section_definitions()):
+            section_records = _lazy_records(definition, context) if records is None else records[definition.kind]
+            sections.append({
+                "tab": tab,
+                "title": definition.get_title(context),
+                "template": definition.section_template,
+                "columns": definition.section_columns,
+                "grouped": definition.group(section_records),
+            })
+
+        chunks = env.get_template(self.template).generate(
+            generated=generated,
+            title=self.get_title(context),
+            sections=sections
+        )
+        source_files = template_files(env, self.template, *(section["template"] for section in sections))
+        key, path = pdf_cache.spool_source(chunks, generated, pdf_cache.get_cache_dir(report_dir, config),
+                                           *source_files)
+        return RenderedReport(self.file_stem(context), path, generated, key)
+
+
+def _lazy_records(definition, context):
+    # Runs the section's query only when the template reaches the section, one query at a time
+    yield from definition.records(context)
+
+
+REPORTS = {}
+
+
+def register(definition):
+    REPORTS[definition.kind] = definition
+    return definition
+
+
+def get_report(kind):
+    """Return the definition (ReportDefinition or BinderDefinition) registered as `kind`, or None."""
+    return REPORTS.get(kind)
+
+
+def dependency_map(builds):
+    """
+    Return {file stem: (tables, bodies)} for `builds` ((definition, context) pairs): the tables each
+    build reads and the ids of the bodies it covers, None for every body.  A plain report covers
+    all bodies; a subset roster only those asked for.
+    """
+    return {
+        definition.file_stem(context): (definition.tables, definition.body_ids(context))
+        for definition, context in builds
+    }
+
+
+def builds_affected_by(builds, tables, bodies=None):
+    """
+    The `builds` ((definition, context) pairs) that a change to `tables` in the bodies `bodies`
+    (None: any body) can alter: those reading one of the tables and covering one of the bodies.
+    """
+    dependencies = dependency_map(builds)
+    affected = []
+    for definition, context in builds:
+        build_tables, build_bodies = dependencies[definition.file_stem(context)]
+        if not build_tables & set(tables):
+            continue
+        if bodies is not None and build_bodies is not None and not build_bodies & bodies:
+            continue
+        affected.append((definition, context))
+    return affected
+
+
+def query_snapshot(definitions, context):
+    """
+    Fetch the records of several reports with a single query, so that they all come from the same
+    state of the roster.  Each report's condition is selected as an extra boolean column.  Reports
+    with their own source are read separately, in the same transaction.
+
+    Returns {kind: records} in body and office precedence order; for a binder, {kind: records} of
+    its sections.
+    """
+    binders = [definition for definition in definitions if definition.sections]
+    # The sections of a binder are read with the rest, whether or not they were asked for
+    definitions = list({
+        definition.kind: definition
+        for definition in [*definitions, *(section for binder in binders for section in binder.section_definitions())]
+        if not definition.sections
+    }.values())
+    sourced = [definition for definition in definitions if definition.source]
+    definitions = [definition for definition in definitions if not definition.source]
+    conditions = [definition.condition(context).label(f"in_{definition.kind}") for definition in definitions]
+    rows = db.session.query(ReportRecord, *conditions).order_by(
+        ReportRecord.body_precedence,
+        ReportRecord.office_precedence
+    ).all()
+
+    snapshot = {definition.kind: [] for definition in definitions}
+    for row in rows:
+        for i, definition in enumerate(definitions, start=1):
+            if row[i]:
+                snapshot[definition.kind].append(row[0])
+    for definition in sourced:
+        snapshot[definition.kind] = definition.source(context)
+    for binder in binders:
+        snapshot[binder.kind] = {kind: snapshot[kind] for kind in binder.sections}
+    return snapshot
+
+
+def build_context():
+    """The values a report build may depend on besides the database."""
+    return {"now": datetime.now()}
+
+
+# --- Record preparation --------------------------------------------------------------------------
+
+def format_end(r):
+    r.formatted_end = r.end.strftime("%Y-%m-%d") if r.end else ""
+
+
+# --- Filters -------------------------------------------------------------------------------------
+
+def expiring_between(start, end):
+    """Terms ending between the dates `start` and `end`, inclusive.  Uses the index on "end"."""
+    return ReportRecord.end.between(start, end)
+
+
+def expiring_in(year):
+    """Terms ending in the calendar year `year`."""
+    return expiring_between(date(year, 1, 1), date(year, 12, 31))
+
+
+# --- Subset rosters ------------------------------------------------------------------------------
+
+def _ids(args, name):
+    """The distinct positive integer values of the repeatable request argument `name`, sorted."""
+    ids = set()
+    for value in args.getlist(name):
+        for part in str(value).split(","):
+            if part.strip():
+                number = int(part)
+                if number < 1:
+                    raise ValueError(f"{name} must be positive")
+                ids.add(number)
+    return sorted(ids)
+
+
+def roster_params(args, context):
+    """
+    Read the subset of a roster from the request: body_id=N and office_id=N, each repeatable (or
+    comma-separated).  A roster without either covers every body.
+    """
+    params = {}
+    for name, key in (("body_id", "body_ids"), ("office_id", "office_ids")):
+        ids = _ids(args, name)
+        if ids:
+            params[key] = ids
+    return params
+
+
+def roster_filters(context):
+    """The bodies and offices a subset roster is limited to; none for the whole roster."""
+    conditions = []
+    if context.get("body_ids"):
+        conditions.append(ReportRecord.body_id.in_(context["body_ids"]))
+    if context.get("office_ids"):
+        conditions.append(ReportRecord.office_id.in_(context["office_ids"]))
+    return conditions
+
+
+def roster_variant(context):
+    # The whole roster keeps its plain name; each subset gets its own PDF (and cache entry)
+    parts = [
+        f"{prefix}-{'-'.join(str(i) for i in context[key])}"
+        for prefix, key in (("body", "body_ids"), ("office", "office_ids"))
+        if context.get(key)
+    ]
+    return "_".join(parts) or None
+
+
+def roster_bodies(context):
+    """The bodies of a subset roster: those asked for, or those of the offices asked for."""
+    if context.get("body_ids"):
+        return context["body_ids"]
+    if context.get("office_ids"):
+        return db.session.scalars(
+            select(Office.office_body_id).where(Office.office_id.in_(context["office_ids"]))
+        ).all()
+    return None
+
+
+def roster_title(title):
+    """The title of a roster, followed by the names of the bodies of a subset."""
+    def get_title(context):
+        if not context.get("body_ids"):
+            return title
+        names = db.session.scalars(
+            select(Body.name).where(Body.body_id.in_(context["body_ids"])).order_by(Body.body_precedence)
+        ).all()
+        return f"{title} — {', '.join(names)}" if names else title
+    return get_title
+
+
+# --- The expiration window ----------------------------------------------------------------------
+
+EXPIRATIONS_CACHE_SIZE = 32
+
+_expirations_cache = OrderedDict()
+_expirations_cache_lock = threading.Lock()
+
+
+def expiration_window(context):
+    """The (start, end) dates of the expirations report: from the context, or the current calendar year."""
+    year = context["now"].year
+    return context.get("start") or date(year, 1, 1), context.get("end") or date(year, 12, 31)
+
+
+def expiration_params(args, context):
+    """
+    Read the window of the expirations report from the request: start=YYYY-MM-DD and/or
+    end=YYYY-MM-DD, or within_days=N for the next N days from today.  A bound left out is that of
+    the current calendar year.
+    """
+    params = {}
+    if args.get("within_days"):
+        days = int(args["within_days"])
+        if days < 0:
+            raise ValueError("within_days must not be negative")
+        params["start"] = context["now"].date()
+        params["end"] = params["start"] + timedelta(days=days)
+    else:
+        for name in ("start", "end"):
+            if args.get(name):
+                params[name] = date.fromisoformat(args[name])
+
+    start, end = expiration_window(dict(context, **params))
+    if start > end:
+        raise ValueError("start must not be after end")
+    return params
+
+
+def expiration_title(context):
+    start, end = expiration_window(context)
+    if (start, end) == (date(start.year, 1, 1), date(start.year, 12, 31)):
+        return f"Expirations — {start.year}"
+    return f"Expirations — {start:%Y-%m-%d} to {end:%Y-%m-%d}"
+
+
+def expiration_variant(context):
+    # The calendar-year report keeps its plain name; other windows get their own PDF
+    if "start" not in context and "end" not in context:
+        return None
+    start, end = expiration_window(context)
+    return f"{start:%Y-%m-%d}_{end:%Y-%m-%d}"
+
+
+def expiring_records(context):
+    """
+    The records of the terms ending in the context's window.  Results are kept per window until
+    any roster table changes (see utils/revisions.py), so repeated planning views of the same
+    window skip the query.
+    """
+    start, end = expiration_window(context)
+    key = (str(db.engine.url), start, end, revisions.combined_revision(revisions.get_revisions(), ROSTER_TABLES))
+    with _expirations_cache_lock:
+        if key in _expirations_cache:
+            _expirations_cache.move_to_end(key)
+            return list(_expirations_cache[key])
+
+    records = ReportRecord.query.filter(expiring_between(start, end)).order_by(
+        ReportRecord.body_precedence,
+        ReportRecord.office_precedence
+    ).all()
+    # Detach the records so they outlive this session
+    for r in records:
+        db.session.expunge(r)
+
+    with _expirations_cache_lock:
+        _expirations_cache[key] = records
+        while len(_expirations_cache) > EXPIRATIONS_CACHE_SIZE:
+            _expirations_cache.popitem(last=False)
+    return list(records)
+
+
+def incumbent(r):
+    return f"{r.first or ''} {r.last or ''}".strip()
+
+
+def field(name):
+    return lambda r: getattr(r, name) or ""
+
+
+# --- The reports ---------------------------------------------------------------------------------
+
+register(ReportDefinition(
+    kind="long",
+    name="long_form_roster",
+    template="lfr_template.tex",
+    title=roster_title("Long Form Roster"),
+    # The whole roster, or the bodies and offices asked for
+    criteria=roster_filters,
+    params=roster_params,
+    variant=roster_variant,
+    bodies=roster_bodies,
+    fragment_template="lfr_fragment.tex",
+    bodies_per_fragment=2,
+    section_template="lfr_body.tex",
+    columns=[
+        ("incumbent", "Incumbent", incumbent),
+        ("office", "Office", field("title")),
+        ("email", "Email", field("email")),
+        ("phone", "Phone", field("phone")),
+        ("apt", "Apt", field("apt")),
+    ],
+))
+
+register(ReportDefinition(
+    kind="short",
+    name="short_form_roster",
+    template="sfr_template.tex",
+    title=roster_title("Short Form Roster"),
+    # The whole roster, or the bodies and offices asked for
+    criteria=roster_filters,
+    params=roster_params,
+    variant=roster_variant,
+    bodies=roster_bodies,
+    section_template="sfr_body.tex",
+    section_columns=2,
+    columns=[
+        ("incumbent", "Incumbent", incumbent),
+        ("office", "Office", field("title")),
+    ],
+))
+
+register(ReportDefinition(
+    kind="expirations",
+    name="expirations_report",
+    template="expirations_template.tex",
+    title=expiration_title,
+    # Terms expiring in the requested window; by default this calendar year
+    criteria=lambda context: [expiring_between(*expiration_window(context))],
+    prepare=format_end,
+    params=expiration_params,
+    variant=expiration_variant,
+    fetch=expiring_records,
+    section_template="expirations_body.tex",
+    columns=[
+        ("office", "Office", field("title")),
+        ("incumbent", "Incumbent", incumbent),
+        ("term", "Term", field("ordinal")),
+        ("ends", "Ends", field("formatted_end")),
+    ],
+))
+
+register(ReportDefinition(
+    kind="vacancies",
+    name="vacancies_report",
+    template="vacancies_template.tex",
+    title="Vacancies",
+    # Offices with fewer active terms than seats, straight from office and term
+    source=lambda context: vacancies.open_seats(context["now"].date()),
+    section_template="vacancies_body.tex",
+    section_columns=2,
+    columns=[
+        ("office", "Office", field("title")),
+        ("open_seats", "Open seats", field("open_seats")),
+        ("seats", "Seats", field("seats")),
+    ],
+))
+
+register(BinderDefinition(
+    kind="binder",
+    name="meeting_binder",
+    template="binder_template.tex",
+    title="Meeting Binder",
+    sections=("long", "short", "vacancies", "expirations"),
+))
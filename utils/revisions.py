@@ -0,0 +1,169 @@
+# utils/revisions.py — per-table data revision counters.
+#
+# Every table that feeds the rosters or letters has a row in data_revision whose counter only ever
+# goes up.  On SQLite the counters are bumped by triggers, so edits made outside Flask (for example
+# with a DB browser on the server) are caught as well.  On other databases the ORM commit hook
+# bumps them.  Either way the commit hook tells registered listeners which tables changed.
+#
+# The counters give caches, ETags and freshness checks one cheap version number to compare instead
+# of re-running the report_record join.  The commit hook also works out which bodies the change
+# touched, so listeners such as the pre-builder can leave the rosters of other bodies alone.
+
+from sqlalchemy import event, inspect, select, text
+
+from extensions import db
+from models.data_revision import DataRevision
+
+TRACKED_TABLES = ("body", "office", "person", "term", "letters")
+
+_listeners = []
+
+
+def _trigger_sql(table_name, operation):
+    return (
+        f"CREATE TRIGGER IF NOT EXISTS data_revision_{table_name}_{operation.lower()} "
+        f"AFTER {operation} ON \"{table_name}\" "
+        f"BEGIN "
+        f"UPDATE data_revision SET revision = revision + 1 WHERE table_name = '{table_name}'; "
+        f"END"
+    )
+
+
+def install(connection):
+    """
+    Seed a counter row for each tracked table and, on SQLite, create the triggers that bump them.
+    Safe to run repeatedly.
+    """
+    for table_name in TRACKED_TABLES:
+        connection.execute(
+            text("INSERT INTO data_revision (table_name, revision) "
+                 "SELECT :name, 0 WHERE NOT EXISTS "
+                 "(SELECT 1 FROM data_revision WHERE table_name = :name)"),
+            {"name": table_name}
+        )
+
+    if connection.dialect.name != "sqlite":
+        return
+
+    existing = {row[0] for row in connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'"))}
+    for table_name in TRACKED_TABLES:
+        if table_name not in existing:
+            continue
+        for operation in ("INSERT", "UPDATE", "DELETE"):
+            connection.execute(text(_trigger_sql(table_name, operation)))
+
+
+@event.listens_for(db.metadata, "after_create")
+def _install_after_create(target, connection, **kw):
+    # Runs after every db.create_all(), including on an existing database, so the triggers are
+    # (re)created whenever the tables are
+    install(connection)
+
+
+def uses_triggers(bind):
+    return bind.dialect.name == "sqlite"
+
+
+def on_change(listener):
+    """
+    Register `listener(tables, bodies)` to be called after each commit that changed any tracked
+    table, with the set of changed table names and the set of the ids of the bodies whose roster
+    rows the change can alter (None when that is not known, e.g. a deleted person).
+    """
+    _listeners.append(listener)
+    return listener
+
+
+def _values(obj, attribute):
+    # The attribute's current value and, for an edit that moved the row, its previous one
+    history = inspect(obj).attrs[attribute].history
+    return {value for value in (*history.added, *history.unchanged, *history.deleted) if value is not None}
+
+
+def _changed_bodies(session, obj, deleted):
+    """The ids of the bodies whose roster rows a change to `obj` can alter, or None for any body."""
+    table_name = obj.__table__.name
+    if table_name == "body":
+        return _values(obj, "body_id")
+    if table_name == "office":
+        return _values(obj, "office_body_id")
+    office = db.metadata.tables["office"]
+    if table_name == "term":
+        office_ids = _values(obj, "term_office_id")
+        bodies = set(session.execute(
+            select(office.c.office_id, office.c.office_body_id).where(office.c.office_id.in_(office_ids))
+        ).all())
+        # An office deleted in the same flush is no longer there to ask
+        return {body_id for _, body_id in bodies} if len(bodies) == len(office_ids) else None
+    if table_name == "person":
+        if deleted:
+            return None
+        term = db.metadata.tables["term"]
+        return set(session.scalars(
+            select(office.c.office_body_id)
+            .join(term, term.c.termofficeid == office.c.office_id)
+            .where(term.c.termpersonid == obj.person_id)
+        ))
+    return set()
+
+
+@event.listens_for(db.session, "after_flush")
+def _collect_changed_tables(session, flush_context):
+    changed = session.info.setdefault("changed_tables", set())
+    bodies = session.info.setdefault("changed_bodies", set())
+    deleted = set(session.deleted)
+    for obj in list(session.new) + list(session.dirty) + list(deleted):
+        table = getattr(obj, "__table__", None)
+        if table is not None and table.name in TRACKED_TABLES:
+            changed.add(table.name)
+            if bodies is not None:
+                changed_bodies = _changed_bodies(session, obj, obj in deleted)
+                if changed_bodies is None:
+                    bodies = session.info["changed_bodies"] = None
+                else:
+                    bodies |= changed_bodies
+
+
+@event.listens_for(db.session, "after_commit")
+def _after_commit(session):
+    changed = session.info.pop("changed_tables", None)
+    bodies = session.info.pop("changed_bodies", None)
+    if not changed:
+        return
+
+    bind = session.get_bind()
+    if not uses_triggers(bind):
+        # No triggers on this database: bump the counters here, outside the finished transaction
+        with bind.begin() as connection:
+            connection.execute(
+                DataRevision.__table__.update()
+                .where(DataRevision.table_name.in_(changed))
+                .values(revision=DataRevision.revision + 1)
+            )
+
+    bodies = frozenset(bodies) if bodies is not None else None
+    for listener in list(_listeners):
+        listener(frozenset(changed), bodies)
+
+
+@event.listens_for(db.session, "after_rollback")
+def _after_rollback(session):
+    session.info.pop("changed_tables", None)
+    session.info.pop("changed_bodies", None)
+
+
+def get_revisions():
+    """Return {table_name: revision} for every tracked table."""
+    revisions = dict.fromkeys(TRACKED_TABLES, 0)
+    for row in db.session.query(DataRevision.table_name, DataRevision.revision):
+        if row.table_name in revisions:
+            revisions[row.table_name] = row.revision
+    return revisions
+
+
+def combined_revision(revisions, tables=None):
+    """
+    Fold per-table revisions into one number that changes whenever any of `tables` (default: all)
+    changes.  Each counter only increases, so their sum does too.
+    """
+    return sum(revision for table_name, revision in revisions.items() if tables is None or table_name in tables)
@@ -0,0 +1,114 @@
+# utils/roster_flat.py — the roster_flat table, a materialized copy of the report_record view.
+#
+# report_record joins term, office, body and person on every read.  roster_flat holds the same rows
+# in an ordinary indexed table, and ReportRecord reads from it.  On SQLite, triggers on the four base tables delete and re-insert the
+# affected rows in the same transaction as each write, so the table never lags the data, whether
+# the write came through Flask or not.  On other databases the table is rebuilt after each commit
+# that changed a roster table.
+#
+# `flask rebuild-roster` (see db_utils.py) refills the table from the base tables, for recovery.
+
+from sqlalchemy import event, text
+
+from extensions import db
+from utils import revisions
+
+COLUMNS = (
+    "person_id", "first", "last", "email", "phone", "apt", "start", '"end"', "ordinal", "term_person_id",
+    "term_office_id", "office_id", "title", "office_precedence", "office_body_id", "body_id", "name",
+    "body_precedence",
+)
+
+_SELECT = (
+    "SELECT person.personid, person.first, person.last, person.email, person.phone, person.apt, "
+    "term.start, term.\"end\", term.ordinal, term.termpersonid, term.termofficeid, "
+    "office.office_id, office.title, office.office_precedence, office.office_body_id, "
+    "body.body_id, body.name, body.body_precedence "
+    "FROM term "
+    "JOIN office ON office.office_id = term.termofficeid "
+    "JOIN body ON body.body_id = office.office_body_id "
+    "JOIN person ON person.personid = term.termpersonid"
+)
+
+_INSERT = f"INSERT OR REPLACE INTO roster_flat ({', '.join(COLUMNS)}) {_SELECT}"
+
+# (table, operation, statements run for each changed row).  A change deletes the rows it affects
+# and inserts them again from the join; inserting a person, office or body affects no rows yet.
+_TRIGGERS = (
+    ("term", "INSERT", [
+        f"{_INSERT} WHERE term.termpersonid = NEW.termpersonid AND term.termofficeid = NEW.termofficeid",
+    ]),
+    ("term", "UPDATE", [
+        "DELETE FROM roster_flat WHERE term_person_id = OLD.termpersonid AND term_office_id = OLD.termofficeid",
+        f"{_INSERT} WHERE term.termpersonid = NEW.termpersonid AND term.termofficeid = NEW.termofficeid",
+    ]),
+    ("term", "DELETE", [
+        "DELETE FROM roster_flat WHERE term_person_id = OLD.termpersonid AND term_office_id = OLD.termofficeid",
+    ]),
+    ("person", "UPDATE", [
+        "DELETE FROM roster_flat WHERE person_id = OLD.personid",
+        f"{_INSERT} WHERE person.personid = NEW.personid",
+    ]),
+    ("person", "DELETE", ["DELETE FROM roster_flat WHERE person_id = OLD.personid"]),
+    ("office", "UPDATE", [
+        "DELETE FROM roster_flat WHERE office_id = OLD.office_id",
+        f"{_INSERT} WHERE office.office_id = NEW.office_id",
+    ]),
+    ("office", "DELETE", ["DELETE FROM roster_flat WHERE office_id = OLD.office_id"]),
+    ("body", "UPDATE", [
+        "DELETE FROM roster_flat WHERE body_id = OLD.body_id",
+        f"{_INSERT} WHERE body.body_id = NEW.body_id",
+    ]),
+    ("body", "DELETE", ["DELETE FROM roster_flat WHERE body_id = OLD.body_id"]),
+)
+
+
+def _trigger_sql(table_name, operation, statements):
+    return (
+        f"CREATE TRIGGER IF NOT EXISTS roster_flat_{table_name}_{operation.lower()} "
+        f"AFTER {operation} ON \"{table_name}\" "
+        f"BEGIN {' '.join(statement + ';' for statement in statements)} END"
+    )
+
+
+def rebuild(connection):
+    """Refill roster_flat from the base tables.  Returns the number of rows."""
+    connection.execute(text("DELETE FROM roster_flat"))
+    connection.execute(text(_INSERT))
+    return connection.execute(text("SELECT COUNT(*) FROM roster_flat")).scalar()
+
+
+def install(connection):
+    """
+    On SQLite, create the triggers that keep roster_flat current, and fill the table if it is
+    empty while there are terms (a database from before roster_flat).  Safe to run repeatedly.
+    """
+    if connection.dialect.name != "sqlite":
+        return
+
+    existing = {row[0] for row in connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'"))}
+    if not {"roster_flat", "term", "office", "body", "person"} <= existing:
+        return
+    for table_name, operation, statements in _TRIGGERS:
+        connection.execute(text(_trigger_sql(table_name, operation, statements)))
+
+    empty = connection.execute(text("SELECT NOT EXISTS (SELECT 1 FROM roster_flat)")).scalar()
+    if empty and connection.execute(text("SELECT EXISTS (SELECT 1 FROM term)")).scalar():
+        rebuild(connection)
+
+
+@event.listens_for(db.metadata, "after_create")
+def _install_after_create(target, connection, **kw):
+    install(connection)
+
+
+@revisions.on_change
+def _rebuild_without_triggers(tables, bodies):
+    # Databases without the triggers get a full rebuild after each commit that changed the roster
+    if not tables & {"term", "office", "body", "person"}:
+        return
+    bind = db.session.get_bind()
+    if revisions.uses_triggers(bind):
+        return
+    with bind.begin() as connection:
+        rebuild(connection)
@@ -0,0 +1,81 @@
+# utils/single_flight.py — one build per distinct report at a time.
+#
+# Two clerks pressing the same report button at the same moment would compile the same document
+# twice, into the same path.  Builds are keyed by their PDF cache key, which covers the report, its
+# parameters and the data it was rendered from, so identical requests share a key.
+#
+# Within a process (mod_wsgi threads), a build whose key is already being built waits for that
+# build and receives its result: SingleFlight.  Across processes (mod_wsgi daemons, report job
+# workers) the build holds a lock file for its key: build_lock.  A build that had to wait for the
+# lock finds the PDF in the cache once the other process is done, and publishes it instead of
+# compiling again (see report_jobs.build_report).  The lock file is removed when the build is done.
+
+import os
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+from utils.compile_gate import CompileQueueFull, acquire_file_lock, release_file_lock
+
+# Longest a build waits for an identical one in another process; a compile that takes longer is stuck
+BUILD_LOCK_TIMEOUT = 300
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time; concurrent callers with the same key share its outcome."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        """
+        Return fn(), unless a call for `key` is already running, in which case wait for it and
+        return its result (or raise its exception).
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+
+single_flight = SingleFlight()
+
+
+@contextmanager
+def build_lock(cache_dir, key, timeout=BUILD_LOCK_TIMEOUT):
+    """
+    Hold the cross-process lock of the build of `key` for the duration of the block.  Raises
+    CompileQueueFull when an identical build elsewhere holds it for more than `timeout` seconds.
+    """
+    lock_file = acquire_file_lock(os.path.join(cache_dir, "inflight", f"{key}.lock"), timeout)
+    if lock_file is None:
+        raise CompileQueueFull(retry_after=max(1, int(timeout)),
+                               message="An identical report is still being built. Please try again shortly.")
+    try:
+        yield
+    finally:
+        release_file_lock(lock_file)
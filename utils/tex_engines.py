@@ -0,0 +1,133 @@
+# utils/tex_engines.py — the TeX engines a document can be compiled with, and a benchmark of them.
+#
+# xelatex is the default.  lualatex and pdflatex take the same command line; tectonic has its own,
+# finds files through -Z search-path rather than TEXINPUTS and fetches missing packages itself.
+# TEX_ENGINE names the engine of every template and TEX_ENGINES ({template name: engine}) overrides
+# it per template; letters are looked up as "letters".  A fragmented report's fragments and merge
+# document use the engine of the report's template.
+#
+# Only xelatex starts from the precompiled preamble format (utils/latex_format.py) and from warm
+# processes (utils/latex_pool.py); the other engines always compile cold.
+#
+# `flask benchmark-engines` (see db_utils.py) compiles every template with every installed engine,
+# for choosing the fastest one that renders the templates correctly.
+
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+DEFAULT_ENGINE = "xelatex"
+
+# The key of the letters in TEX_ENGINES
+LETTERS = "letters"
+
+
+class TexEngine:
+    """A TeX engine with the pdfTeX command line (xelatex, lualatex, pdflatex)."""
+
+    def __init__(self, name, precompiled=False):
+        self.name = name
+        self.executable = name
+        # Whether builds may use the precompiled format and the warm pool, which are xelatex's
+        self.precompiled = precompiled
+
+    def available(self):
+        return shutil.which(self.executable) is not None
+
+    def command(self, tex_path, workspace, fmt=None, search_paths=()):
+        """The command compiling `tex_path` into `workspace`; `search_paths` are set through TEXINPUTS."""
+        command = [self.executable, "-interaction=nonstopmode", "-output-directory", workspace, tex_path]
+        if fmt and self.precompiled:
+            command.insert(1, f"-fmt={os.path.splitext(os.path.basename(fmt))[0]}")
+        return command
+
+
+class Tectonic(TexEngine):
+    """tectonic, which ignores TEXINPUTS and is given the search paths on its command line."""
+
+    def __init__(self):
+        super().__init__("tectonic")
+
+    def command(self, tex_path, workspace, fmt=None, search_paths=()):
+        command = [self.executable, "--outdir", workspace]
+        for path in search_paths:
+            command += ["-Z", f"search-path={path}"]
+        command.append(tex_path)
+        return command
+
+
+ENGINES = {
+    engine.name: engine
+    for engine in (TexEngine("xelatex", precompiled=True), TexEngine("lualatex"), TexEngine("pdflatex"), Tectonic())
+}
+
+
+def get_engine(name):
+    """Return the engine called `name`; ValueError for an unknown one."""
+    engine = ENGINES.get(name or DEFAULT_ENGINE)
+    if engine is None:
+        raise ValueError(f"Unknown TeX engine: {name} (known: {', '.join(ENGINES)})")
+    return engine
+
+
+def engine_for(template_name, config):
+    """The name of the engine for `template_name`: from TEX_ENGINES, else TEX_ENGINE, else xelatex."""
+    name = config.get("TEX_ENGINES", {}).get(template_name) or config.get("TEX_ENGINE") or DEFAULT_ENGINE
+    return get_engine(name).name
+
+
+def available_engines():
+    """The installed engines, in ENGINES order."""
+    return [engine for engine in ENGINES.values() if engine.available()]
+
+
+def run_measured(command, cwd, env=None):
+    """
+    Run `command` and return (exit code, wall seconds, peak RSS in bytes).  The peak RSS is that
+    of the process alone, read with os.wait4, so the engines are measured one run at a time.  Where
+    there is no os.wait4 (Windows) the peak RSS is None.
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=cwd, env=env, stdin=subprocess.DEVNULL,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if not hasattr(os, "wait4"):
+        process.wait()
+        return process.returncode, time.perf_counter() - start, None
+    _, status, usage = os.wait4(process.pid, 0)
+    wall = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak_rss = usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+    return process.returncode, wall, peak_rss
+
+
+def benchmark(sources, engines, search_paths=(), scratch_dir=None, runs=1):
+    """
+    Compile each of `sources` ({name: source}) with each of `engines`, `runs` times, without a
+    precompiled format.  Yields a dict per source and engine: name, engine, ok (a PDF was produced
+    every run), seconds (the fastest run), peak_rss (bytes, the largest; None where run_measured
+    cannot tell) and pdf_size (bytes).
+    """
+    from utils import latex
+
+    for name, source in sources.items():
+        for engine in engines:
+            result = {"name": name, "engine": engine.name, "ok": True, "seconds": None, "peak_rss": None,
+                      "pdf_size": None}
+            for _ in range(runs):
+                with latex.build_workspace(scratch_dir) as workspace:
+                    tex_path = os.path.join(workspace, "benchmark.tex")
+                    latex.write_source(source, tex_path)
+                    _, seconds, peak_rss = run_measured(engine.command(tex_path, workspace, search_paths=search_paths),
+                                                        workspace, latex.latex_env(search_paths))
+                    pdf_path = os.path.join(workspace, "benchmark.pdf")
+                    if not os.path.exists(pdf_path):
+                        result["ok"] = False
+                        break
+                    result["seconds"] = seconds if result["seconds"] is None else min(result["seconds"], seconds)
+                    if peak_rss is not None:
+                        result["peak_rss"] = max(result["peak_rss"] or 0, peak_rss)
+                    result["pdf_size"] = os.path.getsize(pdf_path)
+            yield result
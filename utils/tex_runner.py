@@ -0,0 +1,306 @@
+# utils/tex_runner.py — runs TeX under limits: wall-clock time, CPU time, memory and output size.
+#
+# A letter template is edited in the browser and compiled as saved, so a template that loops or
+# allocates without end must not hold a worker (and its compile slot) for good.  Every LaTeX
+# invocation goes through here: report and letter compiles (latex.compile_pdf), warm processes
+# (latex_pool) and the format dump (latex_format).
+#
+# On POSIX the engine runs in a session of its own, started through the prlimit command, which
+# sets RLIMIT_CPU and RLIMIT_AS and then executes the engine; nothing runs in the child between
+# fork and exec, where a threaded server could deadlock.  The engine is killed on timeout (a warm
+# process with its whole session; the xdvipdfmx that a cold xelatex feeds exits once its input is
+# closed).  On Windows the engine is put in a Job Object with a per-process CPU time and memory
+# limit (pywin32), whose processes are all killed when it is closed.  Where neither is available
+# (no prlimit command, no pywin32) only the timeout and the output bound apply, and a warning says so.
+# The engine's output goes to an anonymous temporary file rather than a pipe, and only its last
+# `output_bytes` are read back, however much a runaway document prints.
+#
+# The limits come from the config (TEX_TIMEOUT, TEX_CPU_LIMIT, TEX_MEMORY_LIMIT, TEX_OUTPUT_LIMIT)
+# through limit_options, a plain dict that travels with the build options to report job workers.
+# A run stopped by a limit is described by RunResult.to_dict, which the compile's failure carries
+# under "run" up to the job status and the JSON of the report and letter routes.
+
+import logging
+import os
+import shutil
+import signal
+import subprocess
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import win32api
+    import win32con
+    import win32job
+except ImportError:  # Not Windows, or pywin32 is not installed
+    win32job = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIMITS = {
+    "timeout": 120,  # Wall-clock seconds
+    "cpu_seconds": 120,
+    "memory_bytes": 2 * 2 ** 30,  # Address space
+    "output_bytes": 64 * 2 ** 10,  # Of the engine's output kept for the error message
+}
+
+# Seconds of CPU time between SIGXCPU and SIGKILL, for an engine that ignores the former
+CPU_GRACE = 5
+
+# Why a run was stopped
+TIMEOUT = "timeout"
+CPU_LIMIT = "cpu_limit"
+MEMORY_LIMIT = "memory_limit"
+KILLED = "killed"
+
+# What the engines print when an allocation fails (kpathsea, fontconfig, C++ libraries)
+_OUT_OF_MEMORY = ("memory exhausted", "out of memory", "cannot allocate memory", "bad_alloc")
+
+
+def limit_options(config):
+    """Return the limits of TeX runs from the app config, for passing as `limits`; 0 turns one off."""
+    return {
+        "timeout": config.get("TEX_TIMEOUT", DEFAULT_LIMITS["timeout"]),
+        "cpu_seconds": config.get("TEX_CPU_LIMIT", DEFAULT_LIMITS["cpu_seconds"]),
+        "memory_bytes": config.get("TEX_MEMORY_LIMIT", DEFAULT_LIMITS["memory_bytes"]),
+        "output_bytes": config.get("TEX_OUTPUT_LIMIT", DEFAULT_LIMITS["output_bytes"]),
+    }
+
+
+def _resource_limits(limits):
+    """[(option, soft, hard)] of the CPU time and address space limits that are set in `limits`."""
+    cpu_seconds, memory_bytes = limits.get("cpu_seconds"), limits.get("memory_bytes")
+    resource_limits = []
+    if cpu_seconds:
+        resource_limits.append(("cpu", cpu_seconds, cpu_seconds + CPU_GRACE))
+    if memory_bytes:
+        resource_limits.append(("as", memory_bytes, memory_bytes))
+    return resource_limits
+
+
+_warned = False
+
+
+def _warn_unenforced():
+    global _warned
+    if not _warned:
+        _warned = True
+        logger.warning("TeX runs are not held to their CPU time and memory limits here (no prlimit command "
+                       "or pywin32); only the timeout and the output limit apply")
+
+
+def limited_command(command, limits):
+    """
+    `command` started through prlimit with the CPU time and address space limits of `limits`, on
+    POSIX; on Windows (see limit_process) and without the prlimit command, `command` itself.
+    """
+    resource_limits = _resource_limits(limits)
+    if os.name != "posix" or not resource_limits:
+        return list(command)
+    prlimit = shutil.which("prlimit")
+    if prlimit is None:
+        _warn_unenforced()
+        return list(command)
+    options = []
+    for name, soft, hard in resource_limits:
+        # An unprivileged process cannot raise its hard limit, so stay within the current one
+        _, current_hard = resource.getrlimit(resource.RLIMIT_CPU if name == "cpu" else resource.RLIMIT_AS)
+        if current_hard != resource.RLIM_INFINITY:
+            soft, hard = min(soft, current_hard), min(hard, current_hard)
+        options.append(f"--{name}={int(soft)}:{int(hard)}")
+    return [prlimit, *options, "--", *command]
+
+
+def limit_process(process, limits):
+    """
+    On Windows, put a started engine in a Job Object holding it (and what it starts) to the CPU time
+    and memory limits of `limits`, and return the job, to be closed with release_job once the engine
+    has exited.  Elsewhere, or without pywin32 or limits, None.
+    """
+    resource_limits = _resource_limits(limits)
+    if os.name != "nt" or not resource_limits:
+        return None
+    if win32job is None:
+        _warn_unenforced()
+        return None
+    job = win32job.CreateJobObject(None, "")
+    info = win32job.QueryInformationJobObject(job, win32job.JobObjectExtendedLimitInformation)
+    flags = win32job.JOB_OBJECT_LIMIT_KILL_ON_JOB_CLOSE
+    if limits.get("cpu_seconds"):
+        # In 100-nanosecond units
+        info["BasicLimitInformation"]["PerProcessUserTimeLimit"] = int(limits["cpu_seconds"] * 10 ** 7)
+        flags |= win32job.JOB_OBJECT_LIMIT_PROCESS_TIME
+    if limits.get("memory_bytes"):
+        info["ProcessMemoryLimit"] = int(limits["memory_bytes"])
+        flags |= win32job.JOB_OBJECT_LIMIT_PROCESS_MEMORY
+    info["BasicLimitInformation"]["LimitFlags"] = flags
+    win32job.SetInformationJobObject(job, win32job.JobObjectExtendedLimitInformation, info)
+    handle = win32api.OpenProcess(win32con.PROCESS_SET_QUOTA | win32con.PROCESS_TERMINATE, False, process.pid)
+    try:
+        win32job.AssignProcessToJobObject(job, handle)
+    finally:
+        win32api.CloseHandle(handle)
+    return job
+
+
+def job_exceeded_cpu(job):
+    """Whether a process of the Job Object `job` was terminated for using up its CPU time."""
+    if job is None:
+        return False
+    accounting = win32job.QueryInformationJobObject(job, win32job.JobObjectBasicAccountingInformation)
+    return accounting["TotalTerminatedProcesses"] > 0
+
+
+def release_job(job):
+    """Close a Job Object from limit_process, killing whatever of it is still running."""
+    if job is not None:
+        win32api.CloseHandle(job)
+
+
+def popen_options():
+    """The subprocess keyword arguments that start an engine in its own session."""
+    if os.name != "posix":
+        return {}
+    return {"start_new_session": True}
+
+
+def output_file(directory=None):
+    """An anonymous temporary file for an engine's output; it is gone once closed."""
+    return tempfile.TemporaryFile(dir=directory)
+
+
+def read_tail(f, output_bytes):
+    """Return (the last `output_bytes` of the output file `f` as text, whether any was left out)."""
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    keep = min(size, output_bytes) if output_bytes else size
+    f.seek(size - keep)
+    return f.read(keep).decode("utf-8", errors="replace"), keep < size
+
+
+def kill(process):
+    """Kill an engine started with popen_options (and Popen), and everything it started in its session."""
+    if os.name == "posix":
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+    try:
+        process.kill()
+    except OSError:
+        pass
+
+
+class RunResult:
+    """How an engine run ended: exit code, the tail of its output and the limit that stopped it, if any."""
+
+    def __init__(self, command, returncode, output, truncated, seconds, timed_out, limits, cpu_exceeded=False):
+        self.command = command
+        self.returncode = returncode
+        self.output = output
+        self.truncated = truncated
+        self.seconds = seconds
+        self.timed_out = timed_out
+        self.limits = limits
+        # Set where the CPU limit does not end the engine with SIGXCPU (a Windows Job Object)
+        self.cpu_exceeded = cpu_exceeded
+
+    @property
+    def engine(self):
+        return os.path.basename(str(self.command[0]))
+
+    @property
+    def signal_name(self):
+        if self.returncode is None or self.returncode >= 0:
+            return None
+        try:
+            return signal.Signals(-self.returncode).name
+        except ValueError:
+            return f"signal {-self.returncode}"
+
+    @property
+    def stopped(self):
+        """TIMEOUT, CPU_LIMIT, MEMORY_LIMIT or KILLED when the run did not end by itself, else None."""
+        if self.timed_out:
+            return TIMEOUT
+        if self.cpu_exceeded or self.signal_name == "SIGXCPU":
+            return CPU_LIMIT
+        if (self.returncode and self.limits.get("memory_bytes")
+                and any(message in self.output.lower() for message in _OUT_OF_MEMORY)):
+            return MEMORY_LIMIT
+        if self.signal_name:
+            return KILLED
+        return None
+
+    def describe(self):
+        """A sentence on why the run was stopped, or None."""
+        stopped = self.stopped
+        if stopped == TIMEOUT:
+            return f"{self.engine} did not finish within {self.limits.get('timeout')} seconds and was stopped."
+        if stopped == CPU_LIMIT:
+            return f"{self.engine} used more than {self.limits.get('cpu_seconds')} seconds of CPU time and was stopped."
+        if stopped == MEMORY_LIMIT:
+            return (f"{self.engine} ran out of memory "
+                    f"(limit {self.limits.get('memory_bytes') // 2 ** 20} MB).")
+        if stopped == KILLED:
+            return f"{self.engine} was killed by {self.signal_name}."
+        return None
+
+    def to_dict(self):
+        return {
+            "engine": self.engine,
+            "exit_code": self.returncode,
+            "seconds": round(self.seconds, 3),
+            "stopped": self.stopped,
+            "signal": self.signal_name,
+            "output_truncated": self.truncated,
+        }
+
+
+def run(command, cwd=None, env=None, limits=None):
+    """
+    Run an engine under `limits` (see limit_options; DEFAULT_LIMITS fills in any not given) and
+    wait for it, at most `timeout` seconds.  Returns a RunResult.
+    """
+    limits = dict(DEFAULT_LIMITS, **(limits or {}))
+    start = time.monotonic()
+    timed_out = cpu_exceeded = False
+
+    with output_file(cwd) as output:
+        if os.name == "nt" and win32job is not None and _resource_limits(limits):
+            returncode, timed_out, cpu_exceeded = _run_in_job(command, cwd, env, output, limits)
+        else:
+            try:
+                # Looked up through the module so that the engine can be replaced in tests
+                result = subprocess.run(limited_command(command, limits), cwd=cwd, env=env,
+                                        stdin=subprocess.DEVNULL, stdout=output, stderr=subprocess.STDOUT,
+                                        timeout=limits["timeout"] or None, **popen_options())
+                returncode = result.returncode
+            except subprocess.TimeoutExpired:
+                # subprocess.run has killed the engine; the xdvipdfmx it feeds exits with its input closed
+                timed_out, returncode = True, None
+        seconds = time.monotonic() - start
+        text, truncated = read_tail(output, limits["output_bytes"])
+
+    return RunResult(command, returncode, text, truncated, seconds, timed_out, limits, cpu_exceeded)
+
+
+def _run_in_job(command, cwd, env, output, limits):
+    # Windows: the engine needs its process handle for the Job Object, which subprocess.run does not give
+    process = subprocess.Popen(command, cwd=cwd, env=env, stdin=subprocess.DEVNULL, stdout=output,
+                               stderr=subprocess.STDOUT)
+    job = limit_process(process, limits)
+    try:
+        process.wait(timeout=limits["timeout"] or None)
+        return process.returncode, False, job_exceeded_cpu(job)
+    except subprocess.TimeoutExpired:
+        kill(process)
+        process.wait()
+        return None, True, False
+    finally:
+        release_job(job)
@@ -0,0 +1,72 @@
+# utils/vacancies.py — open seats, computed from office seat counts and active terms.
+#
+# Every office has a number of seats (Office.seats, 1 unless set).  An office has open seats when
+# fewer of its terms are active than it has seats; offices with no terms at all are entirely open.
+# The count is one grouped query over office and term, so no placeholder people are needed.
+# Terms still held by a legacy "(Vacant)" placeholder person do not occupy a seat.
+
+from datetime import date
+
+from sqlalchemy import and_, func, not_, or_, select
+
+from extensions import db
+from models.body import Body
+from models.office import Office
+from models.person import Person
+from models.term import Term
+
+
+def is_placeholder():
+    """Person rows standing for a vacancy, from before offices had seat counts."""
+    return and_(Person.first.like('(Vacan%'), Person.last == ' ')
+
+
+def active_on(as_of):
+    """Terms that have started by `as_of` and not ended before it; open-ended dates count as active."""
+    return and_(
+        or_(Term.start.is_(None), Term.start <= as_of),
+        or_(Term.end.is_(None), Term.end >= as_of)
+    )
+
+
+def open_seats_query(as_of=None, body_id=None):
+    """
+    The statement selecting every office with open seats on `as_of` (default: today), in body and
+    office precedence order, with its seats, the seats filled and the seats open.
+    """
+    as_of = as_of or date.today()
+    filled = (
+        select(Term.term_office_id.label("office_id"), func.count().label("filled"))
+        .join(Person, Person.person_id == Term.term_person_id)
+        .where(active_on(as_of), not_(is_placeholder()))
+        .group_by(Term.term_office_id)
+        .subquery()
+    )
+    filled_count = func.coalesce(filled.c.filled, 0)
+
+    statement = (
+        select(
+            Office.office_id,
+            Office.title,
+            Office.office_precedence,
+            Body.body_id,
+            Body.name,
+            Body.body_precedence,
+            Office.seats,
+            filled_count.label("filled"),
+            (Office.seats - filled_count).label("open_seats"),
+        )
+        .join(Body, Body.body_id == Office.office_body_id)
+        .outerjoin(filled, filled.c.office_id == Office.office_id)
+        .where(Office.seats > filled_count)
+        .order_by(Body.body_precedence, Office.office_precedence)
+    )
+    if body_id is not None:
+        statement = statement.where(Office.office_body_id == body_id)
+    return statement
+
+
+def open_seats(as_of=None, body_id=None):
+    """Return the rows of open_seats_query: office_id, title, body_id, name (of the body), seats, filled, open_seats."""
+    return db.session.execute(open_seats_query(as_of, body_id)).all()
+